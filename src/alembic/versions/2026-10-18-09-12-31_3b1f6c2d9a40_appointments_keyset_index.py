@@ -0,0 +1,34 @@
+"""appointments keyset index
+
+Revision ID: 3b1f6c2d9a40
+Revises: 454c028c52d2
+Create Date: 2026-10-18 09:12:31.418265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b1f6c2d9a40'
+down_revision: Union[str, None] = '454c028c52d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_appointments_start_date_appointment_id',
+        'appointments',
+        ['start_date_appointment', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_appointments_start_date_appointment_id',
+        table_name='appointments',
+    )
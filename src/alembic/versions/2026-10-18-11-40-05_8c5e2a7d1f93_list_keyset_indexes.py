@@ -0,0 +1,53 @@
+"""list keyset indexes
+
+Revision ID: 8c5e2a7d1f93
+Revises: 3b1f6c2d9a40
+Create Date: 2026-10-18 11:40:05.227194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c5e2a7d1f93'
+down_revision: Union[str, None] = '3b1f6c2d9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    ('ix_doctors_created_at_id', 'doctors', ['created_at', 'id']),
+    ('ix_doctors_first_name_id', 'doctors', ['first_name', 'id']),
+    ('ix_doctors_last_name_id', 'doctors', ['last_name', 'id']),
+    ('ix_clients_created_at_id', 'clients', ['created_at', 'id']),
+    ('ix_clients_last_name_id', 'clients', ['last_name', 'id']),
+    ('ix_professions_created_at_id', 'professions', ['created_at', 'id']),
+    ('ix_professions_name_id', 'professions', ['name', 'id']),
+    (
+        'ix_categories_disease_created_at_id',
+        'categories_disease',
+        ['created_at', 'id'],
+    ),
+    ('ix_diseases_created_at_id', 'diseases', ['created_at', 'id']),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can not run in a transaction, the tables stay writable
+    # while the indexes are built
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True
+            )
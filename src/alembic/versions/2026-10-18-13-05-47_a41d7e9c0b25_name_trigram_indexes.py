@@ -0,0 +1,52 @@
+"""name trigram indexes
+
+Revision ID: a41d7e9c0b25
+Revises: 8c5e2a7d1f93
+Create Date: 2026-10-18 13:05:47.690318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41d7e9c0b25'
+down_revision: Union[str, None] = '8c5e2a7d1f93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('doctors', 'clients')
+COLUMNS = ('first_name', 'last_name', 'middle_name')
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CONCURRENTLY can not run in a transaction, the tables stay writable
+    # while the indexes are built
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            for column in COLUMNS:
+                op.create_index(
+                    f'ix_{table}_{column}_trgm',
+                    table,
+                    [column],
+                    unique=False,
+                    postgresql_using='gin',
+                    postgresql_ops={column: 'gin_trgm_ops'},
+                    postgresql_concurrently=True,
+                )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            for column in reversed(COLUMNS):
+                op.drop_index(
+                    f'ix_{table}_{column}_trgm',
+                    table_name=table,
+                    postgresql_concurrently=True,
+                )
+    op.execute('DROP EXTENSION IF EXISTS pg_trgm')
@@ -0,0 +1,47 @@
+"""diseases full text search
+
+Revision ID: 5f0c9b3e7a18
+Revises: a41d7e9c0b25
+Create Date: 2026-10-18 14:22:16.504921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0c9b3e7a18'
+down_revision: Union[str, None] = 'a41d7e9c0b25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'diseases',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('russian', name), 'A') || "
+                "setweight(to_tsvector('russian', description), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_diseases_search_vector',
+        'diseases',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_diseases_search_vector', table_name='diseases')
+    op.drop_column('diseases', 'search_vector')
@@ -0,0 +1,117 @@
+"""appointments period exclusion
+
+Revision ID: c7d2e4a9b615
+Revises: 5f0c9b3e7a18
+Create Date: 2026-10-18 15:48:09.218374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e4a9b615'
+down_revision: Union[str, None] = '5f0c9b3e7a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# conflicting ids listed in the report of the pre-flight check
+REPORTED: int = 20
+INVALID_PERIODS: str = """
+    SELECT id FROM appointments
+    WHERE start_date_appointment >= end_date_appointment
+    ORDER BY id
+    LIMIT :reported
+"""
+OVERLAPS: str = """
+    SELECT a.id, b.id FROM appointments a
+    JOIN appointments b ON b.{column} = a.{column} AND b.id > a.id
+        AND b.start_date_appointment < a.end_date_appointment
+        AND a.start_date_appointment < b.end_date_appointment
+    WHERE a.start_date_appointment < a.end_date_appointment
+        AND b.start_date_appointment < b.end_date_appointment
+    ORDER BY a.id, b.id
+    LIMIT :reported
+"""
+
+
+def check_periods() -> None:
+    """The constraints were never enforced before, the rows they would
+    reject are reported instead of the error of the first one. They are
+    fixed or deleted by hand, e.g. ``DELETE FROM appointments WHERE id IN
+    (...)`` for the later booking of every pair, and the upgrade is run
+    again."""
+    bind = op.get_bind()
+    params = {'reported': REPORTED}
+    report = []
+    invalid = bind.execute(sa.text(INVALID_PERIODS), params).scalars().all()
+    if invalid:
+        report.append(
+            'start not before end: ' + ', '.join(map(str, invalid))
+        )
+    for column in ('doctor_id', 'client_id'):
+        pairs = bind.execute(
+            sa.text(OVERLAPS.format(column=column)), params
+        ).all()
+        if pairs:
+            report.append(
+                f'overlapping with the same {column}: '
+                + ', '.join(f'{a} and {b}' for a, b in pairs)
+            )
+    if report:
+        raise RuntimeError(
+            'appointments violate the new constraints (at most '
+            f'{REPORTED} of each kind listed), fix or delete them and run '
+            'the upgrade again:\n' + '\n'.join(report)
+        )
+
+
+def upgrade() -> None:
+    check_periods()
+    # gist operator class for the plain "=" on doctor_id / client_id
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.create_check_constraint(
+        op.f('ck_appointments_period_valid'),
+        'appointments',
+        'start_date_appointment < end_date_appointment',
+    )
+    op.add_column(
+        'appointments',
+        sa.Column(
+            'period',
+            postgresql.TSRANGE(),
+            sa.Computed(
+                "CASE WHEN start_date_appointment < end_date_appointment "
+                "THEN tsrange(start_date_appointment, end_date_appointment, '[)') END",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_exclude_constraint(
+        'ex_appointments_doctor_period',
+        'appointments',
+        ('doctor_id', '='),
+        ('period', '&&'),
+        using='gist',
+    )
+    op.create_exclude_constraint(
+        'ex_appointments_client_period',
+        'appointments',
+        ('client_id', '='),
+        ('period', '&&'),
+        using='gist',
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('ex_appointments_client_period', 'appointments')
+    op.drop_constraint('ex_appointments_doctor_period', 'appointments')
+    op.drop_column('appointments', 'period')
+    op.drop_constraint(
+        op.f('ck_appointments_period_valid'), 'appointments', type_='check'
+    )
+    # btree_gist is kept, other objects of the database may depend on it
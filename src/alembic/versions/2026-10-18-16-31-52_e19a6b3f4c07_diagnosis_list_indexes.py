@@ -0,0 +1,47 @@
+"""diagnosis list indexes
+
+Revision ID: e19a6b3f4c07
+Revises: c7d2e4a9b615
+Create Date: 2026-10-18 16:31:52.640218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e19a6b3f4c07'
+down_revision: Union[str, None] = 'c7d2e4a9b615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_diagnosis_created_at_id',
+        'diagnosis',
+        ['created_at', 'id'],
+        unique=False,
+    )
+    # a disease is linked to a diagnosis once, the duplicates the old
+    # update left behind go before the index is built
+    op.execute(
+        'DELETE FROM disease_diagnosis a USING disease_diagnosis b '
+        'WHERE a.diagnosis_id = b.diagnosis_id '
+        'AND a.disease_id = b.disease_id AND a.ctid > b.ctid'
+    )
+    op.create_index(
+        'ix_disease_diagnosis_diagnosis_id',
+        'disease_diagnosis',
+        ['diagnosis_id', 'disease_id'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_disease_diagnosis_diagnosis_id', table_name='disease_diagnosis'
+    )
+    op.drop_index('ix_diagnosis_created_at_id', table_name='diagnosis')
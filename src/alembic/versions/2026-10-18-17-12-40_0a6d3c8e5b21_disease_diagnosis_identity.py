@@ -0,0 +1,34 @@
+"""disease diagnosis identity
+
+Revision ID: 0a6d3c8e5b21
+Revises: e19a6b3f4c07
+Create Date: 2026-10-18 17:12:40.381905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d3c8e5b21'
+down_revision: Union[str, None] = 'e19a6b3f4c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # id is part of a composite primary key, so it never got a sequence
+    op.execute(
+        'ALTER TABLE disease_diagnosis '
+        'ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY'
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('disease_diagnosis', 'id'), "
+        'COALESCE(MAX(id), 0) + 1, false) FROM disease_diagnosis'
+    )
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE disease_diagnosis ALTER COLUMN id DROP IDENTITY')
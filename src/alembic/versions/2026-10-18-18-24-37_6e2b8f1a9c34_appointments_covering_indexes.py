@@ -0,0 +1,58 @@
+"""appointments covering indexes
+
+Revision ID: 6e2b8f1a9c34
+Revises: 0a6d3c8e5b21
+Create Date: 2026-10-18 18:24:37.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2b8f1a9c34'
+down_revision: Union[str, None] = '0a6d3c8e5b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS: Sequence[str] = ('doctor_id', 'client_id')
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can not run in a transaction, the table stays writable
+    # while the indexes are built. The single column indexes are prefixes
+    # of the new ones and go.
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(
+                f'ix_appointments_{column}_start_date_appointment_id',
+                'appointments',
+                [column, 'start_date_appointment', 'id'],
+                unique=False,
+                postgresql_include=['end_date_appointment'],
+                postgresql_concurrently=True,
+            )
+            op.drop_index(
+                f'ix_appointments_{column}',
+                table_name='appointments',
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(
+                f'ix_appointments_{column}',
+                'appointments',
+                [column],
+                unique=False,
+                postgresql_concurrently=True,
+            )
+            op.drop_index(
+                f'ix_appointments_{column}_start_date_appointment_id',
+                table_name='appointments',
+                postgresql_concurrently=True,
+            )
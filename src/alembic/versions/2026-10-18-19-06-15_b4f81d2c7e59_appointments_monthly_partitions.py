@@ -0,0 +1,148 @@
+"""appointments monthly partitions
+
+Revision ID: b4f81d2c7e59
+Revises: 6e2b8f1a9c34
+Create Date: 2026-10-18 19:06:15.482711
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f81d2c7e59'
+down_revision: Union[str, None] = '6e2b8f1a9c34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS: str = (
+    'id, created_at, updated_at, start_date_appointment, '
+    'end_date_appointment, doctor_id, client_id'
+)
+INDEXED: Sequence[str] = ('doctor_id', 'client_id')
+# months created past the current one, later ones are created by
+# python -m src.doctor_app.cli
+MONTHS_AHEAD: int = 12
+
+
+def shift_month(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_constraints(table: str) -> None:
+    op.create_check_constraint(
+        op.f('ck_appointments_period_valid'),
+        table,
+        'start_date_appointment < end_date_appointment',
+    )
+    for column in INDEXED:
+        table_name = column.split('_')[0] + 's'
+        op.create_foreign_key(
+            op.f(f'fk_appointments_{column}_{table_name}'),
+            table,
+            table_name,
+            [column],
+            ['id'],
+            ondelete='SET NULL',
+        )
+    op.create_index(
+        'ix_appointments_start_date_appointment_id',
+        table,
+        ['start_date_appointment', 'id'],
+        unique=False,
+    )
+    for column in INDEXED:
+        op.create_index(
+            f'ix_appointments_{column}_start_date_appointment_id',
+            table,
+            [column, 'start_date_appointment', 'id'],
+            unique=False,
+            postgresql_include=['end_date_appointment'],
+        )
+
+
+def create_exclusions(table: str, prefix: str) -> None:
+    for column in INDEXED:
+        op.create_exclude_constraint(
+            f'ex_{prefix}_{column.split("_")[0]}_period',
+            table,
+            (column, '='),
+            ('period', '&&'),
+            using='gist',
+        )
+
+
+def replace_table(new: str) -> None:
+    # the id sequence outlives the old table and goes to the new one
+    op.execute('ALTER SEQUENCE appointments_id_seq OWNED BY NONE')
+    op.drop_table('appointments')
+    op.rename_table(new, 'appointments')
+    op.execute('ALTER SEQUENCE appointments_id_seq OWNED BY appointments.id')
+
+
+def upgrade() -> None:
+    # The table is rebuilt under the lock of the migration: the rows are
+    # copied into a partitioned twin, the constraints and indexes are built
+    # after the copy. Postgres can not have an exclusion constraint on a
+    # partitioned table, every partition gets its own. Reads go on during
+    # the copy, a booking written after it would be lost with the old table.
+    op.execute('LOCK TABLE appointments IN EXCLUSIVE MODE')
+    op.execute(
+        'CREATE TABLE appointments_partitioned (LIKE appointments '
+        'INCLUDING DEFAULTS INCLUDING GENERATED) '
+        'PARTITION BY RANGE (start_date_appointment)'
+    )
+    first = op.get_bind().execute(
+        sa.text('SELECT min(start_date_appointment)::date FROM appointments')
+    ).scalar()
+    current = shift_month(date.today(), 0)
+    month = shift_month(min(first or current, current), 0)
+    partitions = []
+    while month <= shift_month(current, MONTHS_AHEAD):
+        partition = month.strftime('appointments_y%Ym%m')
+        op.execute(
+            f'CREATE TABLE {partition} PARTITION OF appointments_partitioned '
+            f"FOR VALUES FROM ('{month.isoformat()}') "
+            f"TO ('{shift_month(month, 1).isoformat()}')"
+        )
+        partitions.append(partition)
+        month = shift_month(month, 1)
+    # rows past the created months until their partition is created
+    op.execute(
+        'CREATE TABLE appointments_default '
+        'PARTITION OF appointments_partitioned DEFAULT'
+    )
+    partitions.append('appointments_default')
+    op.execute(
+        f'INSERT INTO appointments_partitioned ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM appointments'
+    )
+    replace_table('appointments_partitioned')
+    op.create_primary_key(
+        op.f('pk_appointments'),
+        'appointments',
+        ['id', 'start_date_appointment'],
+    )
+    create_constraints('appointments')
+    for partition in partitions:
+        create_exclusions(partition, partition)
+
+
+def downgrade() -> None:
+    # the detached and archived partitions are not brought back
+    op.execute(
+        'CREATE TABLE appointments_plain (LIKE appointments '
+        'INCLUDING DEFAULTS INCLUDING GENERATED)'
+    )
+    op.execute(
+        f'INSERT INTO appointments_plain ({COLUMNS}) '
+        f'SELECT {COLUMNS} FROM appointments'
+    )
+    replace_table('appointments_plain')
+    op.create_primary_key(op.f('pk_appointments'), 'appointments', ['id'])
+    create_constraints('appointments')
+    create_exclusions('appointments', 'appointments')
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from time import monotonic
+from typing import Any, Optional, TypeVar
+
+from src.config import settings
+
+
+T = TypeVar('T')
+
+
+class TTLCache:
+    """Bounded LRU of loaded values that expire after ``ttl`` seconds.
+
+    The cache lives in the process, so a write invalidates it only in the
+    worker that served the write, the other workers catch up within
+    ``ttl``. A load that started before an invalidation is not stored, so
+    a slow read can not put back what a write has just dropped.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, enabled: bool = True):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._generation = 0
+
+    async def fetch(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await load()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        generation = self._generation
+        value = await load()
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    async def fetch_many(
+        self,
+        keys: Sequence[Hashable],
+        load: Callable[[list[Hashable]], Awaitable[dict[Hashable, T]]],
+    ) -> dict[Hashable, T]:
+        """``fetch`` of several keys, the missing ones are loaded at once.
+        A key the load does not return is left out, it is not cached."""
+        if not self.enabled:
+            return await load(list(keys))
+        values: dict[Hashable, T] = {}
+        missing = []
+        now = monotonic()
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                values[key] = entry[1]
+            else:
+                missing.append(key)
+        self.hits += len(values)
+        self.misses += len(missing)
+        if missing:
+            generation = self._generation
+            loaded = await load(missing)
+            if generation == self._generation:
+                for key, value in loaded.items():
+                    self._store(key, value)
+            values.update(loaded)
+        return values
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def modify(self, key: Hashable, change: Callable[[Any], None]) -> None:
+        """Apply a write to the cached value in place, if it is cached. A
+        load that started before may have missed the write, it is not
+        stored."""
+        self._generation += 1
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > monotonic():
+            change(entry[1])
+
+    def discard(self, key: Hashable) -> None:
+        """Drop a value the write has changed. A load that started before
+        may have missed the write, it is not stored."""
+        self._generation += 1
+        self._entries.pop(key, None)
+
+    def discard_where(self, match: Callable[[Hashable], bool]) -> None:
+        """``discard`` of every key ``match`` is true for"""
+        self._generation += 1
+        for key in [key for key in self._entries if match(key)]:
+            del self._entries[key]
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class CacheRegistry:
+    """Named caches of the process, created on first use from settings"""
+
+    def __init__(self):
+        self._caches: dict[str, TTLCache] = {}
+
+    def get(self, name: str, ttl: Optional[float] = None) -> TTLCache:
+        cache = self._caches.get(name)
+        if cache is None:
+            cache = self._caches[name] = TTLCache(
+                ttl=settings.cache_ttl if ttl is None else ttl,
+                maxsize=settings.cache_maxsize,
+                enabled=settings.cache_enabled,
+            )
+        return cache
+
+    def invalidate(self) -> None:
+        for cache in self._caches.values():
+            cache.invalidate()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            name: cache.stats() for name, cache in sorted(self._caches.items())
+        }
+
+
+caches = CacheRegistry()
@@ -0,0 +1,46 @@
+"""Импорт поциентов из файла.
+
+    python -m src.client_app.cli clients.csv
+    python -m src.client_app.cli clients.ndjson --format ndjson
+"""
+import argparse
+import asyncio
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Final
+
+from src.client_app.dependencies import client_service
+from src.client_app.imports import FORMATS, read_rows
+from src.client_app.services import IMPORT_CHUNK_SIZE
+from src.engine import async_session_factory
+
+
+READ_SIZE: Final[int] = 1 << 20
+
+
+async def read_file(path: Path) -> AsyncIterator[bytes]:
+    with path.open('rb') as file:
+        while chunk := file.read(READ_SIZE):
+            yield chunk
+
+
+async def main(path: Path, format: str, chunk_size: int) -> None:
+    async with async_session_factory() as session:
+        report = await client_service().import_rows(
+            session=session,
+            rows=read_rows(read_file(path), format=format),
+            chunk_size=chunk_size,
+        )
+    print(report.model_dump_json(by_alias=True, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import clients')
+    parser.add_argument('path', type=Path)
+    parser.add_argument('--format', choices=FORMATS, default=None)
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+    format = args.format or (
+        'ndjson' if args.path.suffix in ('.ndjson', '.jsonl') else 'csv'
+    )
+    asyncio.run(main(args.path, format, args.chunk_size))
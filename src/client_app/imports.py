@@ -0,0 +1,79 @@
+import codecs
+import csv
+import json
+from collections.abc import AsyncIterator
+from typing import Any, Final
+
+
+FORMATS: Final[tuple[str, ...]] = ('csv', 'ndjson')
+
+
+async def read_lines(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, str]]:
+    """Split a byte stream into numbered text lines, the stream is never
+    held in memory further than its last incomplete line"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    tail = ''
+    number = 0
+    async for chunk in chunks:
+        lines = (tail + decoder.decode(chunk)).split('\n')
+        tail = lines.pop()
+        for line in lines:
+            number += 1
+            yield number, line.removesuffix('\r')
+    tail += decoder.decode(b'', final=True)
+    if tail:
+        yield number + 1, tail.removesuffix('\r')
+
+
+async def read_csv(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, dict[str, Any]]]:
+    """Rows of a CSV stream with a header line, keyed by the header.
+
+    A quoted value may span several lines, such a record is numbered by
+    the line it starts on.
+    """
+    header: list[str] = []
+    record: list[str] = []
+    start = 0
+    async for number, line in read_lines(chunks):
+        if not record:
+            start = number
+        record.append(line)
+        # an odd number of quotes means a quoted value goes on
+        if sum(part.count('"') for part in record) % 2:
+            continue
+        (values,) = csv.reader(['\n'.join(record)])
+        record = []
+        if not header:
+            header = [value.strip() for value in values]
+            continue
+        if values:
+            yield start, dict(zip(header, values))
+    if record:
+        (values,) = csv.reader(['\n'.join(record)])
+        yield start, dict(zip(header, values))
+
+
+async def read_ndjson(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[tuple[int, Any]]:
+    """One JSON document per line, blank lines are skipped. A line that is
+    not valid JSON is passed on as is and fails validation downstream"""
+    async for number, line in read_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, line
+
+
+def read_rows(
+    chunks: AsyncIterator[bytes], format: str
+) -> AsyncIterator[tuple[int, Any]]:
+    if format == 'ndjson':
+        return read_ndjson(chunks)
+    return read_csv(chunks)
@@ -1,6 +1,6 @@
 from datetime import date
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, relationship
 
 from src.models import BaseUser, str_255
@@ -16,6 +16,17 @@ class Client(BaseUser):
             'middle_name',
             name='uq_client_full_name',
         ),
+        Index('ix_clients_created_at_id', 'created_at', 'id'),
+        Index('ix_clients_last_name_id', 'last_name', 'id'),
+        *(
+            Index(
+                f'ix_clients_{column}_trgm',
+                column,
+                postgresql_using='gin',
+                postgresql_ops={column: 'gin_trgm_ops'},
+            )
+            for column in ('first_name', 'last_name', 'middle_name')
+        ),
     )
     date_birthday: Mapped[date]
     address: Mapped[str_255]
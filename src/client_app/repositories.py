@@ -1,12 +1,39 @@
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from datetime import datetime
+from typing import Any, Final, Optional
 from sqlalchemy import text
 
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
 from src.client_app.dtos import ClientCreateData, ClientData
-from src.dependencies import QueryParams
+from src.queries import queries
+from src.dependencies import Keyset, Paginator, QueryParams
 from src.exceptions import BadRequestEx
+from src.utils import escape_like
+
+
+CLIENT_ORDERING: Final[dict[str, tuple[str, type]]] = {
+    'last_name': ('c.last_name', str),
+    'created_at': ('c.created_at', datetime),
+}
+
+# Best similarity of the search term to any of the names, the search is
+# served by the trigram indexes on every name column
+CLIENT_RANK: Final[str] = (
+    'GREATEST(similarity(c.last_name, :term), '
+    'similarity(c.first_name, :term), similarity(c.middle_name, :term))'
+)
+
+# Column order of the records loaded into the import staging table
+CLIENT_IMPORT_COLUMNS: Final[tuple[str, ...]] = (
+    'line',
+    'first_name',
+    'last_name',
+    'middle_name',
+    'date_birthday',
+    'address',
+    'avatar',
+)
 
 
 class IClientRepository(ABC):
@@ -20,8 +47,7 @@ class IClientRepository(ABC):
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
     ) -> list[ClientData] | list:
         raise NotImplementedError()
@@ -38,8 +64,18 @@ class IClientRepository(ABC):
 
     @abstractmethod
     async def update(
-        self, data: ClientCreateData, session: AsyncSession, id: int
-    ) -> ClientData:
+        self,
+        data: ClientCreateData,
+        session: AsyncSession,
+        id: int,
+        versions: Optional[list[datetime]] = None,
+    ) -> Optional[ClientData]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def import_chunk(
+        self, records: list[tuple], session: AsyncSession
+    ) -> tuple[int, int]:
         raise NotImplementedError()
 
 
@@ -79,42 +115,60 @@ class ClientRepository(IClientRepository):
             avatar=avatar,
         )
 
+    async def get_updated_at(
+        self, id: int, session: AsyncSession
+    ) -> Optional[datetime]:
+        query = text('SELECT c.updated_at FROM clients c WHERE c.id=:id')
+        result = await session.execute(query, {'id': id})
+        return result.scalar()
+
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
     ) -> list[ClientData] | list:
-        order = ''
         search = ''
-        params: dict[str, Any] = {'limit': limit, 'offset': offset}
+        params: dict[str, Any] = {}
+        ordering = CLIENT_ORDERING
 
         if query_params.search:
-            search = 'WHERE c.first_name OR c.last_name OR c.middle_name LIKE :search '
-            params['search'] = query_params.search
-
-        if query_params.order:
-            match query_params.order:
-                case 'last_name':
-                    order = 'ORDER BY c.last_name ASC '
-                case '-last_name':
-                    order = 'ORDER BY c.last_name DESC '
-                case 'created_at':
-                    order = 'ORDER BY c.created_at ASC '
-                case '-created_at':
-                    order = 'ORDER BY c.created_at DESC '
-                case '_':
-                    pass
-        query = (
-            'SELECT c.id, c.first_name, c.last_name, c.middle_name, c.date_birthday, c.address, c.created_at, c.updated_at, c.avatar '
-            'FROM clients c  '
-            f'{search} '
-            f'{order}'
-            'LIMIT :limit OFFSET :offset '
+            search = (
+                'WHERE (c.last_name ILIKE :search OR c.first_name ILIKE :search '
+                'OR c.middle_name ILIKE :search) '
+            )
+            params['search'] = f'%{escape_like(query_params.search)}%'
+            params['term'] = query_params.search
+            ordering = {**CLIENT_ORDERING, 'rank': (CLIENT_RANK, float)}
+
+        keyset = Keyset(
+            pagination=pagination,
+            order=query_params.order,
+            columns=ordering,
+            id_column='c.id',
+            default='-rank' if query_params.search else '',
         )
-        result = await session.execute(text(query), params)
-        rows = result.fetchall()
+
+        total = keyset.total('clients', 'c', search)
+        if seek := keyset.where(params):
+            search += f'AND {seek} ' if search else f'WHERE {seek} '
+
+        limit = keyset.limit(params)
+        query = queries.get(
+            'clients.list',
+            (bool(query_params.search), keyset.shape),
+            lambda: (
+                'SELECT c.id, c.first_name, c.last_name, c.middle_name, c.date_birthday, c.address, c.created_at, c.updated_at, c.avatar '
+                f'{keyset.select}'
+                f'{total}'
+                'FROM clients c  '
+                f'{search} '
+                f'{keyset.order_by}'
+                f'{limit}'
+            ),
+        )
+        result = await session.execute(query, params)
+        rows = keyset.page(result.fetchall())
         clients = []
 
         for row in rows:
@@ -128,6 +182,7 @@ class ClientRepository(IClientRepository):
                 created_at,
                 updated_at,
                 avatar,
+                *_,
             ) = row
             clients.append(
                 ClientData(
@@ -145,10 +200,11 @@ class ClientRepository(IClientRepository):
         return clients
 
     async def delete(self, id: int, session: AsyncSession) -> bool:
-        query = text('DELETE FROM clients WHERE id=:id')
-        await session.execute(query, {'id': id})
+        query = text('DELETE FROM clients WHERE id=:id RETURNING id')
+        result = await session.execute(query, {'id': id})
+        deleted = result.scalar() is not None
         await session.commit()
-        return True
+        return deleted
 
     async def create(
         self, data: ClientCreateData, session: AsyncSession
@@ -187,16 +243,30 @@ class ClientRepository(IClientRepository):
         )
 
     async def update(
-        self, id: int, data: ClientCreateData, session: AsyncSession
-    ) -> ClientData:
-        query = text(
-            'UPDATE clients SET first_name=:first_name, last_name=:last_name, middle_name=:middle_name, date_birthday=:date_birthday, address=:address, updated_at=now(), avatar=:avatar '
-            'WHERE id=:id RETURNING first_name, last_name, middle_name, date_birthday, address, created_at, updated_at, avatar '
+        self,
+        id: int,
+        data: ClientCreateData,
+        session: AsyncSession,
+        versions: Optional[list[datetime]] = None,
+    ) -> Optional[ClientData]:
+        params: dict[str, Any] = {'id': id, **data}
+        version = ''
+        if versions is not None:
+            version = 'AND updated_at = ANY(:versions) '
+            params['versions'] = versions
+        query = queries.get(
+            'clients.update',
+            bool(version),
+            lambda: (
+                'UPDATE clients SET first_name=:first_name, last_name=:last_name, middle_name=:middle_name, date_birthday=:date_birthday, address=:address, updated_at=now(), avatar=:avatar '
+                f'WHERE id=:id {version}'
+                'RETURNING first_name, last_name, middle_name, date_birthday, address, created_at, updated_at, avatar '
+            ),
         )
-        result = await session.execute(query, {'id': id, **data})
+        result = await session.execute(query, params)
         row = result.fetchone()
         if not row:
-            raise BadRequestEx(detail='Failed to update a client')
+            return None
         await session.commit()
         (
             first_name,
@@ -219,3 +289,49 @@ class ClientRepository(IClientRepository):
             updated_at=updated_at,
             avatar=avatar,
         )
+
+    async def import_chunk(
+        self, records: list[tuple], session: AsyncSession
+    ) -> tuple[int, int]:
+        """COPY validated records into a staging table and merge them into
+        clients by full name, the last record of a name wins.
+        Returns the number of inserted and updated clients"""
+        await session.execute(
+            text(
+                'CREATE TEMP TABLE clients_import ('
+                'line integer, first_name varchar(50), last_name varchar(50), '
+                'middle_name varchar(50), date_birthday date, '
+                'address varchar(255), avatar varchar(255)'
+                ') ON COMMIT DROP'
+            )
+        )
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            'clients_import', records=records, columns=CLIENT_IMPORT_COLUMNS
+        )
+        query = text(
+            """
+            WITH merged AS (
+                INSERT INTO clients(first_name, last_name, middle_name, date_birthday, address, avatar, created_at, updated_at)
+                SELECT DISTINCT ON (first_name, last_name, middle_name)
+                    first_name, last_name, middle_name, date_birthday, address, COALESCE(avatar, ''), now(), now()
+                FROM clients_import
+                ORDER BY first_name, last_name, middle_name, line DESC
+                ON CONFLICT ON CONSTRAINT uq_client_full_name DO UPDATE SET
+                    date_birthday=EXCLUDED.date_birthday,
+                    address=EXCLUDED.address,
+                    avatar=EXCLUDED.avatar,
+                    updated_at=now()
+                RETURNING xmax = 0 AS inserted
+            )
+            SELECT
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted)
+            FROM merged
+            """
+        )
+        result = await session.execute(query)
+        inserted, updated = result.one()
+        await session.commit()
+        return inserted, updated
@@ -1,10 +1,24 @@
-from typing import Annotated, Final, Optional
-from fastapi import APIRouter, Depends, Response
+from typing import Annotated, Final, Literal, Optional
+from fastapi import APIRouter, Depends, Header, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.client_app.dependencies import client_service
-from src.client_app.schemes import ClientCreateScheme, ClientScheme
+from src.client_app.imports import read_rows
+from src.client_app.schemes import (
+    ClientCreateScheme,
+    ClientImportScheme,
+    ClientScheme,
+)
 from src.client_app.services import ClientService
-from src.dependencies import Paginator, QueryParams, get_session
+from src.dependencies import (
+    ETAG_HEADER,
+    NEXT_CURSOR_HEADER,
+    Paginator,
+    QueryParams,
+    etag_matches,
+    get_session,
+    make_etag,
+)
+from src.models import PageScheme
 
 
 client_api = APIRouter(prefix='/clients')
@@ -16,20 +30,43 @@ TAG: Final[str] = 'Поциент'
     '/',
     tags=[TAG],
     summary='Получить всех поциетов',
-    response_model=list[ClientScheme] | list,
+    response_model=list[ClientScheme] | PageScheme[ClientScheme],
 )
 async def get_list(
     service: Annotated[ClientService, Depends(client_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
     pagination: Annotated[Paginator, Depends(Paginator)],
     query_params: Annotated[QueryParams, Depends(QueryParams)],
+    response: Response,
 ):
     clients: list[ClientScheme] | list = await service.get_list(
         session=session, pagination=pagination, query_params=query_params
     )
+    if pagination.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagination.next_cursor
+    if pagination.envelope:
+        return pagination.page(clients)
     return clients
 
 
+@client_api.post(
+    '/import',
+    tags=[TAG],
+    summary='Импорт поциентов из CSV или NDJSON',
+    response_model=ClientImportScheme,
+)
+async def import_clients(
+    service: Annotated[ClientService, Depends(client_service)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    request: Request,
+    format: Literal['csv', 'ndjson'] = 'csv',
+):
+    """Тело запроса читается потоком и загружается пачками"""
+    return await service.import_rows(
+        session=session, rows=read_rows(request.stream(), format=format)
+    )
+
+
 @client_api.get(
     '/{client_id}',
     tags=[TAG],
@@ -40,10 +77,18 @@ async def get_retrieve(
     client_id: int,
     service: Annotated[ClientService, Depends(client_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    if_none_match: Annotated[Optional[str], Header()] = None,
 ):
+    """Ответ помечается ETag, с заголовком If-None-Match неизменённый
+    поциент отдаётся как 304 без тела"""
+    etag = await service.get_etag(id=client_id, session=session)
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={ETAG_HEADER: etag})
     client: ClientScheme = await service.get_by_id(
         id=client_id, session=session
     )
+    response.headers[ETAG_HEADER] = etag
     return client
 
 
@@ -70,10 +115,15 @@ async def update(
     service: Annotated[ClientService, Depends(client_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
     data: ClientCreateScheme,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
 ):
-    client: Optional[ClientScheme] = await service.update(
-        id=client_id, session=session, data=data
+    """С заголовком If-Match поциент обновляется, только если не менялся
+    с указанной версии, иначе 412"""
+    client: ClientScheme = await service.update(
+        id=client_id, session=session, data=data, if_match=if_match
     )
+    response.headers[ETAG_HEADER] = make_etag(client_id, client.updated_at)
     return client
 
 
@@ -18,3 +18,16 @@ class ClientScheme(ClientCreateScheme):
     id: Annotated[int, POS_INT]
     created_at: datetime
     updated_at: datetime
+
+
+class ClientImportErrorScheme(BaseScheme):
+    line: int
+    message: str
+
+
+class ClientImportScheme(BaseScheme):
+    received: int = 0
+    inserted: int = 0
+    updated: int = 0
+    invalid: int = 0
+    errors: list[ClientImportErrorScheme] = []
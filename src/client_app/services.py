@@ -1,26 +1,56 @@
-from typing import Optional
+from collections.abc import AsyncIterator
+from typing import Any, Final, NoReturn, Optional
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from src.client_app.dtos import ClientCreateData, ClientData
-from src.client_app.repositories import IClientRepository
-from src.client_app.schemes import ClientCreateScheme, ClientScheme
-from src.dependencies import Paginator, QueryParams
-from src.exceptions import BadRequestEx, NotFoundEx
+from src.client_app.repositories import (
+    CLIENT_IMPORT_COLUMNS,
+    IClientRepository,
+)
+from src.client_app.schemes import (
+    ClientCreateScheme,
+    ClientImportErrorScheme,
+    ClientImportScheme,
+    ClientScheme,
+)
+from src.dependencies import (
+    Paginator,
+    QueryParams,
+    make_etag,
+    parse_if_match,
+)
+from src.exceptions import BadRequestEx, NotFoundEx, PreconditionFailedEx
+
+
+IMPORT_CHUNK_SIZE: Final[int] = 5000
+# Only the first errors are reported, an import of millions of rows must
+# not keep every one of them
+IMPORT_MAX_ERRORS: Final[int] = 100
 
 
 class ClientService:
     def __init__(self, repository: IClientRepository):
         self.repository = repository
 
-    async def _check_exists(
+    async def _raise_for_missed_update(
         self, id: int, session: AsyncSession
-    ) -> ClientData:
-        client: Optional[ClientData] = await self.repository.get_by_id(
+    ) -> NoReturn:
+        """The update matched no row, the client is either gone or was
+        changed since the version the request is based on"""
+        if not await self.repository.get_updated_at(id=id, session=session):
+            raise NotFoundEx(detail=f'Client with id: {id} not found')
+        raise PreconditionFailedEx(
+            detail=f'Client with id: {id} has been modified'
+        )
+
+    async def get_etag(self, id: int, session: AsyncSession) -> str:
+        updated_at = await self.repository.get_updated_at(
             id=id, session=session
         )
-        if not client:
+        if not updated_at:
             raise NotFoundEx(detail=f'Client with id: {id} not found')
-        return client
+        return make_etag(id, updated_at)
 
     async def get_by_id(self, id: int, session: AsyncSession) -> ClientScheme:
         client: Optional[ClientData] = await self.repository.get_by_id(
@@ -38,8 +68,7 @@ class ClientService:
     ) -> list[ClientScheme] | list:
         clients: list[ClientData] | list = await self.repository.get_list(
             session=session,
-            limit=pagination.limit,
-            offset=pagination.offset,
+            pagination=pagination,
             query_params=query_params,
         )
         if not clients:
@@ -60,25 +89,75 @@ class ClientService:
         return ClientScheme(**client)
 
     async def update(
-        self, session: AsyncSession, data: ClientCreateScheme, id: int
+        self,
+        session: AsyncSession,
+        data: ClientCreateScheme,
+        id: int,
+        if_match: Optional[str] = None,
     ) -> ClientScheme:
-        await self._check_exists(id=id, session=session)
         try:
             client = await self.repository.update(
                 session=session,
                 data=ClientCreateData(**data.model_dump()),
                 id=id,
+                versions=None if if_match is None else parse_if_match(
+                    if_match, id
+                ),
             )
         except IntegrityError:
             raise BadRequestEx(
                 detail='There is already a client with this first_name, last_name, middle_name'
             )
+        if not client:
+            await self._raise_for_missed_update(id=id, session=session)
         return ClientScheme(**client)
 
     async def delete(self, id: int, session: AsyncSession) -> None:
-        await self._check_exists(id=id, session=session)
         deleted = await self.repository.delete(session=session, id=id)
         if not deleted:
-            raise BadRequestEx(detail='Failed to delete a client')
+            raise NotFoundEx(detail=f'Client with id: {id} not found')
         return None
 
+    async def import_rows(
+        self,
+        session: AsyncSession,
+        rows: AsyncIterator[tuple[int, Any]],
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> ClientImportScheme:
+        report = ClientImportScheme()
+        records: list[tuple] = []
+
+        async def flush() -> None:
+            inserted, updated = await self.repository.import_chunk(
+                records=records, session=session
+            )
+            report.inserted += inserted
+            report.updated += updated
+            records.clear()
+
+        async for line, row in rows:
+            report.received += 1
+            try:
+                client = ClientCreateScheme.model_validate(row)
+            except ValidationError as exc:
+                report.invalid += 1
+                if len(report.errors) < IMPORT_MAX_ERRORS:
+                    message = '; '.join(
+                        f'{".".join(map(str, error["loc"])) or "row"}: '
+                        f'{error["msg"]}'
+                        for error in exc.errors()
+                    )
+                    report.errors.append(
+                        ClientImportErrorScheme(line=line, message=message)
+                    )
+                continue
+            data = client.model_dump()
+            data['line'] = line
+            records.append(
+                tuple(data[column] for column in CLIENT_IMPORT_COLUMNS)
+            )
+            if len(records) >= chunk_size:
+                await flush()
+        if records:
+            await flush()
+        return report
@@ -10,6 +10,21 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file='.env')
     echo: bool = True
     driver: str = "postgresql+asyncpg"
+    # Read replicas as full urls, a JSON list in the environment
+    replica_urls: list[str] = []
+    # Seconds a replica is skipped after it failed to connect
+    replica_cooldown: int = 30
+    # Seconds reads of a client stay on the primary after its write
+    replica_lag: int = 5
+    # In-process cache of the reference catalogs
+    cache_enabled: bool = True
+    # Seconds a cached catalog entry is served
+    cache_ttl: int = 300
+    # Entries kept per catalog, least recently used go first
+    cache_maxsize: int = 1024
+    # Seconds a doctor-day of booked slots is served, bookings made by
+    # other workers show up after it
+    slot_cache_ttl: int = 30
 
     @property
     def url(self) -> str:
@@ -1,16 +1,61 @@
+import base64
 import contextlib
+import json
 from datetime import datetime
-from typing import Optional
-from collections.abc import AsyncIterator
+from typing import Annotated, Any, Final, Literal, Optional
+from collections.abc import AsyncIterator, Sequence
 
+from fastapi import Query
 from fastapi.requests import Request
+from sqlalchemy import Row
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .engine import async_session_factory
+from .engine import async_session_factory, replicas
+from .exceptions import BadRequestEx
+from .models import PageScheme
+
+
+NEXT_CURSOR_HEADER: Final[str] = 'X-Next-Cursor'
+ETAG_HEADER: Final[str] = 'ETag'
+ETAG_VERSION_FORMAT: Final[str] = '%Y%m%d%H%M%S%f'
+READ_PRIMARY_HEADER: Final[str] = 'X-Read-Primary'
+READ_PRIMARY_COOKIE: Final[str] = 'read_primary'
+READ_METHODS: Final[tuple[str, ...]] = ('GET', 'HEAD')
+
+CountMode = Literal['exact', 'estimate', 'none']
+
+
+async def open_replica_session() -> Optional[AsyncSession]:
+    """Session connected to the next healthy replica, ``None`` when there
+    is none and reads have to go to the primary"""
+    while (replica := replicas.get()) is not None:
+        session = async_session_factory(bind=replica)
+        try:
+            await session.connection()
+        except (DBAPIError, OSError):
+            await session.close()
+            replicas.mark_failed(replica)
+            continue
+        return session
+    return None
+
+
+def reads_from_replica(request: Request) -> bool:
+    """GET requests read from a replica unless the client asks for the
+    primary, which it does for a while after its own write"""
+    return (
+        request.method in READ_METHODS
+        and not request.headers.get(READ_PRIMARY_HEADER)
+        and not request.cookies.get(READ_PRIMARY_COOKIE)
+    )
 
 
 async def get_session(request: Request) -> AsyncIterator[AsyncSession]:
-    async with async_session_factory() as session:
+    session = None
+    if reads_from_replica(request):
+        session = await open_replica_session()
+    async with session or async_session_factory() as session:
         request.state.sqlalchemy_session = session
         yield session
 
@@ -21,10 +66,280 @@ async def create_session() -> AsyncIterator[AsyncSession]:
         yield session
 
 
+@contextlib.asynccontextmanager
+async def create_read_session() -> AsyncIterator[AsyncSession]:
+    """Session for long reads outside of a request, on a replica if any"""
+    session = await open_replica_session() or async_session_factory()
+    async with session:
+        yield session
+
+
 class Paginator:
-    def __init__(self, limit: int = 10, offset: int = 0):
+    """Page of a list. With ``envelope`` the list is returned as
+    ``PageScheme`` and ``count`` chooses how its total is found: counted
+    (``exact``), taken from the table statistics when the list is not
+    filtered (``estimate``, ``None`` until the table is analyzed) or not
+    at all (``none``)."""
+
+    def __init__(
+        self,
+        limit: Annotated[int, Query(ge=1)] = 10,
+        offset: Annotated[int, Query(ge=0)] = 0,
+        cursor: Optional[str] = None,
+        envelope: bool = False,
+        count: CountMode = 'estimate',
+    ):
         self.limit = limit
         self.offset = offset
+        self.cursor = cursor
+        self.envelope = envelope
+        self.count: CountMode = count if envelope else 'none'
+        self.next_cursor: Optional[str] = None
+        self.total: Optional[int] = None
+
+    def page(self, items: list[Any]) -> PageScheme:
+        return PageScheme(
+            items=items,
+            total=self.total,
+            has_more=self.next_cursor is not None,
+            next_cursor=self.next_cursor,
+        )
+
+    def page_json(self, items: str) -> str:
+        """``page`` for items that are already a JSON array text"""
+        meta = self.page([]).model_dump_json(by_alias=True, exclude={'items'})
+        return f'{{"items":{items},{meta[1:]}'
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row of a page into an opaque cursor"""
+    payload = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise BadRequestEx(detail='Invalid cursor')
+    if not isinstance(values, list):
+        raise BadRequestEx(detail='Invalid cursor')
+    return values
+
+
+def make_etag(id: int, updated_at: datetime) -> str:
+    """Weak validator of a row, every update of the row changes it"""
+    return f'W/"{id}-{updated_at.strftime(ETAG_VERSION_FORMAT)}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` value with an ETag"""
+    if header.strip() == '*':
+        return True
+    tag = etag.removeprefix('W/')
+    return any(
+        value.strip().removeprefix('W/') == tag for value in header.split(',')
+    )
+
+
+def parse_if_match(header: str, id: int) -> Optional[list[datetime]]:
+    """Versions of the row ``id`` an ``If-Match`` value accepts, ``None``
+    for ``*`` which accepts any. The tags are compared weakly, they are
+    the weak ETags the detail routes hand out. Tags of other rows or in
+    another format accept nothing."""
+    if header.strip() == '*':
+        return None
+    versions = []
+    for value in header.split(','):
+        row_id, _, version = (
+            value.strip().removeprefix('W/').strip('"').partition('-')
+        )
+        if row_id != str(id):
+            continue
+        try:
+            versions.append(datetime.strptime(version, ETAG_VERSION_FORMAT))
+        except ValueError:
+            continue
+    return versions
+
+
+class Keyset:
+    """Seek pagination for a list query.
+
+    ``columns`` maps every order option the list accepts to its SQL column
+    and python type, a single leading ``-`` in the option reverses the
+    direction. Rows are always ordered by ``id_column`` last, so the cursor
+    is the (key, id) pair of the last row and the next page continues with
+    a row comparison that is served by a (key, id) index. An empty option
+    orders by ``default``, any other option is rejected: the order is part
+    of the query shape, so only the finite set of ``key`` and ``-key``
+    reaches ``QueryRegistry``.
+
+    The query must select ``id`` and, when a key column is used, append
+    ``Keyset.select`` to its select list. A query wrapped by ``json_page``
+    also appends ``Keyset.row_number``, a list in an envelope gets its
+    total from ``Keyset.total``.
+    """
+
+    def __init__(
+        self,
+        pagination: Paginator,
+        order: Optional[str],
+        columns: dict[str, tuple[str, type]],
+        id_column: str,
+        default: str = '',
+    ):
+        self.pagination = pagination
+        self.id_column = id_column
+        if order and order.removeprefix('-') not in columns:
+            raise BadRequestEx(detail='Invalid order')
+        self.order = order or default
+        self.descending = self.order.startswith('-')
+        self.column, self.type = columns.get(
+            self.order.lstrip('-'), (None, None)
+        )
+
+    @property
+    def shape(self) -> tuple[str, bool, str]:
+        """What the generated SQL depends on, see ``QueryRegistry``"""
+        return self.order, bool(self.pagination.cursor), self.pagination.count
+
+    @property
+    def select(self) -> str:
+        return f', {self.column} AS cursor_key ' if self.column else ' '
+
+    @property
+    def order_by(self) -> str:
+        direction = 'DESC' if self.descending else 'ASC'
+        keys = [self.id_column]
+        if self.column:
+            keys.insert(0, self.column)
+        return f'ORDER BY {", ".join(f"{k} {direction}" for k in keys)} '
+
+    def where(self, params: dict[str, Any]) -> Optional[str]:
+        """Seek predicate for the cursor, ``None`` on the first page"""
+        if not self.pagination.cursor:
+            return None
+        values = decode_cursor(self.pagination.cursor)
+        if len(values) != (3 if self.column else 2) or values[0] != self.order:
+            raise BadRequestEx(detail='Invalid cursor')
+        try:
+            params['cursor_id'] = int(values[-1])
+            if self.column:
+                params['cursor_key'] = (
+                    datetime.fromisoformat(values[1])
+                    if self.type is datetime
+                    else self.type(values[1])
+                )
+        except (TypeError, ValueError):
+            raise BadRequestEx(detail='Invalid cursor')
+        operator = '<' if self.descending else '>'
+        if self.column:
+            return (
+                f'({self.column}, {self.id_column}) {operator} '
+                '(:cursor_key, :cursor_id)'
+            )
+        return f'{self.id_column} {operator} :cursor_id'
+
+    def limit(self, params: dict[str, Any]) -> str:
+        """One row over the page tells whether there is a next one"""
+        params['limit'] = self.pagination.limit + 1
+        if self.pagination.cursor:
+            return 'LIMIT :limit '
+        params['offset'] = self.pagination.offset
+        return 'LIMIT :limit OFFSET :offset '
+
+    def total(self, table: str, alias: str, filter: str) -> str:
+        """Select list item with the total of the list, ``filter`` is its
+        WHERE clause without the seek predicate, so every page of a list
+        reports the same total. It is a subquery of its own, the count
+        scans ``table`` alone and not the joins of the page."""
+        if self.pagination.count == 'none':
+            return ' '
+        if self.pagination.count == 'estimate' and not filter.strip():
+            # a partitioned table has no statistics of its own, the
+            # estimate is the sum of the ones of its partitions
+            return (
+                ', (SELECT CASE WHEN bool_and(pc.reltuples < 0) THEN NULL '
+                'ELSE sum(greatest(pc.reltuples, 0))::bigint END '
+                "FROM pg_class pc WHERE pc.relkind = 'r' AND "
+                f"(pc.oid = '{table}'::regclass OR pc.oid IN (SELECT "
+                f"i.inhrelid FROM pg_inherits i WHERE i.inhparent = "
+                f"'{table}'::regclass))) AS total "
+            )
+        return f', (SELECT count(*) FROM {table} {alias} {filter}) AS total '
+
+    def _remember_total(self, total: Optional[int], rows: int) -> None:
+        """An estimate is stale statistics, it is raised to the rows an
+        offset page has already shown"""
+        if total is not None and not self.pagination.cursor:
+            seen = self.pagination.offset + rows
+            if self.pagination.next_cursor:
+                seen += 1
+            total = max(total, seen)
+        self.pagination.total = total
+
+    @property
+    def row_number(self) -> str:
+        return f', row_number() OVER ({self.order_by}) AS row_number '
+
+    def json_page(self, query: str, total: str = ' ') -> str:
+        """Wrap a list query selecting a ``body`` json per row into one that
+        returns the whole page as a single JSON array text. The look-ahead
+        row (``:limit`` is one over the page size) is left out of the array,
+        whether it was there and the sort key of the last row on the page
+        come along for ``json_body``, as does ``total`` of the list.
+
+        The window of ``row_number`` runs before LIMIT/OFFSET, on an offset
+        page it numbers the rows from ``:offset + 1``, so the position on
+        the page is counted from the offset."""
+        position = 'page.row_number'
+        if not self.pagination.cursor:
+            position = '(page.row_number - :offset)'
+        last = f'FILTER (WHERE {position} = :limit - 1)'
+        key = ' '
+        if self.column:
+            key = f', min(page.cursor_key) {last} AS cursor_key '
+        return (
+            'SELECT COALESCE(json_agg(page.body ORDER BY page.row_number) '
+            f"FILTER (WHERE {position} < :limit), '[]')::text AS body, "
+            f'count(*) AS rows, min(page.id) {last} AS id'
+            f'{key}'
+            f'{total}'
+            f'FROM ({query}) page'
+        )
+
+    def json_body(self, row: Row) -> str:
+        """Body of a ``json_page`` query, remembers the next cursor"""
+        if row.rows > self.pagination.limit:
+            key = [row.cursor_key] if self.column else []
+            self.pagination.next_cursor = encode_cursor(self.order, *key, row.id)
+        if self.pagination.count != 'none':
+            self._remember_total(
+                row.total, min(row.rows, self.pagination.limit)
+            )
+        return row.body
+
+    def page(self, rows: Sequence[Row]) -> Sequence[Row]:
+        """Trim the look-ahead row and remember the next cursor and the
+        total. An empty first page has no row to carry the total, the list
+        is empty then."""
+        if len(rows) > self.pagination.limit:
+            rows = rows[: self.pagination.limit]
+            last = rows[-1]
+            key = [last.cursor_key] if self.column else []
+            self.pagination.next_cursor = encode_cursor(
+                self.order, *key, last.id
+            )
+        if self.pagination.count == 'none':
+            return rows
+        if rows:
+            self._remember_total(rows[0].total, len(rows))
+        elif not self.pagination.offset and not self.pagination.cursor:
+            self._remember_total(0, 0)
+        return rows
 
 
 class QueryParams:
@@ -48,3 +363,29 @@ class QueryParamsAppointment:
         self.doctor = doctor
         self.client = client
         self.order = order
+
+
+class QueryParamsAvailability:
+    def __init__(
+        self,
+        date_from: Annotated[datetime, Query(alias='from')],
+        date_to: Annotated[datetime, Query(alias='to')],
+        duration: Annotated[int, Query(gt=0)] = 30,
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.duration = duration
+
+
+class QueryParamsExport:
+    def __init__(
+        self,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        id_from: Optional[int] = None,
+        id_to: Optional[int] = None,
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.id_from = id_from
+        self.id_to = id_to
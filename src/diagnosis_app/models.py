@@ -1,7 +1,15 @@
 __all__ = ['Diagnosis', 'DiseaseDiagnosis']
 
 from datetime import datetime
-from sqlalchemy import DateTime, ForeignKey, String
+from sqlalchemy import (
+    Computed,
+    DateTime,
+    ForeignKey,
+    Identity,
+    Index,
+    String,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from enum import Enum
 
@@ -11,6 +19,10 @@ from src.models import Base, str_255
 class Diagnosis(Base):
     __tablename__ = 'diagnosis'
 
+    __table_args__ = (
+        Index('ix_diagnosis_created_at_id', 'created_at', 'id'),
+    )
+
     class StatusChoices(Enum):
         ACTIVE = 'active'
         CLOSED = 'closed'
@@ -35,7 +47,16 @@ class Diagnosis(Base):
 class DiseaseDiagnosis(Base):
     __tablename__ = 'disease_diagnosis'
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    __table_args__ = (
+        Index(
+            'ix_disease_diagnosis_diagnosis_id',
+            'diagnosis_id',
+            'disease_id',
+            unique=True,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Identity(), primary_key=True)
     disease_id: Mapped[int] = mapped_column(
         ForeignKey('diseases.id', ondelete='CASCADE'), primary_key=True
     )
@@ -47,6 +68,10 @@ class DiseaseDiagnosis(Base):
 class CategoryDisease(Base):
     __tablename__ = 'categories_disease'
 
+    __table_args__ = (
+        Index('ix_categories_disease_created_at_id', 'created_at', 'id'),
+    )
+
     name: Mapped[str] = mapped_column(String(255), unique=True)
     diseases: Mapped[list['Disease']] = relationship(
         back_populates='category_disease'
@@ -56,8 +81,26 @@ class CategoryDisease(Base):
 class Disease(Base):
     __tablename__ = 'diseases'
 
+    __table_args__ = (
+        Index('ix_diseases_created_at_id', 'created_at', 'id'),
+        Index(
+            'ix_diseases_search_vector',
+            'search_vector',
+            postgresql_using='gin',
+        ),
+    )
+
     name: Mapped[str] = mapped_column(String(255), unique=True)
     description: Mapped[str] = mapped_column(String(10000))
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian', name), 'A') || "
+            "setweight(to_tsvector('russian', description), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
     category_disease_id: Mapped[int] = mapped_column(
         ForeignKey('categories_disease.id'), index=True
     )
@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from datetime import datetime
+from typing import Any, Final, Optional
 import asyncio
 from sqlalchemy import text
 
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from src.dependencies import QueryParams
+from src.queries import queries
+from src.dependencies import Keyset, Paginator, QueryParams
 
 from src.diagnosis_app.dtos import (
     CategoryDiseaseCreateData,
@@ -15,7 +17,64 @@ from src.diagnosis_app.dtos import (
     DiseaseCreateData,
     DiseaseData,
 )
-from src.exceptions import BadRequestEx
+from src.exceptions import BadRequestEx, NotFoundEx
+from src.utils import escape_like
+
+
+CATEGORY_DISEASE_ORDERING: Final[dict[str, tuple[str, type]]] = {
+    'created_at': ('cd.created_at', datetime),
+}
+
+DISEASE_ORDERING: Final[dict[str, tuple[str, type]]] = {
+    'created_at': ('d.created_at', datetime),
+}
+
+DIAGNOSIS_ORDERING: Final[dict[str, tuple[str, type]]] = {
+    'created_at': ('dia.created_at', datetime),
+}
+# Diseases of a single diagnosis, served by ix_disease_diagnosis_diagnosis_id
+DIAGNOSIS_DISEASES_JOIN: Final[str] = """
+    LEFT JOIN LATERAL (
+        SELECT COALESCE(
+            json_agg(
+                json_build_object('id', dis.id, 'name', dis.name)
+                ORDER BY dis.id
+            ),
+            '[]'::json
+        ) AS info
+        FROM disease_diagnosis dis_dia
+        JOIN diseases dis ON dis.id = dis_dia.disease_id
+        WHERE dis_dia.diagnosis_id = dia.id
+    ) dis_info ON true
+"""
+# A diagnosis in the shape of DiagnosisScheme rendered by postgres, with
+# DIAGNOSIS_DISEASES_JOIN for the diseases
+DIAGNOSIS_JSON: Final[str] = (
+    "json_build_object('name', dia.name, 'description', dia.description, "
+    "'status', dia.status, "
+    "'client', json_build_object('firstName', c.first_name, "
+    "'lastName', c.last_name, 'middleName', c.middle_name, "
+    "'avatar', c.avatar, 'dateBirthday', c.date_birthday), "
+    "'doctor', json_build_object('firstName', d.first_name, "
+    "'lastName', d.last_name, 'middleName', d.middle_name, "
+    "'avatar', d.avatar, 'dateBirthday', d.date_birthday), "
+    "'disease', dis_info.info, 'id', dia.id)"
+)
+# Requested disease ids of a diagnosis and those of them that do not exist
+DIAGNOSIS_DISEASES_WANTED: Final[str] = """
+    wanted AS (
+        SELECT DISTINCT unnest(CAST(:disease AS integer[])) AS disease_id
+    ),
+    missing AS (
+        SELECT w.disease_id
+        FROM wanted w
+        LEFT JOIN diseases dis ON dis.id = w.disease_id
+        WHERE dis.id IS NULL
+    )
+"""
+# Has to match the configuration of the generated diseases.search_vector
+# column, otherwise the GIN index is not used
+DISEASE_SEARCH_QUERY: Final[str] = "websearch_to_tsquery('russian', :search)"
 
 
 class ICategoryDiseaseRepository(ABC):
@@ -29,8 +88,7 @@ class ICategoryDiseaseRepository(ABC):
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
     ) -> list[CategoryDiseaseData] | list:
         raise NotImplementedError()
@@ -48,7 +106,7 @@ class ICategoryDiseaseRepository(ABC):
     @abstractmethod
     async def update(
         self, data: CategoryDiseaseCreateData, session: AsyncSession, id: int
-    ) -> CategoryDiseaseData:
+    ) -> Optional[CategoryDiseaseData]:
         raise NotImplementedError()
 
 
@@ -63,8 +121,7 @@ class IDiseaseRepository(ABC):
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
     ) -> list[DiseaseData] | list:
         raise NotImplementedError()
@@ -82,7 +139,7 @@ class IDiseaseRepository(ABC):
     @abstractmethod
     async def update(
         self, data: DiseaseCreateData, session: AsyncSession, id: int
-    ) -> DiseaseData:
+    ) -> Optional[DiseaseData]:
         raise NotImplementedError()
 
 
@@ -97,10 +154,10 @@ class IDiagnosisRepository(ABC):
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
-    ) -> list[DiagnosisData] | list:
+    ) -> str:
+        """The page as a JSON array of DiagnosisScheme"""
         raise NotImplementedError()
 
     @abstractmethod
@@ -116,7 +173,7 @@ class IDiagnosisRepository(ABC):
     @abstractmethod
     async def update(
         self, data: DiagnosisCreateData, session: AsyncSession, id: int
-    ) -> DiagnosisData:
+    ) -> Optional[DiagnosisData]:
         raise NotImplementedError()
 
 
@@ -137,42 +194,51 @@ class CategoryDiseaseRepository(ICategoryDiseaseRepository):
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
     ) -> list[CategoryDiseaseData] | list:
-        order = ''
-        params: dict[str, Any] = {'limit': limit, 'offset': offset}
-
-        if query_params.order:
-            match query_params.order:
-                case 'created_at':
-                    order = 'ORDER BY cd.created_at ASC '
-                case '-created_at':
-                    order = 'ORDER BY cd.created_at DESC '
-                case '_':
-                    pass
-
-        query = (
-            'SELECT cd.id, cd.name '
-            'FROM categories_disease cd  '
-            f'{order}'
-            'LIMIT :limit OFFSET :offset '
+        seek = ''
+        params: dict[str, Any] = {}
+        keyset = Keyset(
+            pagination=pagination,
+            order=query_params.order,
+            columns=CATEGORY_DISEASE_ORDERING,
+            id_column='cd.id',
+        )
+
+        total = keyset.total('categories_disease', 'cd', seek)
+        if predicate := keyset.where(params):
+            seek = f'WHERE {predicate} '
+
+        limit = keyset.limit(params)
+        query = queries.get(
+            'categories_disease.list',
+            keyset.shape,
+            lambda: (
+                'SELECT cd.id, cd.name '
+                f'{keyset.select}'
+                f'{total}'
+                'FROM categories_disease cd  '
+                f'{seek}'
+                f'{keyset.order_by}'
+                f'{limit}'
+            ),
         )
-        result = await session.execute(text(query), params)
-        rows = result.fetchall()
+        result = await session.execute(query, params)
+        rows = keyset.page(result.fetchall())
         catalogs = []
 
         for row in rows:
-            (id, name) = row
+            (id, name, *_) = row
             catalogs.append(CategoryDiseaseData(id=id, name=name))
         return catalogs
 
     async def delete(self, id: int, session: AsyncSession) -> bool:
-        query = text('DELETE FROM  categories_disease WHERE id=:id')
-        await session.execute(query, {'id': id})
+        query = text('DELETE FROM categories_disease WHERE id=:id RETURNING id')
+        result = await session.execute(query, {'id': id})
+        deleted = result.scalar() is not None
         await session.commit()
-        return True
+        return deleted
 
     async def create(
         self, data: CategoryDiseaseCreateData, session: AsyncSession
@@ -192,7 +258,7 @@ class CategoryDiseaseRepository(ICategoryDiseaseRepository):
 
     async def update(
         self, id: int, data: CategoryDiseaseCreateData, session: AsyncSession
-    ) -> CategoryDiseaseData:
+    ) -> Optional[CategoryDiseaseData]:
         query = text(
             'UPDATE categories_disease SET updated_at=now(), name=:name '
             'WHERE id=:id RETURNING name '
@@ -200,8 +266,8 @@ class CategoryDiseaseRepository(ICategoryDiseaseRepository):
         result = await session.execute(query, {'id': id, **data})
         row = result.fetchone()
         if not row:
-            raise BadRequestEx(detail='Failed to update a category disease')
-        (name) = row
+            return None
+        (name,) = row
         await session.commit()
         return CategoryDiseaseData(id=id, name=name)
 
@@ -236,40 +302,52 @@ class DiseaseRepository(IDiseaseRepository):
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
     ) -> list[DiseaseData] | list:
-        order = ''
         search = ''
-        params: dict[str, Any] = {'limit': limit, 'offset': offset}
-
-        if query_params.order:
-            match query_params.order:
-                case 'created_at':
-                    order = 'ORDER BY d.created_at ASC '
-                case '-created_at':
-                    order = 'ORDER BY d.created_at DESC '
-                case '_':
-                    pass
+        params: dict[str, Any] = {}
+        ordering = DISEASE_ORDERING
 
         if query_params.search:
-            search = 'WHERE d.name LiKE :search '
-            params['search'] = search
-        query = (
-            "SELECT d.id, d.name as new_name, d.description, json_build_object('name', cd.name, 'id', cd.id) as category_disease "
-            'FROM diseases d  '
-            'LEFT JOIN categories_disease cd ON d.category_disease_id=cd.id '
-            f'{search}'
-            f'{order}'
-            'LIMIT :limit OFFSET :offset '
+            search = f'WHERE d.search_vector @@ {DISEASE_SEARCH_QUERY} '
+            params['search'] = query_params.search
+            rank = f'ts_rank(d.search_vector, {DISEASE_SEARCH_QUERY})'
+            ordering = {**DISEASE_ORDERING, 'rank': (rank, float)}
+
+        keyset = Keyset(
+            pagination=pagination,
+            order=query_params.order,
+            columns=ordering,
+            id_column='d.id',
+            default='-rank' if query_params.search else '',
+        )
+
+        total = keyset.total('diseases', 'd', search)
+        if seek := keyset.where(params):
+            search += f'AND {seek} ' if search else f'WHERE {seek} '
+
+        limit = keyset.limit(params)
+        query = queries.get(
+            'diseases.list',
+            (bool(query_params.search), keyset.shape),
+            lambda: (
+                "SELECT d.id, d.name as new_name, d.description, json_build_object('name', cd.name, 'id', cd.id) as category_disease "
+                f'{keyset.select}'
+                f'{total}'
+                'FROM diseases d  '
+                'LEFT JOIN categories_disease cd ON d.category_disease_id=cd.id '
+                f'{search}'
+                f'{keyset.order_by}'
+                f'{limit}'
+            ),
         )
-        result = await session.execute(text(query), params)
-        rows = result.fetchall()
+        result = await session.execute(query, params)
+        rows = keyset.page(result.fetchall())
         diseases = []
 
         for row in rows:
-            (id, name, description, category_disease) = row
+            (id, name, description, category_disease, *_) = row
             diseases.append(
                 DiseaseData(
                     id=id,
@@ -281,10 +359,11 @@ class DiseaseRepository(IDiseaseRepository):
         return diseases
 
     async def delete(self, id: int, session: AsyncSession) -> bool:
-        query = text('DELETE FROM  diseases WHERE id=:id')
-        await session.execute(query, {'id': id})
+        query = text('DELETE FROM diseases WHERE id=:id RETURNING id')
+        result = await session.execute(query, {'id': id})
+        deleted = result.scalar() is not None
         await session.commit()
-        return True
+        return deleted
 
     async def create(
         self, data: DiseaseCreateData, session: AsyncSession
@@ -314,7 +393,7 @@ class DiseaseRepository(IDiseaseRepository):
 
     async def update(
         self, id: int, data: DiseaseCreateData, session: AsyncSession
-    ) -> dict[str, Any]:
+    ) -> Optional[dict[str, Any]]:
         query = text(
             'UPDATE diseases SET  updated_at=now(), name=:name, description=:description, category_disease_id=:category_disease '
             'WHERE id=:id RETURNING name, description, category_disease_id '
@@ -322,7 +401,7 @@ class DiseaseRepository(IDiseaseRepository):
         result = await session.execute(query, {'id': id, **data})
         row = result.fetchone()
         if not row:
-            raise BadRequestEx(detail='Failed to update a disease')
+            return None
         (
             name,
             description,
@@ -342,32 +421,19 @@ class DiagnosisRepository(IDiagnosisRepository):
         self, id: int, session: AsyncSession
     ) -> Optional[DiagnosisData]:
         query = text(
-            """
-            WITH disease_info AS (
-                SELECT
-                    id,
-                    json_agg(
-                        json_build_object(
-                            'id', dis.id,
-                            'name', dis.name
-                        )
-                    ) AS info 
-                FROM diseases dis
-                GROUP BY id
-            )
+            f"""
             SELECT
                 dia.name,
                 dia.description,
                 dia.date_closed,
                 dia.status,
                 json_build_object('first_name', c.first_name, 'id', c.id, 'last_name', c.last_name, 'middle_name', c.middle_name, 'avatar', c.avatar) as client,
-                json_build_object('first_name', d.first_name, 'id', d.id, 'last_name', d.last_name, 'middle_name', d.middle_name, 'avatar', c.avatar) as doctor,
-                COALESCE(dis_info.info, '[]'::json) AS diseases
+                json_build_object('first_name', d.first_name, 'id', d.id, 'last_name', d.last_name, 'middle_name', d.middle_name, 'avatar', d.avatar) as doctor,
+                dis_info.info AS diseases
             FROM diagnosis dia
             JOIN doctors d ON dia.doctor_id = d.id
             JOIN clients c ON dia.client_id = c.id
-            JOIN disease_diagnosis dis_dia ON dia.id = dis_dia.diagnosis_id
-            JOIN disease_info dis_info ON dis_dia.disease_id = dis_info.id
+            {DIAGNOSIS_DISEASES_JOIN}
             WHERE dia.id = :id
             """
         )
@@ -398,115 +464,89 @@ class DiagnosisRepository(IDiagnosisRepository):
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
-    ) -> list[DiagnosisData] | list:
-        order = ''
+    ) -> str:
         search = ''
-        params: dict[str, Any] = {'limit': limit, 'offset': offset}
-
-        if query_params.order:
-            match query_params.order:
-                case 'created_at':
-                    order = 'ORDER BY d.created_at ASC '
-                case '-created_at':
-                    order = 'ORDER BY d.created_at DESC '
-                case '_':
-                    pass
+        params: dict[str, Any] = {}
 
         if query_params.search:
-            search = 'WHERE d.name LiKE :search '
-            params['search'] = search
-
-        query = (
-            """
-            WITH disease_info AS (
-                SELECT
-                    id,
-                    json_agg(
-                        json_build_object(
-                            'id', dis.id,
-                            'name', dis.name
-                        )
-                    ) AS info 
-                FROM diseases as dis
-                GROUP BY id
-            )
-            SELECT
-                dia.id,
-                dia.name,
-                dia.description,
-                dia.date_closed,
-                dia.status,
-                json_build_object('first_name', c.first_name, 'id', c.id, 'last_name', c.last_name, 'middle_name', c.middle_name, 'avatar', c.avatar) as client,
-                json_build_object('first_name', d.first_name, 'id', d.id, 'last_name', d.last_name, 'middle_name', d.middle_name, 'avatar', c.avatar) as doctor,
-                COALESCE(dis_info.info, '[]'::json) AS diseases
-            FROM diagnosis as dia
-            INNER JOIN doctors d ON dia.doctor_id = d.id
-            INNER JOIN clients c ON dia.client_id = c.id
-            INNER JOIN disease_diagnosis dis_dia ON dia.id = dis_dia.diagnosis_id
-            INNER JOIN disease_info dis_info ON dis_dia.disease_id = dis_info.id
-            """
-            f'{search}'
-            f'{order}'
-            'LIMIT :limit OFFSET :offset '
+            search = 'WHERE dia.name ILIKE :search '
+            params['search'] = f'%{escape_like(query_params.search)}%'
+
+        keyset = Keyset(
+            pagination=pagination,
+            order=query_params.order,
+            columns=DIAGNOSIS_ORDERING,
+            id_column='dia.id',
         )
-        result = await session.execute(text(query), params)
-        rows = result.fetchall()
-        diagnosis = []
-
-        for row in rows:
-            (
-                id,
-                name,
-                description,
-                date_closed,
-                status,
-                client,
-                doctor,
-                diseases,
-            ) = row
-            diagnosis.append(
-                DiagnosisData(
-                    id=id,
-                    name=name,
-                    description=description,
-                    date_closed=date_closed,
-                    status=status,
-                    client=client,
-                    doctor=doctor,
-                    disease=diseases,
-                )
-            )
-        return diagnosis
+        total = keyset.total('diagnosis', 'dia', search)
+        if seek := keyset.where(params):
+            search += f'AND {seek} ' if search else f'WHERE {seek} '
+
+        # The page is cut before the diseases are collected, so the lateral
+        # subquery runs once per returned diagnosis
+        limit = keyset.limit(params)
+        query = queries.get(
+            'diagnosis.list',
+            (bool(query_params.search), keyset.shape),
+            lambda: keyset.json_page(
+                f'SELECT dia.id, {DIAGNOSIS_JSON} AS body '
+                f'{keyset.select}'
+                f'{keyset.row_number}'
+                """
+                FROM diagnosis as dia
+                INNER JOIN doctors d ON dia.doctor_id = d.id
+                INNER JOIN clients c ON dia.client_id = c.id
+                """
+                f'{DIAGNOSIS_DISEASES_JOIN}'
+                f'{search}'
+                f'{keyset.order_by}'
+                f'{limit}',
+                total,
+            ),
+        )
+        result = await session.execute(query, params)
+        return keyset.json_body(result.one())
 
     async def delete(self, id: int, session: AsyncSession) -> bool:
-        query = text('DELETE FROM  diagnosis WHERE id=:id')
-        await session.execute(query, {'id': id})
+        query = text('DELETE FROM diagnosis WHERE id=:id RETURNING id')
+        result = await session.execute(query, {'id': id})
+        deleted = result.scalar() is not None
         await session.commit()
-        return True
+        return deleted
 
     async def create(
         self, data: DiagnosisCreateData, session: AsyncSession
     ) -> DiagnosisResponseData:
+        # Diagnosis and all of its disease links in one statement; nothing
+        # is inserted when any of the requested diseases does not exist
         query = text(
-            """
-            INSERT INTO diagnosis(
-                name, description,
-                status, client_id,
-                doctor_id, created_at, updated_at)
-            VALUES(:name, :description, :status, :client, :doctor, now(), now())
-            RETURNING id, name, description, status, client_id, doctor_id
-
-            """
-        )
-        query_insert_disease = text(
-            """
-            INSERT INTO disease_diagnosis(
-                diagnosis_id, disease_id, 
-                created_at, updated_at)
-            VALUES( :diagnosis_id, :disease_id, now(), now())
+            f"""
+            WITH {DIAGNOSIS_DISEASES_WANTED},
+            new_diagnosis AS (
+                INSERT INTO diagnosis(
+                    name, description,
+                    status, client_id,
+                    doctor_id, created_at, updated_at)
+                SELECT :name, :description, CAST(:status AS statuschoices), :client, :doctor, now(), now()
+                WHERE NOT EXISTS (SELECT 1 FROM missing)
+                RETURNING id, name, description, status, client_id, doctor_id
+            ),
+            links AS (
+                INSERT INTO disease_diagnosis(
+                    diagnosis_id, disease_id,
+                    created_at, updated_at)
+                SELECT nd.id, w.disease_id, now(), now()
+                FROM new_diagnosis nd CROSS JOIN wanted w
+                ON CONFLICT (diagnosis_id, disease_id) DO NOTHING
+            )
+            SELECT
+                nd.id, nd.name, nd.description,
+                nd.status, nd.client_id, nd.doctor_id,
+                ARRAY(SELECT disease_id FROM missing ORDER BY disease_id) AS missing
+            FROM (VALUES (1)) AS one
+            LEFT JOIN new_diagnosis nd ON true
             """
         )
         data['status'] = data['status'].upper()
@@ -521,13 +561,11 @@ class DiagnosisRepository(IDiagnosisRepository):
             status,
             client_id,
             doctor_id,
+            missing,
         ) = row
-
-        await session.commit()
-        for disease_id in data['disease']:
-           await session.execute(
-                query_insert_disease,
-                {'diagnosis_id': id, 'disease_id': disease_id},
+        if missing:
+            raise NotFoundEx(
+                detail=f'Diseases with ids: {", ".join(map(str, missing))} not found'
             )
         await session.commit()
         return DiagnosisResponseData(
@@ -542,16 +580,70 @@ class DiagnosisRepository(IDiagnosisRepository):
 
     async def update(
         self, id: int, data: DiagnosisCreateData, session: AsyncSession
-    ) -> DiagnosisResponseData:
+    ) -> Optional[DiagnosisResponseData]:
+        # Only the links that left the set are deleted and only the new ones
+        # are inserted, unchanged links are not touched. The links a
+        # concurrent update of the diagnosis committed are not in the
+        # snapshot of the NOT EXISTS guard, the unique index stops them.
         query = text(
-            'UPDATE diagnosis SET  updated_at=now(), name=:name, description=:description, status=:status, client_id=:client_id, doctor_id=:doctor_id '
-            'WHERE id=:id RETURNING name, description, status, client, doctor '
+            f"""
+            WITH {DIAGNOSIS_DISEASES_WANTED},
+            updated AS (
+                UPDATE diagnosis SET
+                    updated_at=now(), name=:name, description=:description,
+                    status=CAST(:status AS statuschoices),
+                    client_id=:client, doctor_id=:doctor
+                WHERE id=:id AND NOT EXISTS (SELECT 1 FROM missing)
+                RETURNING id, name, description, status, client_id, doctor_id
+            ),
+            removed AS (
+                DELETE FROM disease_diagnosis dis_dia
+                USING updated u
+                WHERE dis_dia.diagnosis_id = u.id
+                    AND dis_dia.disease_id NOT IN (SELECT disease_id FROM wanted)
+            ),
+            added AS (
+                INSERT INTO disease_diagnosis(
+                    diagnosis_id, disease_id,
+                    created_at, updated_at)
+                SELECT u.id, w.disease_id, now(), now()
+                FROM updated u CROSS JOIN wanted w
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM disease_diagnosis dis_dia
+                    WHERE dis_dia.diagnosis_id = u.id
+                        AND dis_dia.disease_id = w.disease_id
+                )
+                ON CONFLICT (diagnosis_id, disease_id) DO NOTHING
+            )
+            SELECT
+                u.id, u.name, u.description,
+                u.status, u.client_id, u.doctor_id,
+                ARRAY(SELECT disease_id FROM missing ORDER BY disease_id) AS missing,
+                ARRAY(SELECT disease_id FROM wanted ORDER BY disease_id) AS disease,
+                EXISTS (SELECT 1 FROM diagnosis WHERE id=:id) AS found
+            FROM (VALUES (1)) AS one
+            LEFT JOIN updated u ON true
+            """
         )
+        data['status'] = data['status'].upper()
         result = await session.execute(query, {'id': id, **data})
-        row = result.fetchone()
-        if not row:
-            raise BadRequestEx(detail='Failed to update a diagnosis')
-        (name, description, status, client_id, doctor_id) = row
+        (
+            _,
+            name,
+            description,
+            status,
+            client_id,
+            doctor_id,
+            missing,
+            disease,
+            found,
+        ) = result.one()
+        if not found:
+            return None
+        if missing:
+            raise NotFoundEx(
+                detail=f'Diseases with ids: {", ".join(map(str, missing))} not found'
+            )
         await session.commit()
         return DiagnosisResponseData(
             id=id,
@@ -560,5 +652,5 @@ class DiagnosisRepository(IDiagnosisRepository):
             status=status,
             client=client_id,
             doctor=doctor_id,
-            disease=data['disease']
+            disease=disease,
         )
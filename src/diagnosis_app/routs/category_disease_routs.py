@@ -1,7 +1,13 @@
 from typing import Annotated, Final
 from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from src.dependencies import Paginator, QueryParams, get_session
+from src.dependencies import (
+    NEXT_CURSOR_HEADER,
+    Paginator,
+    QueryParams,
+    get_session,
+)
+from src.models import PageScheme
 from src.diagnosis_app.dependencies import category_disease_service
 
 from src.diagnosis_app.schemes import (
@@ -20,7 +26,7 @@ TAG: Final[str] = 'Категории заболеваний'
     '/',
     tags=[TAG],
     summary='Получить все категории заболеваний',
-    response_model=list[CategoryDiseaseScheme] | list,
+    response_model=list[CategoryDiseaseScheme] | PageScheme[CategoryDiseaseScheme],
 )
 async def get_list(
     service: Annotated[
@@ -29,10 +35,16 @@ async def get_list(
     session: Annotated[AsyncSession, Depends(get_session)],
     pagination: Annotated[Paginator, Depends(Paginator)],
     query_params: Annotated[QueryParams, Depends(QueryParams)],
+    response: Response,
 ):
-    return await service.get_list(
+    categories = await service.get_list(
         pagination=pagination, query_params=query_params, session=session
     )
+    if pagination.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagination.next_cursor
+    if pagination.envelope:
+        return pagination.page(categories)
+    return categories
 
 
 @category_disease_api.get(
@@ -1,7 +1,13 @@
 from typing import Annotated, Final
 from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from src.dependencies import Paginator, QueryParams, get_session
+from src.dependencies import (
+    NEXT_CURSOR_HEADER,
+    Paginator,
+    QueryParams,
+    get_session,
+)
+from src.models import PageScheme
 from src.diagnosis_app.dependencies import diagnosis_service
 from src.diagnosis_app.schemes import DiagnosisCreateScheme, DiagnosisScheme
 from src.diagnosis_app.services import DiagnosisService
@@ -16,7 +22,7 @@ TAG: Final[str] = 'Диагноз'
     '/',
     tags=[TAG],
     summary='Получить все диагнозы',
-    response_model=list[DiagnosisScheme] | list,
+    response_model=list[DiagnosisScheme] | PageScheme[DiagnosisScheme],
 )
 async def get_list(
     service: Annotated[DiagnosisService, Depends(diagnosis_service)],
@@ -24,9 +30,17 @@ async def get_list(
     pagination: Annotated[Paginator, Depends(Paginator)],
     query_params: Annotated[QueryParams, Depends(QueryParams)],
 ):
-    return await service.get_list(
+    """Страница собирается в JSON базой данных и отдаётся без
+    повторной сериализации"""
+    diagnosis: str = await service.get_list(
         pagination=pagination, query_params=query_params, session=session
     )
+    if pagination.envelope:
+        diagnosis = pagination.page_json(diagnosis)
+    response = Response(content=diagnosis, media_type='application/json')
+    if pagination.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagination.next_cursor
+    return response
 
 
 @diagnosis_api.get(
@@ -62,13 +76,13 @@ async def create(
     '/{diagnosis_id}',
     tags=[TAG],
     summary='Обновить диагноз',
-    response_model=DiagnosisScheme,
+    response_model=DiagnosisCreateScheme,
 )
 async def update(
     diagnosis_id: int,
     service: Annotated[DiagnosisService, Depends(diagnosis_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
-    data: DiagnosisScheme,
+    data: DiagnosisCreateScheme,
 ):
     return await service.update(id=diagnosis_id, session=session, data=data)
 
@@ -1,7 +1,13 @@
 from typing import Annotated, Final
 from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from src.dependencies import Paginator, QueryParams, get_session
+from src.dependencies import (
+    NEXT_CURSOR_HEADER,
+    Paginator,
+    QueryParams,
+    get_session,
+)
+from src.models import PageScheme
 from src.diagnosis_app.dependencies import disease_service
 from src.diagnosis_app.schemes import DiseaseCreateScheme, DiseaseResponseScheme, DiseaseScheme
 from src.diagnosis_app.services import DiseaseService
@@ -17,7 +23,7 @@ TAG: Final[str] = 'Заболевания'
     '/',
     tags=[TAG],
     summary='Получить все заболевания',
-    response_model=list[DiseaseScheme] | list,
+    response_model=list[DiseaseScheme] | PageScheme[DiseaseScheme],
 )
 async def get_list(
     service: Annotated[
@@ -26,10 +32,16 @@ async def get_list(
     session: Annotated[AsyncSession, Depends(get_session)],
     pagination: Annotated[Paginator, Depends(Paginator)],
     query_params: Annotated[QueryParams, Depends(QueryParams)],
+    response: Response,
 ):
-    return await service.get_list(
+    diseases = await service.get_list(
         pagination=pagination, query_params=query_params, session=session
     )
+    if pagination.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagination.next_cursor
+    if pagination.envelope:
+        return pagination.page(diseases)
+    return diseases
 
 
 @disease_api.get(
@@ -1,6 +1,7 @@
 from typing import Optional
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio.session import AsyncSession
+from src.cache import caches
 from src.dependencies import Paginator, QueryParams
 from src.diagnosis_app.dtos import (
     CategoryDiseaseData,
@@ -23,30 +24,30 @@ from src.diagnosis_app.schemes import (
     DiseaseResponseScheme,
     DiseaseScheme,
 )
-from src.exceptions import BadRequestEx, NotFoundEx
+from src.exceptions import NotFoundEx
 
 
 class CategoryDiseaseService:
     def __init__(self, repository: ICategoryDiseaseRepository):
         self.repository = repository
+        self.cache = caches.get("categories_disease")
+        # diseases embed the name of their category
+        self.disease_cache = caches.get("diseases")
 
-    async def _check_exists(
-        self, id: int, session: AsyncSession
-    ) -> CategoryDiseaseData:
-        category_disease: Optional[CategoryDiseaseData] = (
-            await self.repository.get_by_id(id=id, session=session)
-        )
-        if not category_disease:
-            raise NotFoundEx(detail=f"Category Disease with id: {id} not found")
-        return category_disease
+    def _invalidate(self) -> None:
+        self.cache.invalidate()
+        self.disease_cache.invalidate()
 
     async def get_by_id(self, id: int, session: AsyncSession) -> CategoryDiseaseScheme:
-        category: Optional[CategoryDiseaseData] = await self.repository.get_by_id(
-            id=id, session=session
-        )
-        if not category:
-            raise NotFoundEx(detail=f"CategoryDisease with id: {id} not found")
-        return CategoryDiseaseScheme(**category)
+        async def load() -> CategoryDiseaseScheme:
+            category: Optional[CategoryDiseaseData] = await self.repository.get_by_id(
+                id=id, session=session
+            )
+            if not category:
+                raise NotFoundEx(detail=f"CategoryDisease with id: {id} not found")
+            return CategoryDiseaseScheme(**category)
+
+        return await self.cache.fetch(("id", id), load)
 
     async def get_list(
         self,
@@ -54,17 +55,33 @@ class CategoryDiseaseService:
         pagination: Paginator,
         query_params: QueryParams,
     ) -> list[CategoryDiseaseScheme] | list:
-        categories: list[CategoryDiseaseScheme] | list = await self.repository.get_list(
-            session=session,
-            limit=pagination.limit,
-            offset=pagination.offset,
-            query_params=query_params,
+        async def load() -> tuple[
+            list[CategoryDiseaseScheme] | list, Optional[str], Optional[int]
+        ]:
+            categories: list[CategoryDiseaseData] | list = await self.repository.get_list(
+                session=session,
+                pagination=pagination,
+                query_params=query_params,
+            )
+            return [
+                CategoryDiseaseScheme.model_validate(category) for category in categories
+            ], pagination.next_cursor, pagination.total
+
+        key = (
+            "list",
+            pagination.limit,
+            pagination.offset,
+            pagination.cursor,
+            query_params.search,
+            query_params.order,
+            pagination.count,
         )
-        if not categories:
-            return categories
-        return [
-            CategoryDiseaseScheme.model_validate(category) for category in categories
-        ]
+        (
+            categories,
+            pagination.next_cursor,
+            pagination.total,
+        ) = await self.cache.fetch(key, load)
+        return categories
 
     async def create(
         self, session: AsyncSession, data: CategoryDiseaseCreateScheme
@@ -72,38 +89,34 @@ class CategoryDiseaseService:
         category: CategoryDiseaseData = await self.repository.create(
             session=session, data=CategoryDiseaseData(**data.model_dump())
         )
+        self._invalidate()
         return CategoryDiseaseScheme(**category)
 
     async def update(
         self, session: AsyncSession, data: CategoryDiseaseCreateScheme, id: int
     ) -> CategoryDiseaseScheme:
-        await self._check_exists(id=id, session=session)
         category = await self.repository.update(
             session=session,
             data=CategoryDiseaseData(**data.model_dump()),
             id=id,
         )
+        if not category:
+            raise NotFoundEx(detail=f"Category Disease with id: {id} not found")
+        self._invalidate()
         return CategoryDiseaseScheme(**category)
 
     async def delete(self, id: int, session: AsyncSession) -> None:
-        await self._check_exists(id=id, session=session)
         deleted = await self.repository.delete(session=session, id=id)
         if not deleted:
-            raise BadRequestEx(detail="Failed to delete a category disease")
+            raise NotFoundEx(detail=f"Category Disease with id: {id} not found")
+        self._invalidate()
         return None
 
 
 class DiseaseService:
     def __init__(self, repository: IDiseaseRepository):
         self.repository = repository
-
-    async def _check_exists(self, id: int, session: AsyncSession) -> DiseaseData:
-        disease: Optional[DiseaseData] = await self.repository.get_by_id(
-            id=id, session=session
-        )
-        if not disease:
-            raise NotFoundEx(detail=f"Disease with id: {id} not found")
-        return disease
+        self.cache = caches.get("diseases")
 
     async def _check_category_exists(self, id: int, session: AsyncSession) -> bool:
 
@@ -115,12 +128,15 @@ class DiseaseService:
         return True
 
     async def get_by_id(self, id: int, session: AsyncSession) -> DiseaseScheme:
-        disease: Optional[DiseaseData] = await self.repository.get_by_id(
-            id=id, session=session
-        )
-        if not disease:
-            raise NotFoundEx(detail=f"Disease with id: {id} not found")
-        return DiseaseScheme.model_validate(disease)
+        async def load() -> DiseaseScheme:
+            disease: Optional[DiseaseData] = await self.repository.get_by_id(
+                id=id, session=session
+            )
+            if not disease:
+                raise NotFoundEx(detail=f"Disease with id: {id} not found")
+            return DiseaseScheme.model_validate(disease)
+
+        return await self.cache.fetch(("id", id), load)
 
     async def get_list(
         self,
@@ -128,15 +144,33 @@ class DiseaseService:
         pagination: Paginator,
         query_params: QueryParams,
     ) -> list[DiseaseScheme] | list:
-        diseases: list[DiseaseData] | list = await self.repository.get_list(
-            session=session,
-            limit=pagination.limit,
-            offset=pagination.offset,
-            query_params=query_params,
+        async def load() -> tuple[
+            list[DiseaseScheme] | list, Optional[str], Optional[int]
+        ]:
+            diseases: list[DiseaseData] | list = await self.repository.get_list(
+                session=session,
+                pagination=pagination,
+                query_params=query_params,
+            )
+            return [
+                DiseaseScheme.model_validate(disease) for disease in diseases
+            ], pagination.next_cursor, pagination.total
+
+        key = (
+            "list",
+            pagination.limit,
+            pagination.offset,
+            pagination.cursor,
+            query_params.search,
+            query_params.order,
+            pagination.count,
         )
-        if not diseases:
-            return diseases
-        return [DiseaseScheme.model_validate(disease) for disease in diseases]
+        (
+            diseases,
+            pagination.next_cursor,
+            pagination.total,
+        ) = await self.cache.fetch(key, load)
+        return diseases
 
     async def create(
         self, session: AsyncSession, data: DiseaseCreateScheme
@@ -145,25 +179,28 @@ class DiseaseService:
         disease: DiseaseData = await self.repository.create(
             session=session, data=DiseaseCreateData(**data.model_dump())
         )
+        self.cache.invalidate()
         return DiseaseResponseScheme.model_validate(disease)
 
     async def update(
         self, session: AsyncSession, data: DiseaseCreateScheme, id: int
     ) -> DiseaseScheme:
-        await self._check_exists(id=id, session=session)
         await self._check_category_exists(id=data.category_disease, session=session)
         disease = await self.repository.update(
             session=session,
             data=DiseaseCreateData(**data.model_dump()),
             id=id,
         )
+        if not disease:
+            raise NotFoundEx(detail=f"Disease with id: {id} not found")
+        self.cache.invalidate()
         return DiseaseResponseScheme.model_validate(disease)
 
     async def delete(self, id: int, session: AsyncSession) -> None:
-        await self._check_exists(id=id, session=session)
         deleted = await self.repository.delete(session=session, id=id)
         if not deleted:
-            raise BadRequestEx(detail="Failed to delete a disease")
+            raise NotFoundEx(detail=f"Disease with id: {id} not found")
+        self.cache.invalidate()
         return None
 
 
@@ -171,14 +208,6 @@ class DiagnosisService:
     def __init__(self, repository: IDiagnosisRepository):
         self.repository = repository
 
-    async def _check_exists(self, id: int, session: AsyncSession) -> DiagnosisData:
-        diagnosis: Optional[DiagnosisData] = await self.repository.get_by_id(
-            id=id, session=session
-        )
-        if not diagnosis:
-            raise NotFoundEx(detail=f"Diagnosis with id: {id} not found")
-        return diagnosis
-
     async def _check_client_exists(self, id: int, session: AsyncSession) -> bool:
 
         query = text("SELECT c.id FROM clients c WHERE c.id=:id")
@@ -210,16 +239,14 @@ class DiagnosisService:
         session: AsyncSession,
         pagination: Paginator,
         query_params: QueryParams,
-    ) -> list[DiagnosisScheme] | list:
-        diagnosis: list[DiagnosisData] | list = await self.repository.get_list(
+    ) -> str:
+        """The page as a JSON array rendered by postgres, it is sent as is
+        without being parsed and validated here"""
+        return await self.repository.get_list(
             session=session,
-            limit=pagination.limit,
-            offset=pagination.offset,
+            pagination=pagination,
             query_params=query_params,
         )
-        if not diagnosis:
-            return diagnosis
-        return [DiagnosisScheme.model_validate(d) for d in diagnosis]
 
     async def create(
         self, session: AsyncSession, data: DiagnosisCreateScheme
@@ -234,7 +261,6 @@ class DiagnosisService:
     async def update(
         self, session: AsyncSession, data: DiagnosisCreateScheme, id: int
     ) -> DiagnosisCreateScheme:
-        await self._check_exists(id=id, session=session)
         await self._check_client_exists(id=data.client, session=session)
         await self._check_doctor_exists(id=data.doctor, session=session)
         diagnosis = await self.repository.update(
@@ -242,11 +268,12 @@ class DiagnosisService:
             data=DiagnosisCreateData(**data.model_dump()),
             id=id,
         )
+        if not diagnosis:
+            raise NotFoundEx(detail=f"Diagnosis with id: {id} not found")
         return DiagnosisCreateScheme.model_validate(diagnosis)
 
     async def delete(self, id: int, session: AsyncSession) -> None:
-        await self._check_exists(id=id, session=session)
         deleted = await self.repository.delete(session=session, id=id)
         if not deleted:
-            raise BadRequestEx(detail="Failed to delete a diagnosis")
+            raise NotFoundEx(detail=f"Diagnosis with id: {id} not found")
         return None
@@ -0,0 +1,41 @@
+"""Обслуживание помесячных партиций записей на приём.
+
+    python -m src.doctor_app.cli --ahead 12
+    python -m src.doctor_app.cli --retain 24 --archive-schema archive
+    python -m src.doctor_app.cli --retain 24 --drop
+"""
+import argparse
+import asyncio
+import json
+from typing import Final, Optional
+
+from src.doctor_app.dependencies import appointment_partition_service
+from src.engine import async_session_factory
+
+
+PARTITIONS_AHEAD: Final[int] = 12
+
+
+async def main(
+    ahead: int, retain: Optional[int], schema: Optional[str], drop: bool
+) -> None:
+    async with async_session_factory() as session:
+        report = await appointment_partition_service().maintain(
+            session=session,
+            ahead=ahead,
+            retain=retain,
+            schema=schema,
+            drop=drop,
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Maintain appointment partitions')
+    parser.add_argument('--ahead', type=int, default=PARTITIONS_AHEAD)
+    parser.add_argument('--retain', type=int, default=None)
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument('--archive-schema', default=None)
+    archive.add_argument('--drop', action='store_true')
+    args = parser.parse_args()
+    asyncio.run(main(args.ahead, args.retain, args.archive_schema, args.drop))
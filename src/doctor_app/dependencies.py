@@ -1,7 +1,15 @@
 from datetime import datetime
 from typing import Optional
-from src.doctor_app.repositories import DoctorRepository, DoctorAppointmentRepository
-from src.doctor_app.services import AppointmentService, DoctorService
+from src.doctor_app.repositories import (
+    AppointmentPartitionRepository,
+    DoctorRepository,
+    DoctorAppointmentRepository,
+)
+from src.doctor_app.services import (
+    AppointmentPartitionService,
+    AppointmentService,
+    DoctorService,
+)
 
 
 def doctor_service() -> DoctorService:
@@ -9,3 +17,8 @@ def doctor_service() -> DoctorService:
 
 def appointment_service() -> AppointmentService:
     return AppointmentService(repository=DoctorAppointmentRepository())
+
+def appointment_partition_service() -> AppointmentPartitionService:
+    return AppointmentPartitionService(
+        repository=AppointmentPartitionRepository()
+    )
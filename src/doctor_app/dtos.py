@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import TypedDict
+from typing import Literal, Optional, TypedDict
 
 
 class DoctorDataCreate(TypedDict):
@@ -20,6 +20,8 @@ class DoctorProfession(TypedDict):
 class DoctorData(DoctorDataCreate):
     id: int
     profession: int
+    created_at: datetime
+    updated_at: datetime
 
 
 class DoctorDetailData(DoctorData):
@@ -38,6 +40,38 @@ class AppointmentResponse(AppointmentDataCreate):
     updated_at: datetime
 
 
+class AppointmentPeriod(TypedDict):
+    # None once the doctor is deleted
+    doctor: Optional[int]
+    start_date_appointment: datetime
+    end_date_appointment: datetime
+
+
+class PartitionReport(TypedDict):
+    created: list[str]
+    # rows moved out of the default partition into the created ones
+    moved: int
+    detached: list[str]
+
+
+class AppointmentWriteResult(TypedDict):
+    # the first check the write failed, 'written' when it passed them all
+    status: Literal[
+        'written',
+        'not_found',
+        'doctor_not_found',
+        'client_not_found',
+        'modified',
+        'invalid_period',
+        'doctor_busy',
+        'client_busy',
+    ]
+    conflict_id: Optional[int]
+    # what an updated appointment was before the update
+    previous: Optional[AppointmentPeriod]
+    appointment: Optional[AppointmentResponse]
+
+
 class DoctorAppointmentInfo(TypedDict):
     id: int
     first_name: str
@@ -2,7 +2,15 @@ __all__ = ["Doctor", "DoctorAppointment"]
 from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import Date, ForeignKey, UniqueConstraint
+from sqlalchemy import (
+    CheckConstraint,
+    Computed,
+    Date,
+    ForeignKey,
+    Index,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import TSRANGE, Range
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.models import Base, BaseUser
@@ -15,6 +23,18 @@ class Doctor(BaseUser):
         UniqueConstraint(
             "first_name", "last_name", "middle_name", name="uq_doctor_names"
         ),
+        Index("ix_doctors_created_at_id", "created_at", "id"),
+        Index("ix_doctors_first_name_id", "first_name", "id"),
+        Index("ix_doctors_last_name_id", "last_name", "id"),
+        *(
+            Index(
+                f"ix_doctors_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+            for column in ("first_name", "last_name", "middle_name")
+        ),
     )
 
     date_start_work: Mapped[date] = mapped_column(Date)
@@ -32,13 +52,51 @@ class Doctor(BaseUser):
 class DoctorAppointment(Base):
     __tablename__ = "appointments"
 
-    start_date_appointment: Mapped[datetime]
+    __table_args__ = (
+        Index(
+            "ix_appointments_start_date_appointment_id",
+            "start_date_appointment",
+            "id",
+        ),
+        # the lists of a doctor or a client are filtered and ordered by
+        # these, the end date lets the period filter skip the table
+        *(
+            Index(
+                f"ix_appointments_{column}_start_date_appointment_id",
+                column,
+                "start_date_appointment",
+                "id",
+                postgresql_include=["end_date_appointment"],
+            )
+            for column in ("doctor_id", "client_id")
+        ),
+        CheckConstraint(
+            "start_date_appointment < end_date_appointment",
+            name="period_valid",
+        ),
+        # partitioned by month, every partition carries its own exclusion
+        # constraints on the doctor and the client periods
+        {"postgresql_partition_by": "RANGE (start_date_appointment)"},
+    )
+
+    # the partition key has to be a part of the primary key
+    start_date_appointment: Mapped[datetime] = mapped_column(primary_key=True)
     end_date_appointment: Mapped[datetime]
+    period: Mapped[Range[datetime]] = mapped_column(
+        TSRANGE,
+        Computed(
+            # NULL instead of a range error so the check constraint reports it
+            "CASE WHEN start_date_appointment < end_date_appointment "
+            "THEN tsrange(start_date_appointment, end_date_appointment, '[)') END",
+            persisted=True,
+        ),
+        deferred=True,
+    )
     doctor_id: Mapped[Optional[int]] = mapped_column(
-        ForeignKey("doctors.id", ondelete="SET NULl"), index=True, nullable=True
+        ForeignKey("doctors.id", ondelete="SET NULl"), nullable=True
     )
     client_id: Mapped[Optional[int]] = mapped_column(
-        ForeignKey("clients.id", ondelete="SET NULl"), index=True, nullable=True
+        ForeignKey("clients.id", ondelete="SET NULl"), nullable=True
     )
     doctor: Mapped["Doctor"] = relationship(back_populates="appointments")
     client: Mapped["Client"] = relationship(back_populates="appointments")
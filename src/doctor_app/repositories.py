@@ -1,21 +1,190 @@
+import csv
+import io
 from abc import ABC, abstractmethod
-from datetime import datetime
-from typing import Any, Optional
-from sqlalchemy import text
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from typing import Any, Final, Optional
+from sqlalchemy import Row, text
 
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
 from src.doctor_app.dtos import (
     AppointmentData,
     AppointmentDataCreate,
+    AppointmentPeriod,
     AppointmentResponse,
+    AppointmentWriteResult,
     DoctorData,
     DoctorDataCreate,
     DoctorDetailData,
     DoctorProfession,
 )
+from src.doctor_app.slots import Period
 from src.exceptions import BadRequestEx
-from src.dependencies import QueryParams, QueryParamsAppointment
+from src.utils import escape_like
+from src.queries import queries
+from src.dependencies import (
+    Keyset,
+    Paginator,
+    QueryParams,
+    QueryParamsAppointment,
+)
+
+
+DOCTOR_ORDERING: Final[dict[str, tuple[str, type]]] = {
+    'created_at': ('d.created_at', datetime),
+    'first_name': ('d.first_name', str),
+    'last_name': ('d.last_name', str),
+}
+
+# Best similarity of the search term to any of the names, the search is
+# served by the trigram indexes on every name column
+DOCTOR_RANK: Final[str] = (
+    'GREATEST(similarity(d.last_name, :term), '
+    'similarity(d.first_name, :term), similarity(d.middle_name, :term))'
+)
+
+# A doctor in the shape of DoctorDetailScheme rendered by postgres
+DOCTOR_JSON: Final[str] = (
+    "json_build_object('firstName', d.first_name, 'lastName', d.last_name, "
+    "'middleName', d.middle_name, 'avatar', d.avatar, "
+    "'dateBirthday', d.date_birthday, 'dateStartWork', d.date_start_work, "
+    "'profession', json_build_object('id', p.id, 'name', p.name), "
+    "'id', d.id, 'createdAt', d.created_at, 'updatedAt', d.updated_at)"
+)
+
+APPOINTMENT_ORDERING: Final[dict[str, tuple[str, type]]] = {
+    'start_date_appointment': ('m.start_date_appointment', datetime),
+    'end_date_appointment': ('m.end_date_appointment', datetime),
+}
+
+APPOINTMENT_EXPORT_BATCH: Final[int] = 1000
+# An appointment in the shape of AppointmentScheme rendered by postgres,
+# for the list pages and the ndjson export
+APPOINTMENT_JSON: Final[str] = (
+    "json_build_object('startDateAppointment', m.start_date_appointment, "
+    "'endDateAppointment', m.end_date_appointment, "
+    "'doctor', json_build_object('firstName', d.first_name, "
+    "'lastName', d.last_name, 'middleName', d.middle_name, "
+    "'avatar', d.avatar, 'dateBirthday', d.date_birthday, 'id', d.id), "
+    "'client', json_build_object('firstName', c.first_name, "
+    "'lastName', c.last_name, 'middleName', c.middle_name, "
+    "'avatar', c.avatar, 'dateBirthday', c.date_birthday, 'id', c.id), "
+    "'id', m.id, 'createdAt', m.created_at, 'updatedAt', m.updated_at)"
+)
+APPOINTMENT_EXPORT_COLUMNS: Final[dict[str, str]] = {
+    'id': 'm.id',
+    'start_date_appointment': 'm.start_date_appointment',
+    'end_date_appointment': 'm.end_date_appointment',
+    'doctor_id': 'd.id',
+    'doctor_first_name': 'd.first_name',
+    'doctor_last_name': 'd.last_name',
+    'doctor_middle_name': 'd.middle_name',
+    'client_id': 'c.id',
+    'client_first_name': 'c.first_name',
+    'client_last_name': 'c.last_name',
+    'client_middle_name': 'c.middle_name',
+    'created_at': 'm.created_at',
+    'updated_at': 'm.updated_at',
+}
+
+# Checks of a single appointment write, the write is guarded by them and
+# APPOINTMENT_RELATED_STATUS tells which one failed, so the whole booking is
+# one round trip. ``:id`` is the appointment being updated, NULL on create.
+# The conflict lookup is served by the exclusion constraint indexes, its
+# range is kept valid for a reversed period which the status reports.
+APPOINTMENT_WRITE_CHECKS: Final[str] = """
+    doctor AS (SELECT d.id FROM doctors d WHERE d.id = :doctor),
+    client AS (SELECT c.id FROM clients c WHERE c.id = :client),
+    conflict AS (
+        SELECT m.id, m.doctor_id = :doctor AS doctor_busy
+        FROM appointments m
+        WHERE (m.doctor_id = :doctor OR m.client_id = :client)
+            AND m.period && tsrange(
+                LEAST(
+                    CAST(:start_date_appointment AS timestamp),
+                    CAST(:end_date_appointment AS timestamp)
+                ),
+                GREATEST(
+                    CAST(:start_date_appointment AS timestamp),
+                    CAST(:end_date_appointment AS timestamp)
+                ),
+                '[)'
+            )
+            AND m.start_date_appointment < GREATEST(
+                CAST(:start_date_appointment AS timestamp),
+                CAST(:end_date_appointment AS timestamp)
+            )
+            AND m.id IS DISTINCT FROM CAST(:id AS integer)
+        ORDER BY m.doctor_id = :doctor DESC, m.start_date_appointment
+        LIMIT 1
+    )
+"""
+# Exclusion constraints guard a single partition only, the writes of a
+# doctor or a client are serialized by transaction advisory locks taken
+# before the conflict lookup, so it sees every appointment committed before.
+# The ids are hashed into buckets, (1, doctor id % buckets) and (2, client
+# id % buckets): a batch of thousands of rows takes at most twice as many
+# locks as there are buckets out of the shared lock table. Taken in (kind,
+# bucket) order, two writes never wait for each other the other way round.
+APPOINTMENT_LOCK_BUCKETS: Final[int] = 256
+APPOINTMENT_WRITE_LOCKS: Final[str] = f"""
+    SELECT pg_advisory_xact_lock(k.kind, k.bucket)
+    FROM (
+        SELECT DISTINCT kind, id % {APPOINTMENT_LOCK_BUCKETS} AS bucket
+        FROM (
+            SELECT 1 AS kind, unnest(CAST(:doctors AS integer[])) AS id
+            UNION ALL
+            SELECT 2, unnest(CAST(:clients AS integer[]))
+        ) i
+        WHERE id IS NOT NULL
+    ) k
+    ORDER BY k.kind, k.bucket
+"""
+APPOINTMENT_WRITE_GUARD: Final[str] = """
+    EXISTS (SELECT 1 FROM doctor)
+    AND EXISTS (SELECT 1 FROM client)
+    AND CAST(:start_date_appointment AS timestamp)
+        < CAST(:end_date_appointment AS timestamp)
+    AND NOT EXISTS (SELECT 1 FROM conflict)
+"""
+APPOINTMENT_RELATED_STATUS: Final[str] = """
+    WHEN NOT EXISTS (SELECT 1 FROM doctor) THEN 'doctor_not_found'
+    WHEN NOT EXISTS (SELECT 1 FROM client) THEN 'client_not_found'
+"""
+APPOINTMENT_PERIOD_STATUS: Final[str] = """
+    WHEN CAST(:start_date_appointment AS timestamp)
+        >= CAST(:end_date_appointment AS timestamp) THEN 'invalid_period'
+    WHEN conflict.doctor_busy THEN 'doctor_busy'
+    WHEN conflict.id IS NOT NULL THEN 'client_busy'
+    ELSE 'written'
+"""
+APPOINTMENT_WRITE_RETURNING: Final[str] = (
+    'RETURNING id, created_at, updated_at, start_date_appointment, '
+    'end_date_appointment, doctor_id, client_id '
+)
+
+# appointments is partitioned by month of start_date_appointment, rows of
+# the months without a partition go to the default one
+APPOINTMENT_PARTITION_FORMAT: Final[str] = 'appointments_y%Ym%m'
+APPOINTMENT_DEFAULT_PARTITION: Final[str] = 'appointments_default'
+APPOINTMENT_COLUMNS: Final[str] = (
+    'id, created_at, updated_at, start_date_appointment, '
+    'end_date_appointment, doctor_id, client_id'
+)
+# Exclusion constraints can not span partitions, every partition has its
+# own, named ex_<partition>_<suffix>
+APPOINTMENT_PARTITION_EXCLUSIONS: Final[dict[str, str]] = {
+    'doctor_period': 'doctor_id WITH =, period WITH &&',
+    'client_period': 'client_id WITH =, period WITH &&',
+}
+
+# A batch of appointments passed as one array per column
+APPOINTMENT_BATCH: Final[str] = (
+    'unnest(CAST(:start_date_appointment AS timestamp[]), '
+    'CAST(:end_date_appointment AS timestamp[]), '
+    'CAST(:doctor AS integer[]), CAST(:client AS integer[])) '
+)
 
 
 class IDoctorRepository(ABC):
@@ -25,14 +194,40 @@ class IDoctorRepository(ABC):
     ) -> Optional[DoctorData]:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def get_updated_at(
+        self, id: int, session: AsyncSession
+    ) -> Optional[datetime]:
+        raise NotImplementedError()
+
     @abstractmethod
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
-    ) -> list[DoctorData] | list:
+    ) -> str:
+        """The page as a JSON array of DoctorDetailScheme"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_busy_periods(
+        self,
+        ids: list[int],
+        start: datetime,
+        end: datetime,
+        session: AsyncSession,
+    ) -> dict[int, list[Period]]:
+        """Appointments of the doctors overlapping [start, end) sorted by
+        their start, keyed by the doctor id. Doctors that do not exist are
+        left out."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_profession_doctor_ids(
+        self, profession_id: int, session: AsyncSession
+    ) -> Optional[list[int]]:
+        """``None`` when there is no such profession"""
         raise NotImplementedError()
 
     @abstractmethod
@@ -47,8 +242,12 @@ class IDoctorRepository(ABC):
 
     @abstractmethod
     async def update(
-        self, data: DoctorDataCreate, session: AsyncSession, id: int
-    ) -> DoctorData:
+        self,
+        data: DoctorDataCreate,
+        session: AsyncSession,
+        id: int,
+        versions: Optional[list[datetime]] = None,
+    ) -> Optional[DoctorData]:
         raise NotImplementedError()
 
 
@@ -65,30 +264,80 @@ class IDoctorAppointmentRepository(ABC):
     ) -> Optional[AppointmentData]:
         raise NotImplementedError()
 
+    @abstractmethod
+    async def get_updated_at(
+        self, id: int, session: AsyncSession
+    ) -> Optional[datetime]:
+        raise NotImplementedError()
+
     @abstractmethod
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParamsAppointment,
-    ) -> list[AppointmentData] | list:
+    ) -> str:
+        """The page as a JSON array of AppointmentScheme"""
         raise NotImplementedError()
 
     @abstractmethod
-    async def delete(self, id: int, session: AsyncSession) -> bool:
+    def export(
+        self,
+        session: AsyncSession,
+        query_params: QueryParamsAppointment,
+        format: str,
+    ) -> AsyncIterator[str]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def delete(
+        self, id: int, session: AsyncSession
+    ) -> Optional[AppointmentPeriod]:
+        """The period of the deleted appointment, ``None`` if there was none"""
         raise NotImplementedError()
 
     @abstractmethod
     async def create(
         self, data: AppointmentDataCreate, session: AsyncSession
-    ) -> AppointmentResponse:
+    ) -> AppointmentWriteResult:
         raise NotImplementedError()
 
     @abstractmethod
     async def update(
-        self, data: AppointmentDataCreate, session: AsyncSession, id: int
-    ) -> AppointmentData:
+        self,
+        data: AppointmentDataCreate,
+        session: AsyncSession,
+        id: int,
+        versions: Optional[list[datetime]] = None,
+    ) -> AppointmentWriteResult:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_existing_related_ids(
+        self, doctors: list[int], clients: list[int], session: AsyncSession
+    ) -> tuple[set[int], set[int]]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_batch_conflicts(
+        self, data: list[AppointmentDataCreate], session: AsyncSession
+    ) -> dict[int, tuple[str, int]]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def bulk_create(
+        self, data: list[AppointmentDataCreate], session: AsyncSession
+    ) -> list[AppointmentResponse]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_conflicting_id(
+        self,
+        data: AppointmentDataCreate,
+        session: AsyncSession,
+        column: str,
+        exclude_id: Optional[int] = None,
+    ) -> Optional[int]:
         raise NotImplementedError()
 
 
@@ -101,7 +350,7 @@ class DoctorRepository(IDoctorRepository):
                 SELECT 
                     d.id, d.first_name, d.last_name,
                     d.middle_name, d.date_start_work, 
-                    d.date_birthday, d.avatar,
+                    d.date_birthday, d.avatar, d.created_at, d.updated_at,
                     json_build_object('name', p.name, 'id', p.id) as profession
                 FROM doctors d
                 LEFT JOIN professions p ON d.profession_id=p.id
@@ -121,6 +370,8 @@ class DoctorRepository(IDoctorRepository):
             date_start_work,
             date_birthday,
             avatar,
+            created_at,
+            updated_at,
             profession,
         ) = row
         return DoctorDetailData(
@@ -131,85 +382,130 @@ class DoctorRepository(IDoctorRepository):
             middle_name=middle_name,
             date_birthday=date_birthday,
             avatar=avatar,
+            created_at=created_at,
+            updated_at=updated_at,
             profession=DoctorProfession(profession),
         )
 
+    async def get_updated_at(
+        self, id: int, session: AsyncSession
+    ) -> Optional[datetime]:
+        query = text('SELECT d.updated_at FROM doctors d WHERE d.id=:id')
+        result = await session.execute(query, {'id': id})
+        return result.scalar()
+
     async def get_list(
         self,
-        limit: int,
-        offset: int,
         session: AsyncSession,
+        pagination: Paginator,
         query_params: QueryParams,
-    ) -> list[DoctorData] | list:
+    ) -> str:
         search = ''
-        order = ''
-        params: dict[str, Any] = {'limit': limit, 'offset': offset}
+        params: dict[str, Any] = {}
+        ordering = DOCTOR_ORDERING
 
         if query_params.search:
-            search = 'WHERE d.first_name OR d.last_name OR d.middle_name LIKE :search '
-            params['search'] = query_params.search
-
-        if query_params.order:
-            match query_params.order:
-                case 'created_at':
-                    order = 'ORDER BY d.created_at ASC '
-                case '-created_at':
-                    order = 'ORDER BY d.created_at DESC '
-                case 'first_name':
-                    order = 'ORDER BY d.first_name ASC '
-                case 'last_name':
-                    order = 'ORDER BY d.last_name ASC '
-                case '_':
-                    pass
-
-        query = (
+            search = (
+                'WHERE (d.last_name ILIKE :search OR d.first_name ILIKE :search '
+                'OR d.middle_name ILIKE :search) '
+            )
+            params['search'] = f'%{escape_like(query_params.search)}%'
+            params['term'] = query_params.search
+            ordering = {**DOCTOR_ORDERING, 'rank': (DOCTOR_RANK, float)}
+
+        keyset = Keyset(
+            pagination=pagination,
+            order=query_params.order,
+            columns=ordering,
+            id_column='d.id',
+            default='-rank' if query_params.search else '',
+        )
+
+        total = keyset.total('doctors', 'd', search)
+        if seek := keyset.where(params):
+            search += f'AND {seek} ' if search else f'WHERE {seek} '
+
+        limit = keyset.limit(params)
+        query = queries.get(
+            'doctors.list',
+            (bool(query_params.search), keyset.shape),
+            lambda: keyset.json_page(
+                f'SELECT d.id, {DOCTOR_JSON} AS body '
+                f'{keyset.select}'
+                f'{keyset.row_number}'
+                """
+                FROM doctors d
+                LEFT JOIN professions p
+                    ON d.profession_id=p.id
+                """
+                f'{search}'
+                f'{keyset.order_by}'
+                f'{limit}',
+                total,
+            ),
+        )
+        result = await session.execute(query, params)
+        return keyset.json_body(result.one())
+
+    async def get_busy_periods(
+        self,
+        ids: list[int],
+        start: datetime,
+        end: datetime,
+        session: AsyncSession,
+    ) -> dict[int, list[Period]]:
+        # The doctor rows tell a doctor without appointments from a missing
+        # one, the periods are found by the exclusion constraint index
+        query = text(
             """
-            SELECT 
-                d.id, d.first_name, d.last_name,
-                d.middle_name, d.date_start_work, d.date_birthday, d.avatar,
-                json_build_object('name', p.name, 'id', p.id) as profession
+            SELECT d.id, m.start_date_appointment, m.end_date_appointment
             FROM doctors d
-            LEFT JOIN professions p
-                ON d.profession_id=p.id
+            LEFT JOIN appointments m
+                ON m.doctor_id = d.id
+                AND m.period && tsrange(
+                    CAST(:start AS timestamp), CAST(:end AS timestamp), '[)'
+                )
+                AND m.start_date_appointment < CAST(:end AS timestamp)
+            WHERE d.id = ANY(:ids)
+            ORDER BY d.id, m.start_date_appointment
             """
-            f'{search}'
-            f'{order}'
-            'LIMIT :limit OFFSET :offset '
         )
-        result = await session.execute(text(query), params)
-        rows = result.fetchall()
-        doctors = []
+        result = await session.execute(
+            query, {'ids': ids, 'start': start, 'end': end}
+        )
+        busy: dict[int, list[Period]] = {}
+        for doctor_id, period_start, period_end in result:
+            periods = busy.setdefault(doctor_id, [])
+            if period_start is not None:
+                periods.append((period_start, period_end))
+        return busy
 
-        for row in rows:
-            (
-                id,
-                first_name,
-                last_name,
-                middle_name,
-                date_start_work,
-                date_birthday,
-                avatar,
-                profession,
-            ) = row
-            doctors.append(
-                DoctorData(
-                    first_name=first_name,
-                    id=id,
-                    last_name=last_name,
-                    middle_name=middle_name,
-                    date_start_work=date_start_work,
-                    date_birthday=date_birthday,
-                    avatar=avatar,
-                    profession=profession,
-                )
-            )
-        return doctors
+    async def get_profession_doctor_ids(
+        self, profession_id: int, session: AsyncSession
+    ) -> Optional[list[int]]:
+        query = text(
+            """
+            SELECT d.id
+            FROM professions p
+            LEFT JOIN doctors d ON d.profession_id = p.id
+            WHERE p.id = :profession_id
+            ORDER BY d.id
+            """
+        )
+        result = await session.execute(
+            query, {'profession_id': profession_id}
+        )
+        rows = result.fetchall()
+        if not rows:
+            return None
+        return [id for id, in rows if id is not None]
 
     async def delete(self, id: int, session: AsyncSession) -> bool:
-        query = text('DELETE FROM doctors WHERE id=:id')
-        await session.execute(query, {'id': id})
+        query = text('DELETE FROM doctors WHERE id=:id RETURNING id')
+        result = await session.execute(query, {'id': id})
+        deleted = result.scalar() is not None
         await session.commit()
-        return True
+        return deleted
 
     async def create(
         self, data: DoctorDataCreate, session: AsyncSession
@@ -228,7 +524,8 @@ class DoctorRepository(IDoctorRepository):
             )
             RETURNING 
                 id, first_name, last_name, middle_name, 
-                date_start_work, profession_id, date_birthday, avatar
+                date_start_work, profession_id, date_birthday, avatar,
+                created_at, updated_at
             """
         )
         data['avatar'] = str(data['avatar'])
@@ -246,6 +543,8 @@ class DoctorRepository(IDoctorRepository):
             profession_id,
             date_birthday,
             avatar,
+            created_at,
+            updated_at,
         ) = row
         return DoctorData(
             first_name=first_name,
@@ -256,31 +555,51 @@ class DoctorRepository(IDoctorRepository):
             profession=profession_id,
             date_birthday=date_birthday,
             avatar=avatar,
+            created_at=created_at,
+            updated_at=updated_at,
         )
 
     async def update(
-        self, id: int, data: DoctorDataCreate, session: AsyncSession
-    ) -> DoctorData:
-        query = text(
-            """
-            UPDATE doctors 
-                SET first_name=:first_name,
-                    last_name=:last_name, 
-                    middle_name=:middle_name, 
-                    date_start_work=:date_start_work, 
-                    updated_at=now(),
-                    profession_id=:profession,
-                    date_birthday=:date_birthday,
-                    avatar=:avatar
-            WHERE id=:id 
-            RETURNING id, first_name, last_name, middle_name, date_start_work, profession_id, date_birthday, avatar
-            """
-        )
+        self,
+        id: int,
+        data: DoctorDataCreate,
+        session: AsyncSession,
+        versions: Optional[list[datetime]] = None,
+    ) -> Optional[DoctorData]:
         data['avatar'] = str(data['avatar'])
-        result = await session.execute(query, {'id': id, **data})
+        params: dict[str, Any] = {'id': id, **data}
+        version = ''
+        if versions is not None:
+            version = 'AND updated_at = ANY(:versions) '
+            params['versions'] = versions
+        query = queries.get(
+            'doctors.update',
+            bool(version),
+            lambda: (
+                """
+                UPDATE doctors 
+                    SET first_name=:first_name,
+                        last_name=:last_name, 
+                        middle_name=:middle_name, 
+                        date_start_work=:date_start_work, 
+                        updated_at=now(),
+                        profession_id=:profession,
+                        date_birthday=:date_birthday,
+                        avatar=:avatar
+                WHERE id=:id 
+                """
+                f'{version}'
+                """
+                RETURNING
+                    id, first_name, last_name, middle_name, date_start_work,
+                    profession_id, date_birthday, avatar, created_at, updated_at
+                """
+            ),
+        )
+        result = await session.execute(query, params)
         row = result.fetchone()
         if not row:
-            raise BadRequestEx(detail='Failed to update a profession')
+            return None
         (
             _,
             first_name,
@@ -290,6 +609,8 @@ class DoctorRepository(IDoctorRepository):
             profession_id,
             date_birthday,
             avatar,
+            created_at,
+            updated_at,
         ) = row
         await session.commit()
         return DoctorData(
@@ -301,6 +622,8 @@ class DoctorRepository(IDoctorRepository):
             profession=profession_id,
             date_birthday=date_birthday,
             avatar=avatar,
+            created_at=created_at,
+            updated_at=updated_at,
         )
 
 
@@ -344,7 +667,7 @@ class DoctorAppointmentRepository(IDoctorAppointmentRepository):
             SELECT 
                 m.id, m.start_date_appointment, m.end_date_appointment, 
                 json_build_object('first_name', c.first_name, 'id', c.id, 'last_name', c.last_name, 'middle_name', c.middle_name, 'avatar', c.avatar) as client,
-                json_build_object('first_name', d.first_name, 'id', d.id, 'last_name', d.last_name, 'middle_name', d.middle_name, 'avatar', c.avatar) as doctor,
+                json_build_object('first_name', d.first_name, 'id', d.id, 'last_name', d.last_name, 'middle_name', d.middle_name, 'avatar', d.avatar) as doctor,
                 m.created_at, m.updated_at
             FROM appointments m
             INNER JOIN doctors d ON m.doctor_id = d.id
@@ -360,8 +683,8 @@ class DoctorAppointmentRepository(IDoctorAppointmentRepository):
             id,
             start_date_appointment,
             end_date_appointment,
-            doctor,
             client,
+            doctor,
             created_at,
             updated_at,
         ) = row
@@ -375,32 +698,19 @@ class DoctorAppointmentRepository(IDoctorAppointmentRepository):
             client=client,
         )
 
-    async def get_list(
-        self,
-        session: AsyncSession,
-        limit: int,
-        offset: int,
-        query_params: 'QueryParamsAppointment',
-    ) -> list[AppointmentData] | list:
-        order = ''
-        params: dict[str, Any] = {'limit': limit, 'offset': offset}
-        filter = ''
-
-        if query_params.order:
-            match query_params.order:
-                case 'start_date_appointment':
-                    order = 'ORDER BY m.start_date_appointment ASC '
-                case '-start_date_appointment':
-                    order = 'ORDER BY m.start_date_appointment DESC '
-                case 'end_date_appointment':
-                    order = 'ORDER BY m.end_date_appointment ASC '
-                case '-end_date_appointment':
-                    order = 'ORDER BY m.end_date_appointment DESC '
-                case '_':
-                    pass
-
+    @staticmethod
+    def _filters(
+        query_params: QueryParamsAppointment, params: dict[str, Any]
+    ) -> list[str]:
+        filters = []
         if query_params.start_date and query_params.end_date:
-            filter += ' WHERE m.start_date_appointment >= :start_date AND m.end_date_appointment <= :end_date'
+            # start < :end_date follows from the end bound, it is spelled
+            # out so the monthly partitions past the range are skipped
+            filters.append(
+                'm.start_date_appointment >= :start_date '
+                'AND m.start_date_appointment < :end_date '
+                'AND m.end_date_appointment <= :end_date'
+            )
             params['start_date'] = datetime.fromisoformat(
                 query_params.start_date.strftime('%Y-%m-%dT%H:%M:%S')
             )
@@ -408,144 +718,513 @@ class DoctorAppointmentRepository(IDoctorAppointmentRepository):
                 query_params.end_date.strftime('%Y-%m-%dT%H:%M:%S')
             )
 
-        if query_params.doctor and not filter:
-            filter += ' WHERE m.doctor_id = :doctor_id '
+        if query_params.doctor:
+            filters.append('m.doctor_id = :doctor_id')
             params['doctor_id'] = query_params.doctor
 
-        if query_params.doctor and filter:
-            filter += ' AND m.doctor_id = :doctor_id '
-            params['doctor_id'] = query_params.doctor
-
-        if query_params.doctor and not filter:
-            filter += ' WHERE m.client_id = :client_id '
+        if query_params.client:
+            filters.append('m.client_id = :client_id')
             params['client_id'] = query_params.client
+        return filters
 
-        if query_params.doctor and filter:
-            filter += ' AND m.client_id = :client_id '
-            params['client_id'] = query_params.client
+    async def get_updated_at(
+        self, id: int, session: AsyncSession
+    ) -> Optional[datetime]:
+        query = text('SELECT m.updated_at FROM appointments m WHERE m.id=:id')
+        result = await session.execute(query, {'id': id})
+        return result.scalar()
 
-        query = (
-            """
-            SELECT 
-                m.id, m.start_date_appointment, m.end_date_appointment, 
-                json_build_object('first_name', c.first_name, 'id', c.id, 'last_name', c.last_name, 'middle_name', c.middle_name, 'avatar', c.avatar) as client,
-                json_build_object('first_name', d.first_name, 'id', d.id, 'last_name', d.last_name, 'middle_name', d.middle_name, 'avatar', c.avatar) as doctor,
-                m.created_at, m.updated_at
-            FROM appointments m
-            INNER JOIN doctors d ON m.doctor_id = d.id
-            INNER JOIN clients c ON m.client_id = c.id
+    async def get_list(
+        self,
+        session: AsyncSession,
+        pagination: Paginator,
+        query_params: 'QueryParamsAppointment',
+    ) -> str:
+        params: dict[str, Any] = {}
+        filters = self._filters(query_params=query_params, params=params)
+        keyset = Keyset(
+            pagination=pagination,
+            order=query_params.order,
+            columns=APPOINTMENT_ORDERING,
+            id_column='m.id',
+            default='start_date_appointment',
+        )
+
+        total = keyset.total(
+            'appointments',
+            'm',
+            f'WHERE {" AND ".join(filters)} ' if filters else '',
+        )
+        if seek := keyset.where(params):
+            filters.append(seek)
+
+        filter = f'WHERE {" AND ".join(filters)} ' if filters else ''
+        limit = keyset.limit(params)
+        query = queries.get(
+            'appointments.list',
+            (tuple(filters), keyset.shape),
+            lambda: keyset.json_page(
+                f'SELECT m.id, {APPOINTMENT_JSON} AS body '
+                f'{keyset.select}'
+                f'{keyset.row_number}'
+                """
+                FROM appointments m
+                INNER JOIN doctors d ON m.doctor_id = d.id
+                INNER JOIN clients c ON m.client_id = c.id
+                """
+                f'{filter}'
+                f'{keyset.order_by}'
+                f'{limit}',
+                total,
+            ),
+        )
+        result = await session.execute(query, params)
+        return keyset.json_body(result.one())
+
+    async def export(
+        self,
+        session: AsyncSession,
+        query_params: QueryParamsAppointment,
+        format: str,
+    ) -> AsyncIterator[str]:
+        """Every appointment matching the filters, read through a server
+        side cursor and yielded as text one batch of rows at a time"""
+        params: dict[str, Any] = {}
+        filters = self._filters(query_params=query_params, params=params)
+        filter = f'WHERE {" AND ".join(filters)} ' if filters else ''
+        columns = (
+            f'{APPOINTMENT_JSON}::text'
+            if format == 'ndjson'
+            else ', '.join(APPOINTMENT_EXPORT_COLUMNS.values())
+        )
+        query = queries.get(
+            'appointments.export',
+            (tuple(filters), format),
+            lambda: (
+                f'SELECT {columns} '
+                'FROM appointments m '
+                'INNER JOIN doctors d ON m.doctor_id = d.id '
+                'INNER JOIN clients c ON m.client_id = c.id '
+                f'{filter}'
+                'ORDER BY m.start_date_appointment, m.id'
+            ),
+        )
+        result = await session.stream(
+            query,
+            params,
+            execution_options={'yield_per': APPOINTMENT_EXPORT_BATCH},
+        )
+        if format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(APPOINTMENT_EXPORT_COLUMNS)
+            yield buffer.getvalue()
+        async for rows in result.partitions():
+            if format == 'ndjson':
+                yield ''.join(f'{line}\n' for (line,) in rows)
+                continue
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+
+    async def delete(
+        self, id: int, session: AsyncSession
+    ) -> Optional[AppointmentPeriod]:
+        query = text(
+            'DELETE FROM appointments WHERE id=:id '
+            'RETURNING doctor_id, start_date_appointment, end_date_appointment'
+        )
+        result = await session.execute(query, {'id': id})
+        row = result.one_or_none()
+        await session.commit()
+        if row is None:
+            return None
+        return AppointmentPeriod(
+            doctor=row.doctor_id,
+            start_date_appointment=row.start_date_appointment,
+            end_date_appointment=row.end_date_appointment,
+        )
+
+    @staticmethod
+    def _write_params(
+        data: AppointmentDataCreate, id: Optional[int]
+    ) -> dict[str, Any]:
+        return {
+            'id': id,
+            'doctor': data['doctor'],
+            'client': data['client'],
+            'start_date_appointment': datetime.fromisoformat(
+                data['start_date_appointment'].strftime('%Y-%m-%dT%H:%M:%S')
+            ),
+            'end_date_appointment': datetime.fromisoformat(
+                data['end_date_appointment'].strftime('%Y-%m-%dT%H:%M:%S')
+            ),
+        }
+
+    @staticmethod
+    async def _lock(
+        doctors: list[int], clients: list[int], session: AsyncSession
+    ) -> None:
+        """Wait for the other writes of the doctors and clients, held
+        until the transaction ends"""
+        await session.execute(
+            text(APPOINTMENT_WRITE_LOCKS),
+            {'doctors': doctors, 'clients': clients},
+        )
+
+    @staticmethod
+    def _write_result(row: Row) -> AppointmentWriteResult:
+        previous = None
+        if 'previous_start' in row._fields and row.previous_start:
+            previous = AppointmentPeriod(
+                doctor=row.previous_doctor_id,
+                start_date_appointment=row.previous_start,
+                end_date_appointment=row.previous_end,
+            )
+        appointment = None
+        if row.status == 'written':
+            appointment = AppointmentResponse(
+                id=row.id,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                start_date_appointment=row.start_date_appointment,
+                end_date_appointment=row.end_date_appointment,
+                doctor=row.doctor_id,
+                client=row.client_id,
+            )
+        return AppointmentWriteResult(
+            status=row.status,
+            conflict_id=row.conflict_id,
+            previous=previous,
+            appointment=appointment,
+        )
+
+    async def create(
+        self, data: AppointmentDataCreate, session: AsyncSession
+    ) -> AppointmentWriteResult:
+        query = text(
+            f"""
+            WITH {APPOINTMENT_WRITE_CHECKS},
+            written AS (
+                INSERT INTO appointments(
+                    created_at, updated_at, start_date_appointment,
+                    end_date_appointment, doctor_id, client_id
+                )
+                SELECT
+                    now(), now(), :start_date_appointment,
+                    :end_date_appointment, :doctor, :client
+                WHERE {APPOINTMENT_WRITE_GUARD}
+                {APPOINTMENT_WRITE_RETURNING}
+            )
+            SELECT
+                CASE {APPOINTMENT_RELATED_STATUS} {APPOINTMENT_PERIOD_STATUS}
+                END AS status,
+                conflict.id AS conflict_id,
+                written.*
+            FROM (VALUES (1)) AS one
+            LEFT JOIN conflict ON true
+            LEFT JOIN written ON true
             """
-            f'{filter} '
-            f'{order}'
-            'LIMIT :limit OFFSET :offset '
         )
-        result = await session.execute(text(query), params)
+        await self._lock(
+            doctors=[data['doctor']], clients=[data['client']], session=session
+        )
+        result = await session.execute(
+            query, self._write_params(data=data, id=None)
+        )
+        await session.commit()
+        return self._write_result(result.one())
+
+    async def update(
+        self,
+        id: int,
+        data: AppointmentDataCreate,
+        session: AsyncSession,
+        versions: Optional[list[datetime]] = None,
+    ) -> AppointmentWriteResult:
+        params = self._write_params(data=data, id=id)
+        version = 'true'
+        if versions is not None:
+            version = 'm.updated_at = ANY(:versions)'
+            params['versions'] = versions
+        query = queries.get(
+            'appointments.update',
+            versions is not None,
+            lambda: (
+                f"""
+                WITH target AS (
+                    SELECT
+                        m.id, {version} AS current,
+                        m.doctor_id, m.start_date_appointment,
+                        m.end_date_appointment
+                    FROM appointments m
+                    WHERE m.id = :id
+                    FOR UPDATE
+                ),
+                {APPOINTMENT_WRITE_CHECKS},
+                written AS (
+                    UPDATE appointments SET
+                        updated_at=now(),
+                        start_date_appointment=:start_date_appointment,
+                        end_date_appointment=:end_date_appointment,
+                        doctor_id=:doctor,
+                        client_id=:client
+                    WHERE id = (SELECT target.id FROM target WHERE target.current)
+                        AND {APPOINTMENT_WRITE_GUARD}
+                    {APPOINTMENT_WRITE_RETURNING}
+                )
+                SELECT
+                    CASE
+                        WHEN target.id IS NULL THEN 'not_found'
+                        {APPOINTMENT_RELATED_STATUS}
+                        WHEN NOT target.current THEN 'modified'
+                        {APPOINTMENT_PERIOD_STATUS}
+                    END AS status,
+                    conflict.id AS conflict_id,
+                    target.doctor_id AS previous_doctor_id,
+                    target.start_date_appointment AS previous_start,
+                    target.end_date_appointment AS previous_end,
+                    written.*
+                FROM (VALUES (1)) AS one
+                LEFT JOIN target ON true
+                LEFT JOIN conflict ON true
+                LEFT JOIN written ON true
+                """
+            ),
+        )
+        await self._lock(
+            doctors=[data['doctor']], clients=[data['client']], session=session
+        )
+        result = await session.execute(query, params)
+        await session.commit()
+        return self._write_result(result.one())
+
+    async def get_conflicting_id(
+        self,
+        data: AppointmentDataCreate,
+        session: AsyncSession,
+        column: str,
+        exclude_id: Optional[int] = None,
+    ) -> Optional[int]:
+        """Appointment of the doctor or client that overlaps data period"""
+        query = text(
+            'SELECT m.id FROM appointments m '
+            f'WHERE m.{column}_id = :owner '
+            "AND m.period && tsrange(:start_date_appointment, :end_date_appointment, '[)') "
+            'AND m.start_date_appointment < :end_date_appointment '
+            'AND m.id IS DISTINCT FROM :exclude_id '
+            'ORDER BY m.start_date_appointment LIMIT 1'
+        )
+        params = self._write_params(data=data, id=exclude_id)
+        result = await session.execute(
+            query,
+            {
+                'owner': data[column],
+                'start_date_appointment': params['start_date_appointment'],
+                'end_date_appointment': params['end_date_appointment'],
+                'exclude_id': exclude_id,
+            },
+        )
+        return result.scalar()
+
+    @staticmethod
+    def _batch_params(data: list[AppointmentDataCreate]) -> dict[str, list]:
+        return {
+            column: [item[column] for item in data]
+            for column in AppointmentDataCreate.__annotations__
+        }
+
+    async def get_existing_related_ids(
+        self, doctors: list[int], clients: list[int], session: AsyncSession
+    ) -> tuple[set[int], set[int]]:
+        query = text(
+            "SELECT 'doctor', d.id FROM doctors d WHERE d.id = ANY(:doctors) "
+            'UNION ALL '
+            "SELECT 'client', c.id FROM clients c WHERE c.id = ANY(:clients) "
+        )
+        result = await session.execute(
+            query, {'doctors': doctors, 'clients': clients}
+        )
+        existing: dict[str, set[int]] = {'doctor': set(), 'client': set()}
+        for column, id in result:
+            existing[column].add(id)
+        return existing['doctor'], existing['client']
+
+    async def get_batch_conflicts(
+        self, data: list[AppointmentDataCreate], session: AsyncSession
+    ) -> dict[int, tuple[str, int]]:
+        """Index of every item of the batch that overlaps a stored
+        appointment of its doctor or client, with that appointment id"""
+        query = text(
+            'WITH batch AS ( '
+            'SELECT b.*, b.idx - 1 AS position '
+            f'FROM {APPOINTMENT_BATCH}'
+            'WITH ORDINALITY AS b(start_date, end_date, doctor_id, client_id, idx) '
+            ') '
+            "SELECT b.position, 'doctor', min(m.id) FROM batch b "
+            'JOIN appointments m ON m.doctor_id = b.doctor_id '
+            "AND m.period && tsrange(b.start_date, b.end_date, '[)') "
+            'AND m.start_date_appointment < b.end_date '
+            'GROUP BY b.position '
+            'UNION ALL '
+            "SELECT b.position, 'client', min(m.id) FROM batch b "
+            'JOIN appointments m ON m.client_id = b.client_id '
+            "AND m.period && tsrange(b.start_date, b.end_date, '[)') "
+            'AND m.start_date_appointment < b.end_date '
+            'GROUP BY b.position '
+        )
+        result = await session.execute(query, self._batch_params(data))
+        conflicts: dict[int, tuple[str, int]] = {}
+        for position, column, conflict_id in result:
+            conflicts.setdefault(position, (column, conflict_id))
+        return conflicts
+
+    async def bulk_create(
+        self, data: list[AppointmentDataCreate], session: AsyncSession
+    ) -> list[AppointmentResponse]:
+        """Insert the batch in one statement, rows that collide with an
+        appointment booked meanwhile are skipped. The batch must not
+        overlap itself."""
+        query = text(
+            'INSERT INTO appointments(created_at, updated_at, start_date_appointment, end_date_appointment, doctor_id, client_id) '
+            'SELECT now(), now(), b.start_date, b.end_date, b.doctor_id, b.client_id '
+            f'FROM {APPOINTMENT_BATCH}'
+            'AS b(start_date, end_date, doctor_id, client_id) '
+            'WHERE NOT EXISTS ( '
+            'SELECT 1 FROM appointments m '
+            'WHERE (m.doctor_id = b.doctor_id OR m.client_id = b.client_id) '
+            "AND m.period && tsrange(b.start_date, b.end_date, '[)') "
+            'AND m.start_date_appointment < b.end_date) '
+            'ON CONFLICT DO NOTHING '
+            'RETURNING id, created_at, updated_at, start_date_appointment, end_date_appointment, doctor_id, client_id '
+        )
+        params = self._batch_params(data)
+        await self._lock(
+            doctors=params['doctor'], clients=params['client'], session=session
+        )
+        result = await session.execute(query, params)
         rows = result.fetchall()
+        await session.commit()
         appointments = []
-
         for row in rows:
             (
                 id,
-                start_date_appointment,
-                end_date_appointment,
-                doctor,
-                client,
                 created_at,
                 updated_at,
+                start_date_appointment,
+                end_date_appointment,
+                doctor_id,
+                client_id,
             ) = row
             appointments.append(
-                AppointmentData(
+                AppointmentResponse(
                     id=id,
                     created_at=created_at,
                     updated_at=updated_at,
                     start_date_appointment=start_date_appointment,
                     end_date_appointment=end_date_appointment,
-                    doctor=doctor,
-                    client=client,
+                    doctor=doctor_id,
+                    client=client_id,
                 )
             )
         return appointments
 
-    async def delete(self, id: int, session: AsyncSession) -> bool:
-        query = text('DELETE FROM  appointments WHERE id=:id')
-        await session.execute(query, {'id': id})
-        await session.commit()
-        return True
 
-    async def create(
-        self, data: AppointmentDataCreate, session: AsyncSession
-    ) -> AppointmentResponse:
-        query = text(
-            'INSERT INTO appointments(created_at, updated_at, start_date_appointment, end_date_appointment, doctor_id, client_id) '
-            'VALUES(now(), now(), :start_date_appointment, :end_date_appointment, :doctor, :client) '
-            'RETURNING id, created_at, updated_at, start_date_appointment, end_date_appointment, doctor_id, client_id '
-        )
+class IAppointmentPartitionRepository(ABC):
+    @abstractmethod
+    async def get_partitions(self, session: AsyncSession) -> list[str]:
+        raise NotImplementedError()
 
-        data['start_date_appointment'] = datetime.fromisoformat(
-            data['start_date_appointment'].strftime('%Y-%m-%dT%H:%M:%S')
-        )
+    @abstractmethod
+    async def create_partition(
+        self, name: str, start: date, end: date, session: AsyncSession
+    ) -> int:
+        """Partition for [start, end), the rows of the range the default
+        partition holds are moved to it. Returns their number."""
+        raise NotImplementedError()
 
-        data['end_date_appointment'] = datetime.fromisoformat(
-            data['end_date_appointment'].strftime('%Y-%m-%dT%H:%M:%S')
-        )
-        result = await session.execute(query, dict(data))
-        row = result.fetchone()
-        if not row:
-            raise BadRequestEx(detail='Failed to create a appointment')
-        await session.commit()
-        (
-            id,
-            created_at,
-            updated_at,
-            start_date_appointment,
-            end_date_appointment,
-            doctor_id,
-            client_id,
-        ) = row
-        return AppointmentResponse(
-            id=id,
-            created_at=created_at,
-            updated_at=updated_at,
-            start_date_appointment=start_date_appointment,
-            end_date_appointment=end_date_appointment,
-            doctor=doctor_id,
-            client=client_id,
-        )
+    @abstractmethod
+    async def detach_partition(
+        self,
+        name: str,
+        session: AsyncSession,
+        schema: Optional[str] = None,
+        drop: bool = False,
+    ) -> None:
+        """The detached table is moved to ``schema`` or dropped"""
+        raise NotImplementedError()
 
-    async def update(
-        self, id: int, data: AppointmentDataCreate, session: AsyncSession
-    ) -> AppointmentResponse:
+
+class AppointmentPartitionRepository(IAppointmentPartitionRepository):
+    async def get_partitions(self, session: AsyncSession) -> list[str]:
         query = text(
-            'UPDATE appointments SET  updated_at=now(), start_date_appointment=:start_date_appointment, end_date_appointment=:end_date_appointment, doctor_id=:doctor, client_id=:client '
-            'WHERE id=:id RETURNING created_at, updated_at, start_date_appointment, end_date_appointment, doctor_id, client_id '
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            INNER JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'appointments'::regclass
+            ORDER BY c.relname
+            """
         )
+        result = await session.execute(query)
+        return list(result.scalars())
 
-        data['start_date_appointment'] = datetime.fromisoformat(
-            data['start_date_appointment'].strftime('%Y-%m-%dT%H:%M:%S')
+    async def create_partition(
+        self, name: str, start: date, end: date, session: AsyncSession
+    ) -> int:
+        # Built aside and attached, so the parent is not locked while the
+        # rows are moved and the constraints are validated. The names come
+        # from APPOINTMENT_PARTITION_FORMAT and dates, never from a request.
+        await session.execute(
+            text(
+                f'CREATE TABLE {name} (LIKE appointments INCLUDING DEFAULTS '
+                'INCLUDING GENERATED INCLUDING CONSTRAINTS)'
+            )
         )
-
-        data['end_date_appointment'] = datetime.fromisoformat(
-            data['end_date_appointment'].strftime('%Y-%m-%dT%H:%M:%S')
+        result = await session.execute(
+            text(
+                f'WITH moved AS (DELETE FROM {APPOINTMENT_DEFAULT_PARTITION} '
+                'WHERE start_date_appointment >= :start '
+                'AND start_date_appointment < :end '
+                f'RETURNING {APPOINTMENT_COLUMNS}) '
+                f'INSERT INTO {name} ({APPOINTMENT_COLUMNS}) '
+                f'SELECT {APPOINTMENT_COLUMNS} FROM moved'
+            ),
+            {'start': start, 'end': end},
+        )
+        for suffix, elements in APPOINTMENT_PARTITION_EXCLUSIONS.items():
+            await session.execute(
+                text(
+                    f'ALTER TABLE {name} ADD CONSTRAINT ex_{name}_{suffix} '
+                    f'EXCLUDE USING gist ({elements})'
+                )
+            )
+        await session.execute(
+            text(
+                f'ALTER TABLE appointments ATTACH PARTITION {name} '
+                f"FOR VALUES FROM ('{start.isoformat()}') "
+                f"TO ('{end.isoformat()}')"
+            )
         )
-        result = await session.execute(query, {'id': id, **data})
-        row = result.fetchone()
-        if not row:
-            raise BadRequestEx(detail='Failed to update a appointment')
-        (
-            created_at,
-            updated_at,
-            start_date_appointment,
-            end_date_appointment,
-            doctor_id,
-            client_id,
-        ) = row
         await session.commit()
-        return AppointmentResponse(
-            id=id,
-            created_at=created_at,
-            updated_at=updated_at,
-            start_date_appointment=start_date_appointment,
-            end_date_appointment=end_date_appointment,
-            doctor=doctor_id,
-            client=client_id,
+        return result.rowcount
+
+    async def detach_partition(
+        self,
+        name: str,
+        session: AsyncSession,
+        schema: Optional[str] = None,
+        drop: bool = False,
+    ) -> None:
+        # not CONCURRENTLY, postgres does not allow it next to a default
+        # partition, the parent is locked for the time of the detach only
+        await session.execute(
+            text(f'ALTER TABLE appointments DETACH PARTITION {name}')
         )
+        if drop:
+            await session.execute(text(f'DROP TABLE {name}'))
+        elif schema:
+            await session.execute(text(f'CREATE SCHEMA IF NOT EXISTS {schema}'))
+            await session.execute(text(f'ALTER TABLE {name} SET SCHEMA {schema}'))
+        await session.commit()
@@ -1,11 +1,23 @@
 __all__ = ['appointment_api']
 
-from typing import Annotated, Final, Optional
-from fastapi import APIRouter, Depends, Response
+from typing import Annotated, Final, Literal, Optional
+from fastapi import APIRouter, Depends, Header, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.dependencies import Paginator, get_session, QueryParamsAppointment
+from src.dependencies import (
+    ETAG_HEADER,
+    NEXT_CURSOR_HEADER,
+    Paginator,
+    etag_matches,
+    get_session,
+    make_etag,
+    QueryParamsAppointment,
+)
+from src.models import PageScheme
 from src.doctor_app.schemes import (
+    AppointmentBulkResultScheme,
     AppointmentCreateScheme,
+    AppointmentResponseScheme,
     AppointmentScheme,
 )
 from src.doctor_app.dependencies import (
@@ -23,7 +35,7 @@ TAG: Final[str] = 'Запись на прием'
     '/',
     tags=[TAG],
     summary='Получить все записи на прием',
-    response_model=list[AppointmentScheme] | list,
+    response_model=list[AppointmentScheme] | PageScheme[AppointmentScheme],
 )
 async def get_list(
     service: Annotated[AppointmentService, Depends(appointment_service)],
@@ -33,10 +45,40 @@ async def get_list(
         QueryParamsAppointment, Depends(QueryParamsAppointment)
     ],
 ):
-    appointments: list[AppointmentScheme] | list = await service.get_list(
+    """Страница собирается в JSON базой данных и отдаётся без
+    повторной сериализации"""
+    appointments: str = await service.get_list(
         session=session, pagination=pagination, query_params=query_params
     )
-    return appointments
+    if pagination.envelope:
+        appointments = pagination.page_json(appointments)
+    response = Response(content=appointments, media_type='application/json')
+    if pagination.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagination.next_cursor
+    return response
+
+
+@appointment_api.get(
+    '/export',
+    tags=[TAG],
+    summary='Выгрузить записи на прием в NDJSON или CSV',
+    response_class=StreamingResponse,
+)
+async def export(
+    service: Annotated[AppointmentService, Depends(appointment_service)],
+    query_params: Annotated[
+        QueryParamsAppointment, Depends(QueryParamsAppointment)
+    ],
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+):
+    media_type = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    return StreamingResponse(
+        service.export(query_params=query_params, format=format),
+        media_type=media_type,
+        headers={
+            'Content-Disposition': f'attachment; filename="appointments.{format}"'
+        },
+    )
 
 
 @appointment_api.get(
@@ -49,10 +91,18 @@ async def get_retrieve(
     appointment_id: int,
     service: Annotated[AppointmentService, Depends(appointment_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    if_none_match: Annotated[Optional[str], Header()] = None,
 ):
+    """Ответ помечается ETag, с заголовком If-None-Match неизменённая
+    запись отдаётся как 304 без тела"""
+    etag = await service.get_etag(id=appointment_id, session=session)
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={ETAG_HEADER: etag})
     appointment: AppointmentScheme = await service.get_by_id(
         id=appointment_id, session=session
     )
+    response.headers[ETAG_HEADER] = etag
     return appointment
 
 
@@ -60,33 +110,54 @@ async def get_retrieve(
     '/',
     tags=[TAG],
     summary='Создать запись на прием',
-    response_model=AppointmentCreateScheme,
+    response_model=AppointmentResponseScheme,
 )
 async def create(
     service: Annotated[AppointmentService, Depends(appointment_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
     data: AppointmentCreateScheme,
 ):
-    appointment: AppointmentCreateScheme = await service.create(
+    appointment: AppointmentResponseScheme = await service.create(
         session=session, data=data
     )
     return appointment
 
 
+@appointment_api.post(
+    '/bulk',
+    tags=[TAG],
+    summary='Создать записи на прием пакетом',
+    response_model=list[AppointmentBulkResultScheme],
+)
+async def bulk_create(
+    service: Annotated[AppointmentService, Depends(appointment_service)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    data: list[AppointmentCreateScheme],
+):
+    return await service.bulk_create(session=session, data=data)
+
+
 @appointment_api.patch(
     '/{appointment_id}',
     tags=[TAG],
     summary='Обновление записи на прием',
-    response_model=AppointmentScheme,
+    response_model=AppointmentResponseScheme,
 )
 async def update(
     appointment_id: int,
     service: Annotated[AppointmentService, Depends(appointment_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
     data: AppointmentCreateScheme,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
 ):
-    appointment: Optional[AppointmentScheme] = await service.update(
-        id=appointment_id, session=session, data=data
+    """С заголовком If-Match запись обновляется, только если не менялась
+    с указанной версии, иначе 412"""
+    appointment: AppointmentResponseScheme = await service.update(
+        id=appointment_id, session=session, data=data, if_match=if_match
+    )
+    response.headers[ETAG_HEADER] = make_etag(
+        appointment_id, appointment.updated_at
     )
     return appointment
 
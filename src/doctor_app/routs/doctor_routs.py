@@ -1,11 +1,23 @@
 from typing import Annotated, Final, Optional
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, Header, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.dependencies import Paginator, QueryParams, get_session
+from src.dependencies import (
+    ETAG_HEADER,
+    NEXT_CURSOR_HEADER,
+    Paginator,
+    QueryParams,
+    QueryParamsAvailability,
+    etag_matches,
+    get_session,
+    make_etag,
+)
+from src.models import PageScheme
 from src.doctor_app.schemes import (
     DoctorCreateScheme,
     DoctorDetailScheme,
+    DoctorFreePeriodScheme,
     DoctorScheme,
+    FreePeriodScheme,
 )
 from src.doctor_app.dependencies import doctor_service
 from src.doctor_app.services import DoctorService
@@ -18,7 +30,7 @@ TAG: Final[str] = 'Врач'
     '/',
     tags=[TAG],
     summary='Получить список врачей',
-    response_model=list[DoctorDetailScheme] | list,
+    response_model=list[DoctorDetailScheme] | PageScheme[DoctorDetailScheme],
 )
 async def get_list(
     service: Annotated[DoctorService, Depends(doctor_service)],
@@ -26,10 +38,45 @@ async def get_list(
     pagination: Annotated[Paginator, Depends(Paginator)],
     query_params: Annotated[QueryParams, Depends(QueryParams)],
 ):
-    doctors: list[DoctorDetailScheme] | list = await service.get_list(
+    """Страница собирается в JSON базой данных и отдаётся без
+    повторной сериализации"""
+    doctors: str = await service.get_list(
         session=session, pagination=pagination, query_params=query_params
     )
-    return doctors
+    if pagination.envelope:
+        doctors = pagination.page_json(doctors)
+    response = Response(content=doctors, media_type='application/json')
+    if pagination.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagination.next_cursor
+    return response
+
+
+@doctor_api.get(
+    '/availability',
+    tags=[TAG],
+    summary='Найти ближайшее свободное время врачей профессии',
+    response_model=list[DoctorFreePeriodScheme],
+)
+async def get_earliest_availability(
+    service: Annotated[DoctorService, Depends(doctor_service)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    profession: int,
+    query_params: Annotated[
+        QueryParamsAvailability, Depends(QueryParamsAvailability)
+    ],
+    limit: Annotated[int, Query(gt=0, le=100)] = 10,
+):
+    """Первые limit свободных промежутков всех врачей профессии в
+    диапазоне from - to по времени начала"""
+    periods: list[
+        DoctorFreePeriodScheme
+    ] = await service.get_earliest_availability(
+        profession_id=profession,
+        limit=limit,
+        session=session,
+        query_params=query_params,
+    )
+    return periods
 
 
 @doctor_api.get(
@@ -42,13 +89,43 @@ async def get_retrieve(
     doctor_id: int,
     service: Annotated[DoctorService, Depends(doctor_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
+    response: Response,
+    if_none_match: Annotated[Optional[str], Header()] = None,
 ):
+    """Ответ помечается ETag, с заголовком If-None-Match неизменённый
+    врач отдаётся как 304 без тела"""
+    etag = await service.get_etag(id=doctor_id, session=session)
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={ETAG_HEADER: etag})
     doctor: DoctorDetailScheme = await service.get_by_id(
         id=doctor_id, session=session
     )
+    response.headers[ETAG_HEADER] = etag
     return doctor
 
 
+@doctor_api.get(
+    '/{doctor_id}/availability',
+    tags=[TAG],
+    summary='Получить свободное время врача',
+    response_model=list[FreePeriodScheme],
+)
+async def get_availability(
+    doctor_id: int,
+    service: Annotated[DoctorService, Depends(doctor_service)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    query_params: Annotated[
+        QueryParamsAvailability, Depends(QueryParamsAvailability)
+    ],
+):
+    """Промежутки между записями врача в диапазоне from - to, в которые
+    помещается приём длительностью duration минут"""
+    periods: list[FreePeriodScheme] = await service.get_availability(
+        id=doctor_id, session=session, query_params=query_params
+    )
+    return periods
+
+
 @doctor_api.post(
     '/',
     tags=[TAG],
@@ -75,10 +152,15 @@ async def update(
     service: Annotated[DoctorService, Depends(doctor_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
     data: DoctorCreateScheme,
+    response: Response,
+    if_match: Annotated[Optional[str], Header()] = None,
 ):
-    doctor: Optional[DoctorScheme] = await service.update(
-        id=doctor_id, session=session, data=data
+    """С заголовком If-Match врач обновляется, только если не менялся
+    с указанной версии, иначе 412"""
+    doctor: DoctorScheme = await service.update(
+        id=doctor_id, session=session, data=data, if_match=if_match
     )
+    response.headers[ETAG_HEADER] = make_etag(doctor_id, doctor.updated_at)
     return doctor
 
 
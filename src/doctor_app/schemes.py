@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import Annotated
+from typing import Annotated, Literal, Optional
 from src.models import BaseScheme
 import pydantic
 
@@ -26,6 +26,8 @@ class DoctorCreateScheme(UserInfo):
 
 class DoctorScheme(DoctorCreateScheme):
     id: int
+    created_at: datetime
+    updated_at: datetime
 
 
 class DoctorDetailScheme(DoctorScheme):
@@ -70,6 +72,23 @@ class AppointmentCreateScheme(BaseScheme):
     #     return value
 
 
+class FreePeriodScheme(BaseScheme):
+    start: datetime
+    end: datetime
+
+
+class DoctorFreePeriodScheme(FreePeriodScheme):
+    doctor: int
+
+
+class AppointmentBulkResultScheme(BaseScheme):
+    index: int
+    status: Literal['created', 'conflict', 'not_found', 'invalid']
+    id: Optional[int] = None
+    conflict_id: Optional[int] = None
+    message: Optional[str] = None
+
+
 class AppointmentDoctorInfoScheme(UserInfo):
     id: int
     first_name: str
@@ -86,9 +105,12 @@ class AppointmentClientInfoScheme(UserInfo):
     avatar: str
 
 
-class AppointmentScheme(AppointmentCreateScheme):
+class AppointmentResponseScheme(AppointmentCreateScheme):
     id: int
     created_at: datetime
     updated_at: datetime
+
+
+class AppointmentScheme(AppointmentResponseScheme):
     doctor: AppointmentDoctorInfoScheme
     client: AppointmentClientInfoScheme
@@ -1,45 +1,105 @@
-__all__ = ['AppointmentService', 'DoctorService']
+__all__ = [
+    'AppointmentPartitionService',
+    'AppointmentService',
+    'DoctorService',
+]
 
-from typing import Optional
+from collections.abc import AsyncIterator
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Final, NoReturn, Optional
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from src.dependencies import Paginator, QueryParams, QueryParamsAppointment
+from src.cache import caches
+from src.config import settings
+from src.dependencies import (
+    Paginator,
+    QueryParams,
+    QueryParamsAppointment,
+    QueryParamsAvailability,
+    create_read_session,
+    make_etag,
+    parse_if_match,
+)
 from src.doctor_app.dtos import (
     AppointmentData,
     AppointmentDataCreate,
+    AppointmentPeriod,
     AppointmentResponse,
+    AppointmentWriteResult,
     DoctorData,
     DoctorDataCreate,
     DoctorDetailData,
+    PartitionReport,
 )
 from src.doctor_app.repositories import (
+    APPOINTMENT_PARTITION_FORMAT,
+    IAppointmentPartitionRepository,
     IDoctorAppointmentRepository,
     IDoctorRepository,
 )
 from src.doctor_app.schemes import (
+    AppointmentBulkResultScheme,
     AppointmentCreateScheme,
+    AppointmentResponseScheme,
     AppointmentScheme,
     DoctorCreateScheme,
     DoctorDetailScheme,
+    DoctorFreePeriodScheme,
     DoctorScheme,
+    FreePeriodScheme,
+)
+from src.doctor_app.slots import (
+    DayBitmap,
+    Period,
+    days_of,
+    earliest_free_periods,
+    free_periods,
 )
-from src.exceptions import BadRequestEx, NotFoundEx
+from src.exceptions import (
+    BadRequestEx,
+    ConflictEx,
+    NotFoundEx,
+    PreconditionFailedEx,
+    get_constraint_name,
+)
+
+
+AVAILABILITY_MAX_RANGE: Final[timedelta] = timedelta(days=31)
+# Booked slots of doctor-days keyed by (doctor id, day), read by the
+# availability search. The database stays the judge of a booking, a stale
+# day only makes a booking fail with a conflict.
+DOCTOR_DAYS_CACHE: Final[str] = 'doctor_days'
 
 
 class DoctorService:
     def __init__(self, repository: IDoctorRepository):
         self.repository = repository
+        # professions are listed with their number of specialists
+        self.profession_cache = caches.get('professions')
+        self.days_cache = caches.get(
+            DOCTOR_DAYS_CACHE, ttl=settings.slot_cache_ttl
+        )
 
-    async def _check_exists(
+    async def _raise_for_missed_update(
         self, id: int, session: AsyncSession
-    ) -> DoctorData:
-        doctor: Optional[DoctorData] = await self.repository.get_by_id(
+    ) -> NoReturn:
+        """The update matched no row, the doctor is either gone or was
+        changed since the version the request is based on"""
+        if not await self.repository.get_updated_at(id=id, session=session):
+            raise NotFoundEx(detail=f'Doctor with id: {id} not found')
+        raise PreconditionFailedEx(
+            detail=f'Doctor with id: {id} has been modified'
+        )
+
+    async def get_etag(self, id: int, session: AsyncSession) -> str:
+        updated_at = await self.repository.get_updated_at(
             id=id, session=session
         )
-        if not doctor:
+        if not updated_at:
             raise NotFoundEx(detail=f'Doctor with id: {id} not found')
-        return doctor
+        return make_etag(id, updated_at)
 
     async def _check_related_profession_exists(
         self, id: int, session: AsyncSession
@@ -66,17 +126,134 @@ class DoctorService:
         session: AsyncSession,
         pagination: Paginator,
         query_params: QueryParams,
-    ) -> list[DoctorDetailScheme] | list:
-        doctors: list[DoctorData] | list = await self.repository.get_list(
+    ) -> str:
+        """The page as a JSON array rendered by postgres, it is sent as is
+        without being parsed and validated here"""
+        return await self.repository.get_list(
             session=session,
-            limit=pagination.limit,
-            offset=pagination.offset,
+            pagination=pagination,
             query_params=query_params,
         )
-        if not doctors:
-            return doctors
+
+    def _check_availability_range(
+        self, query_params: QueryParamsAvailability
+    ) -> Period:
+        start = query_params.date_from.replace(tzinfo=None)
+        end = query_params.date_to.replace(tzinfo=None)
+        if start >= end:
+            raise BadRequestEx(detail='The range must end after it starts')
+        if end - start > AVAILABILITY_MAX_RANGE:
+            raise BadRequestEx(
+                detail=f'The range must not be longer than '
+                f'{AVAILABILITY_MAX_RANGE.days} days'
+            )
+        return start, end
+
+    async def _get_busy_periods(
+        self,
+        ids: list[int],
+        start: datetime,
+        end: datetime,
+        session: AsyncSession,
+    ) -> dict[int, list[Period]]:
+        """Booked periods of the doctors read from their day bitmaps, the
+        days that are not cached are read together in one query. Doctors
+        that do not exist are left out, as is a doctor with some of the
+        days missing, e.g. deleted by another worker after the other days
+        were cached."""
+        days = days_of(start, end)
+
+        async def load(
+            missing: list[tuple[int, date]]
+        ) -> dict[tuple[int, date], DayBitmap]:
+            if not missing:
+                return {}
+            first = min(day for _, day in missing)
+            last = max(day for _, day in missing)
+            busy = await self.repository.get_busy_periods(
+                ids=sorted({id for id, _ in missing}),
+                start=datetime.combine(first, time()),
+                end=datetime.combine(last + timedelta(days=1), time()),
+                session=session,
+            )
+            bitmaps = {
+                (id, day): DayBitmap(day)
+                for id, day in missing
+                if id in busy
+            }
+            for id, periods in busy.items():
+                for period_start, period_end in periods:
+                    for day in days_of(period_start, period_end):
+                        if bitmap := bitmaps.get((id, day)):
+                            bitmap.occupy(period_start, period_end)
+            return bitmaps
+
+        bitmaps = await self.days_cache.fetch_many(
+            [(id, day) for id in ids for day in days], load
+        )
+        return {
+            id: [
+                period
+                for day in days
+                for period in bitmaps[(id, day)].periods()
+            ]
+            for id in ids
+            if all((id, day) in bitmaps for day in days)
+        }
+
+    async def get_availability(
+        self,
+        id: int,
+        session: AsyncSession,
+        query_params: QueryParamsAvailability,
+    ) -> list[FreePeriodScheme]:
+        """Free periods of the doctor long enough for an appointment of
+        ``duration`` minutes, aligned to the 5 minute slots"""
+        start, end = self._check_availability_range(query_params)
+        busy = await self._get_busy_periods(
+            ids=[id], start=start, end=end, session=session
+        )
+        if id not in busy:
+            raise NotFoundEx(detail=f'Doctor with id: {id} not found')
         return [
-            DoctorDetailScheme.model_validate(doctor) for doctor in doctors
+            FreePeriodScheme(start=free_start, end=free_end)
+            for free_start, free_end in free_periods(
+                busy[id],
+                start=start,
+                end=end,
+                duration=timedelta(minutes=query_params.duration),
+            )
+        ]
+
+    async def get_earliest_availability(
+        self,
+        profession_id: int,
+        limit: int,
+        session: AsyncSession,
+        query_params: QueryParamsAvailability,
+    ) -> list[DoctorFreePeriodScheme]:
+        """The first ``limit`` free periods of any doctor of the profession,
+        aligned to the 5 minute slots"""
+        start, end = self._check_availability_range(query_params)
+        ids = await self.repository.get_profession_doctor_ids(
+            profession_id=profession_id, session=session
+        )
+        if ids is None:
+            raise NotFoundEx(
+                detail=f'Profession with id: {profession_id} not found'
+            )
+        busy = await self._get_busy_periods(
+            ids=ids, start=start, end=end, session=session
+        )
+        periods = earliest_free_periods(
+            busy,
+            start=start,
+            end=end,
+            duration=timedelta(minutes=query_params.duration),
+        )
+        return [
+            DoctorFreePeriodScheme(doctor=doctor, start=free_start, end=free_end)
+            for doctor, (free_start, free_end) in islice(periods, limit)
         ]
 
     async def create(
@@ -93,12 +270,16 @@ class DoctorService:
             raise BadRequestEx(
                 detail='There is already a doctor with this first_name, last_name, middle_name'
             )
+        self.profession_cache.invalidate()
         return DoctorScheme.model_validate(doctor)
 
     async def update(
-        self, session: AsyncSession, data: DoctorCreateScheme, id: int
+        self,
+        session: AsyncSession,
+        data: DoctorCreateScheme,
+        id: int,
+        if_match: Optional[str] = None,
     ) -> DoctorScheme:
-        doctor = await self._check_exists(id=id, session=session)
         await self._check_related_profession_exists(
             id=data.profession, session=session
         )
@@ -107,76 +288,134 @@ class DoctorService:
                 session=session,
                 data=DoctorDataCreate(**data.model_dump()),
                 id=id,
+                versions=None if if_match is None else parse_if_match(
+                    if_match, id
+                ),
             )
         except IntegrityError:
             raise BadRequestEx(
                 detail='There is already a doctor with this first_name, last_name, middle_name'
             )
+        if not doctor:
+            await self._raise_for_missed_update(id=id, session=session)
+        self.profession_cache.invalidate()
         return DoctorScheme.model_validate(doctor)
 
     async def delete(self, id: int, session: AsyncSession) -> None:
-        await self._check_exists(id=id, session=session)
         deleted = await self.repository.delete(session=session, id=id)
         if not deleted:
-            raise BadRequestEx(detail='Failed to delete a profession')
+            raise NotFoundEx(detail=f'Doctor with id: {id} not found')
+        self.profession_cache.invalidate()
+        # the appointments of the doctor are gone with it
+        self.days_cache.discard_where(lambda key: key[0] == id)
         return None
 
 
 class AppointmentService:
     def __init__(self, repository: IDoctorAppointmentRepository):
         self.repository = repository
+        self.days_cache = caches.get(
+            DOCTOR_DAYS_CACHE, ttl=settings.slot_cache_ttl
+        )
 
-    async def _check_exists(
-        self, id: int, session: AsyncSession
-    ) -> AppointmentData:
-        doctor: Optional[AppointmentData] = await self.repository.get_by_id(
+    def _book(self, appointment: AppointmentResponse) -> None:
+        """Mark a written appointment in the cached days of its doctor. A
+        slot may be shared by two appointments, so a moved or deleted one
+        can not be unmarked, its days are dropped instead by ``_drop``."""
+        start = appointment['start_date_appointment']
+        end = appointment['end_date_appointment']
+        for day in days_of(start, end):
+            self.days_cache.modify(
+                (appointment['doctor'], day),
+                lambda bitmap: bitmap.occupy(start, end),
+            )
+
+    def _drop(self, period: AppointmentPeriod) -> None:
+        """Drop the cached days of the doctor an appointment took or
+        takes, they are loaded again on the next search"""
+        if period['doctor'] is None:
+            return
+        for day in days_of(
+            period['start_date_appointment'], period['end_date_appointment']
+        ):
+            self.days_cache.discard((period['doctor'], day))
+
+    async def get_etag(self, id: int, session: AsyncSession) -> str:
+        updated_at = await self.repository.get_updated_at(
             id=id, session=session
         )
-        if not doctor:
+        if not updated_at:
             raise NotFoundEx(detail=f'Appointment with id: {id} not found')
-        return doctor
-
-    async def _check_related_doctor_exists(
-        self, id: int, session: AsyncSession
-    ) -> bool:
-        query = text('SELECT d.id FROM doctors d WHERE d.id=:id')
-        result = await session.execute(query, {'id': id})
-        row = result.first()
-        if not row:
-            raise NotFoundEx(detail=f'Doctor with id: {id} not found')
-        return True
+        return make_etag(id, updated_at)
 
-    async def _check_related_client_exists(
-        self, id: int, session: AsyncSession
-    ) -> bool:
-        query = text('SELECT c.id FROM clients c WHERE c.id=:id')
-        result = await session.execute(query, {'id': id})
-        row = result.first()
-        if not row:
-            raise NotFoundEx(detail=f'Client with id: {id} not found')
-        return True
+    def _check_write_result(
+        self,
+        result: AppointmentWriteResult,
+        data: AppointmentDataCreate,
+        id: Optional[int] = None,
+    ) -> AppointmentResponse:
+        match result['status']:
+            case 'not_found':
+                raise NotFoundEx(detail=f'Appointment with id: {id} not found')
+            case 'doctor_not_found':
+                raise NotFoundEx(
+                    detail=f'Doctor with id: {data["doctor"]} not found'
+                )
+            case 'client_not_found':
+                raise NotFoundEx(
+                    detail=f'Client with id: {data["client"]} not found'
+                )
+            case 'modified':
+                raise PreconditionFailedEx(
+                    detail=f'Appointment with id: {id} has been modified'
+                )
+            case 'invalid_period':
+                raise BadRequestEx(
+                    detail='The appointment must end after it starts'
+                )
+            case 'doctor_busy':
+                raise ConflictEx(
+                    detail=f'Doctor with id: {data["doctor"]} is busy at this time',
+                    conflict_id=result['conflict_id'],
+                )
+            case 'client_busy':
+                raise ConflictEx(
+                    detail=f'Client with id: {data["client"]} is busy at this time',
+                    conflict_id=result['conflict_id'],
+                )
+        return result['appointment']
 
-    async def _check_doctor_is_busy(
+    async def _raise_for_integrity_error(
         self,
-        data: AppointmentCreateScheme,
+        exc: IntegrityError,
+        data: AppointmentDataCreate,
         session: AsyncSession,
-    ) -> bool:
-        appointments: list[
-            AppointmentData
-        ] | list = await self.repository.get_list(
-            session=session,
-            limit=1,
-            offset=0,
-            query_params=QueryParamsAppointment(
-                start_date=data.start_date_appointment,
-                end_date=data.end_date_appointment,
-                doctor=data.doctor,
-                client=data.client,
-            ),
-        )
-        if appointments:
-            return True
-        return False
+        id: Optional[int] = None,
+    ) -> NoReturn:
+        await session.rollback()
+        # every partition has its own ex_<partition>_doctor_period
+        match get_constraint_name(exc):
+            case str(name) if name.endswith('_doctor_period'):
+                conflict_id = await self.repository.get_conflicting_id(
+                    data=data, session=session, column='doctor', exclude_id=id
+                )
+                raise ConflictEx(
+                    detail=f'Doctor with id: {data["doctor"]} is busy at this time',
+                    conflict_id=conflict_id,
+                )
+            case str(name) if name.endswith('_client_period'):
+                conflict_id = await self.repository.get_conflicting_id(
+                    data=data, session=session, column='client', exclude_id=id
+                )
+                raise ConflictEx(
+                    detail=f'Client with id: {data["client"]} is busy at this time',
+                    conflict_id=conflict_id,
+                )
+            case 'ck_appointments_period_valid':
+                raise BadRequestEx(
+                    detail='The appointment must end after it starts'
+                )
+        raise exc
 
     async def get_by_id(
         self, id: int, session: AsyncSession
@@ -193,59 +432,234 @@ class AppointmentService:
         session: AsyncSession,
         pagination: Paginator,
         query_params: QueryParamsAppointment,
-    ) -> list[AppointmentScheme] | list:
-        appointments: list[
-            AppointmentData
-        ] | list = await self.repository.get_list(
+    ) -> str:
+        """The page as a JSON array rendered by postgres, it is sent as is
+        without being parsed and validated here"""
+        return await self.repository.get_list(
             session=session,
-            limit=pagination.limit,
-            offset=pagination.offset,
+            pagination=pagination,
             query_params=query_params,
         )
-        if not appointments:
-            return appointments
-        return [
-            AppointmentScheme.model_validate(appointment)
-            for appointment in appointments
-        ]
+
+    async def export(
+        self, query_params: QueryParamsAppointment, format: str
+    ) -> AsyncIterator[str]:
+        # The stream outlives the request dependencies, so it holds its
+        # own session for as long as the cursor is read
+        async with create_read_session() as session:
+            async for chunk in self.repository.export(
+                session=session, query_params=query_params, format=format
+            ):
+                yield chunk
 
     async def create(
         self, session: AsyncSession, data: AppointmentCreateScheme
-    ) -> AppointmentCreateScheme:
-        await self._check_related_doctor_exists(
-            id=data.doctor, session=session
+    ) -> AppointmentResponseScheme:
+        appointment_data = AppointmentDataCreate(**data.model_dump())
+        try:
+            result = await self.repository.create(
+                session=session, data=appointment_data
+            )
+        except IntegrityError as exc:
+            # a booking committed meanwhile got past the checks
+            await self._raise_for_integrity_error(
+                exc=exc, data=appointment_data, session=session
+            )
+        appointment = self._check_write_result(
+            result=result, data=appointment_data
         )
-        await self._check_related_client_exists(
-            id=data.client, session=session
+        self._book(appointment)
+        return AppointmentResponseScheme.model_validate(appointment)
+
+    async def bulk_create(
+        self, session: AsyncSession, data: list[AppointmentCreateScheme]
+    ) -> list[AppointmentBulkResultScheme]:
+        items = [AppointmentDataCreate(**item.model_dump()) for item in data]
+        for item in items:
+            for field in ('start_date_appointment', 'end_date_appointment'):
+                item[field] = datetime.fromisoformat(
+                    item[field].strftime('%Y-%m-%dT%H:%M:%S')
+                )
+        results: dict[int, AppointmentBulkResultScheme] = {}
+
+        doctors, clients = await self.repository.get_existing_related_ids(
+            doctors=list({item['doctor'] for item in items}),
+            clients=list({item['client'] for item in items}),
+            session=session,
         )
-        await self._check_doctor_is_busy(session=session, data=data)
+        for index, item in enumerate(items):
+            if item['doctor'] not in doctors:
+                results[index] = AppointmentBulkResultScheme(
+                    index=index,
+                    status='not_found',
+                    message=f'Doctor with id: {item["doctor"]} not found',
+                )
+            elif item['client'] not in clients:
+                results[index] = AppointmentBulkResultScheme(
+                    index=index,
+                    status='not_found',
+                    message=f'Client with id: {item["client"]} not found',
+                )
+            elif item['start_date_appointment'] >= item['end_date_appointment']:
+                results[index] = AppointmentBulkResultScheme(
+                    index=index,
+                    status='invalid',
+                    message='The appointment must end after it starts',
+                )
 
-        appointment: AppointmentResponse = await self.repository.create(
-            session=session, data=AppointmentDataCreate(**data.model_dump())
+        pending = [index for index in range(len(items)) if index not in results]
+        conflicts = await self.repository.get_batch_conflicts(
+            data=[items[index] for index in pending], session=session
         )
-        return AppointmentCreateScheme.model_validate(dict(appointment))
+        for position, (column, conflict_id) in conflicts.items():
+            index = pending[position]
+            results[index] = AppointmentBulkResultScheme(
+                index=index,
+                status='conflict',
+                conflict_id=conflict_id,
+                message=f'{column.capitalize()} with id: {items[index][column]} is busy at this time',
+            )
+
+        # Overlaps inside the batch itself: sweeping by start time, an item
+        # clashes when its doctor or client is still busy with an accepted one
+        busy_until: dict[tuple[str, int], tuple[datetime, int]] = {}
+        accepted: list[int] = []
+        for index in sorted(
+            (index for index in pending if index not in results),
+            key=lambda index: (items[index]['start_date_appointment'], index),
+        ):
+            item = items[index]
+            keys = (('doctor', item['doctor']), ('client', item['client']))
+            clash = next(
+                (
+                    key
+                    for key in keys
+                    if key in busy_until
+                    and busy_until[key][0] > item['start_date_appointment']
+                ),
+                None,
+            )
+            if clash:
+                column, id = clash
+                results[index] = AppointmentBulkResultScheme(
+                    index=index,
+                    status='conflict',
+                    message=f'{column.capitalize()} with id: {id} is busy with item {busy_until[clash][1]}',
+                )
+                continue
+            for key in keys:
+                busy_until[key] = (item['end_date_appointment'], index)
+            accepted.append(index)
+
+        created: dict[tuple[int, datetime], int] = {}
+        if accepted:
+            appointments = await self.repository.bulk_create(
+                data=[items[index] for index in accepted], session=session
+            )
+            created = {
+                (a['doctor'], a['start_date_appointment']): a['id']
+                for a in appointments
+            }
+            for appointment in appointments:
+                self._book(appointment)
+        for index in accepted:
+            item = items[index]
+            id = created.get((item['doctor'], item['start_date_appointment']))
+            results[index] = AppointmentBulkResultScheme(
+                index=index,
+                status='created' if id else 'conflict',
+                id=id,
+                message=None if id else 'Booked by another request meanwhile',
+            )
+        return [results[index] for index in range(len(items))]
 
     async def update(
-        self, session: AsyncSession, data: AppointmentCreateScheme, id: int
-    ) -> AppointmentScheme:
-        await self._check_exists(id=id, session=session)
-        await self._check_related_doctor_exists(
-            id=data.doctor, session=session
-        )
-        await self._check_related_client_exists(
-            id=data.client, session=session
-        )
-        await self._check_doctor_is_busy(session=session, data=data)
-        appointment = await self.repository.update(
-            session=session,
-            data=AppointmentDataCreate(**data.model_dump()),
-            id=id,
+        self,
+        session: AsyncSession,
+        data: AppointmentCreateScheme,
+        id: int,
+        if_match: Optional[str] = None,
+    ) -> AppointmentResponseScheme:
+        appointment_data = AppointmentDataCreate(**data.model_dump())
+        try:
+            result = await self.repository.update(
+                session=session,
+                data=appointment_data,
+                id=id,
+                versions=None if if_match is None else parse_if_match(
+                    if_match, id
+                ),
+            )
+        except IntegrityError as exc:
+            # a booking committed meanwhile got past the checks
+            await self._raise_for_integrity_error(
+                exc=exc, data=appointment_data, session=session, id=id
+            )
+        appointment = self._check_write_result(
+            result=result, data=appointment_data, id=id
         )
-        return AppointmentScheme.model_validate(appointment)
+        if result['previous']:
+            self._drop(result['previous'])
+        self._drop(appointment)
+        return AppointmentResponseScheme.model_validate(appointment)
 
     async def delete(self, id: int, session: AsyncSession) -> None:
-        await self._check_exists(id=id, session=session)
         deleted = await self.repository.delete(session=session, id=id)
         if not deleted:
-            raise BadRequestEx(detail='Failed to delete a appointment')
+            raise NotFoundEx(detail=f'Appointment with id: {id} not found')
+        self._drop(deleted)
         return None
+
+
+def shift_month(month: date, months: int) -> date:
+    """First day of the month ``months`` after the one of ``month``"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class AppointmentPartitionService:
+    def __init__(self, repository: IAppointmentPartitionRepository):
+        self.repository = repository
+
+    async def maintain(
+        self,
+        session: AsyncSession,
+        ahead: int,
+        retain: Optional[int] = None,
+        schema: Optional[str] = None,
+        drop: bool = False,
+        today: Optional[date] = None,
+    ) -> PartitionReport:
+        """Create the partitions of the current month and ``ahead`` months
+        after it that are missing. With ``retain`` the partitions of the
+        months before the last ``retain`` ones are detached, moved to
+        ``schema`` or dropped."""
+        current = shift_month(today or date.today(), 0)
+        partitions = set(await self.repository.get_partitions(session=session))
+        report = PartitionReport(created=[], moved=0, detached=[])
+        for shift in range(ahead + 1):
+            start = shift_month(current, shift)
+            name = start.strftime(APPOINTMENT_PARTITION_FORMAT)
+            if name in partitions:
+                continue
+            report['moved'] += await self.repository.create_partition(
+                name=name,
+                start=start,
+                end=shift_month(start, 1),
+                session=session,
+            )
+            report['created'].append(name)
+        if retain is None:
+            return report
+        oldest = shift_month(current, -retain).strftime(
+            APPOINTMENT_PARTITION_FORMAT
+        )
+        for name in sorted(partitions):
+            # the format sorts by month, the default partition is not a month
+            if not name[-7:-3].isdigit() or name >= oldest:
+                continue
+            await self.repository.detach_partition(
+                name=name, session=session, schema=schema, drop=drop
+            )
+            report['detached'].append(name)
+        return report
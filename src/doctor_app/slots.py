@@ -0,0 +1,98 @@
+import heapq
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, time, timedelta
+from typing import Final
+
+
+Period = tuple[datetime, datetime]
+
+SLOT: Final[timedelta] = timedelta(minutes=5)
+SLOTS_PER_DAY: Final[int] = timedelta(days=1) // SLOT
+
+
+def days_of(start: datetime, end: datetime) -> list[date]:
+    """Days the period [start, end) touches"""
+    last = (end - timedelta.resolution).date()
+    return [
+        start.date() + timedelta(days=day)
+        for day in range((last - start.date()).days + 1)
+    ]
+
+
+class DayBitmap:
+    """Booked 5 minute slots of a doctor's day, a bit per slot. A slot an
+    appointment covers only in part is booked as a whole, so the free
+    periods read from a bitmap are aligned to slots."""
+
+    __slots__ = ('start', 'bits')
+
+    def __init__(self, day: date):
+        self.start = datetime.combine(day, time())
+        self.bits = bytearray(SLOTS_PER_DAY // 8)
+
+    def occupy(self, start: datetime, end: datetime) -> None:
+        first = max((start - self.start) // SLOT, 0)
+        last = min(-((self.start - end) // SLOT), SLOTS_PER_DAY)
+        for slot in range(first, last):
+            self.bits[slot >> 3] |= 1 << (slot & 7)
+
+    def periods(self) -> Iterator[Period]:
+        """Runs of booked slots in the order of the day"""
+        run = None
+        for index, byte in enumerate(self.bits):
+            if byte == (0 if run is None else 0xFF):
+                continue
+            for bit in range(8):
+                booked = byte >> bit & 1
+                if booked and run is None:
+                    run = index * 8 + bit
+                elif not booked and run is not None:
+                    yield self._period(run, index * 8 + bit)
+                    run = None
+        if run is not None:
+            yield self._period(run, SLOTS_PER_DAY)
+
+    def _period(self, first: int, last: int) -> Period:
+        return self.start + first * SLOT, self.start + last * SLOT
+
+
+def free_periods(
+    busy: Iterable[Period],
+    start: datetime,
+    end: datetime,
+    duration: timedelta,
+) -> Iterator[Period]:
+    """Gaps of at least ``duration`` between ``start`` and ``end`` that no
+    busy period covers. ``busy`` must be sorted by its start, periods may
+    overlap and stick out of the window, one pass over them is enough."""
+    free_from = start
+    for busy_start, busy_end in busy:
+        if busy_start >= end:
+            break
+        if busy_start - free_from >= duration:
+            yield free_from, busy_start
+        free_from = max(free_from, busy_end)
+    if end - free_from >= duration:
+        yield free_from, end
+
+
+def earliest_free_periods(
+    busy: dict[int, Iterable[Period]],
+    start: datetime,
+    end: datetime,
+    duration: timedelta,
+) -> Iterator[tuple[int, Period]]:
+    """Free periods of several doctors keyed by their id, as one stream
+    ordered by the start (ties by the doctor). The per doctor sweeps are
+    merged lazily, taking the first N periods sweeps only as far as they
+    need to."""
+    def stream(
+        id: int, periods: Iterable[Period]
+    ) -> Iterator[tuple[int, Period]]:
+        for period in free_periods(periods, start, end, duration):
+            yield id, period
+
+    return heapq.merge(
+        *(stream(id, periods) for id, periods in busy.items()),
+        key=lambda item: (item[1][0], item[0]),
+    )
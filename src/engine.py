@@ -1,4 +1,11 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import time
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
 from .config import settings
 
 
@@ -14,3 +21,42 @@ async_session_factory = async_sessionmaker(
     bind=engine,
     expire_on_commit=False,
 )
+
+
+class ReplicaPool:
+    """Round-robin over the replica engines that skips a replica for
+    ``cooldown`` seconds after it failed"""
+
+    def __init__(self, engines: list[AsyncEngine], cooldown: int):
+        self.engines = engines
+        self.cooldown = cooldown
+        self._position = 0
+        self._failed_until: dict[int, float] = {}
+
+    def get(self) -> Optional[AsyncEngine]:
+        now = time.monotonic()
+        for _ in range(len(self.engines)):
+            index = self._position % len(self.engines)
+            self._position += 1
+            if self._failed_until.get(index, 0) <= now:
+                return self.engines[index]
+        return None
+
+    def mark_failed(self, engine: AsyncEngine) -> None:
+        index = self.engines.index(engine)
+        self._failed_until[index] = time.monotonic() + self.cooldown
+
+
+replicas = ReplicaPool(
+    engines=[
+        create_async_engine(
+            url,
+            pool_size=20,
+            pool_pre_ping=True,
+            pool_use_lifo=True,
+            echo=settings.echo,
+        )
+        for url in settings.replica_urls
+    ],
+    cooldown=settings.replica_cooldown,
+)
@@ -1,3 +1,8 @@
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+
 class BadRequestEx(Exception):
     def __init__(self, detail: str):
         self.detail = detail
@@ -5,3 +10,19 @@ class BadRequestEx(Exception):
 class NotFoundEx(Exception):
     def __init__(self, detail: str):
         self.detail = detail
+
+
+class ConflictEx(Exception):
+    def __init__(self, detail: str, conflict_id: Optional[int] = None):
+        self.detail = detail
+        self.conflict_id = conflict_id
+
+
+class PreconditionFailedEx(Exception):
+    def __init__(self, detail: str):
+        self.detail = detail
+
+
+def get_constraint_name(exc: IntegrityError) -> Optional[str]:
+    """Name of the constraint asyncpg reported for a failed statement"""
+    return getattr(exc.orig.__cause__, 'constraint_name', None)
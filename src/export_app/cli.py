@@ -0,0 +1,35 @@
+"""Выгрузка таблицы в CSV файл.
+
+    python -m src.export_app.cli appointments appointments.csv
+    python -m src.export_app.cli clients clients.csv --date-from 2024-01-01
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+from src.dependencies import QueryParamsExport
+from src.export_app.dependencies import export_service
+from src.export_app.repositories import EXPORT_TABLES
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export a table as CSV')
+    parser.add_argument('table', choices=EXPORT_TABLES)
+    parser.add_argument('path', type=Path)
+    parser.add_argument('--date-from', type=datetime.fromisoformat)
+    parser.add_argument('--date-to', type=datetime.fromisoformat)
+    parser.add_argument('--id-from', type=int)
+    parser.add_argument('--id-to', type=int)
+    args = parser.parse_args()
+    query_params = QueryParamsExport(
+        date_from=args.date_from,
+        date_to=args.date_to,
+        id_from=args.id_from,
+        id_to=args.id_to,
+    )
+    asyncio.run(
+        export_service().to_file(
+            table=args.table, query_params=query_params, path=args.path
+        )
+    )
@@ -0,0 +1,6 @@
+from src.export_app.repositories import ExportRepository
+from src.export_app.services import ExportService
+
+
+def export_service() -> ExportService:
+    return ExportService(repository=ExportRepository())
@@ -0,0 +1,112 @@
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Any, Final
+
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from src.dependencies import QueryParamsExport
+
+
+# Tables that can be exported: the exported columns and the column the
+# date range applies to. Names never come from the request, so they are
+# safe to put into the query
+EXPORT_TABLES: Final[dict[str, tuple[tuple[str, ...], str]]] = {
+    'appointments': (
+        (
+            'id',
+            'start_date_appointment',
+            'end_date_appointment',
+            'doctor_id',
+            'client_id',
+            'created_at',
+            'updated_at',
+        ),
+        'start_date_appointment',
+    ),
+    'clients': (
+        (
+            'id',
+            'first_name',
+            'last_name',
+            'middle_name',
+            'date_birthday',
+            'address',
+            'avatar',
+            'created_at',
+            'updated_at',
+        ),
+        'created_at',
+    ),
+    'diagnosis': (
+        (
+            'id',
+            'name',
+            'description',
+            'date_closed',
+            'status',
+            'client_id',
+            'doctor_id',
+            'created_at',
+            'updated_at',
+        ),
+        'created_at',
+    ),
+    'disease_diagnosis': (
+        ('id', 'diagnosis_id', 'disease_id', 'created_at', 'updated_at'),
+        'created_at',
+    ),
+}
+
+
+class IExportRepository(ABC):
+    @abstractmethod
+    async def copy(
+        self,
+        session: AsyncSession,
+        table: str,
+        query_params: QueryParamsExport,
+        output: Callable[[bytes], Awaitable[Any]],
+    ) -> None:
+        raise NotImplementedError()
+
+
+class ExportRepository(IExportRepository):
+    async def copy(
+        self,
+        session: AsyncSession,
+        table: str,
+        query_params: QueryParamsExport,
+        output: Callable[[bytes], Awaitable[Any]],
+    ) -> None:
+        """COPY the table as CSV with a header, every chunk postgres sends
+        is handed to output as is"""
+        columns, date_column = EXPORT_TABLES[table]
+        filters = []
+        args: list[Any] = []
+        for column, operator, value in (
+            (date_column, '>=', query_params.date_from),
+            (date_column, '<', query_params.date_to),
+            ('id', '>=', query_params.id_from),
+            ('id', '<=', query_params.id_to),
+        ):
+            if value is None:
+                continue
+            if isinstance(value, datetime):
+                value = datetime.fromisoformat(
+                    value.strftime('%Y-%m-%dT%H:%M:%S')
+                )
+            args.append(value)
+            filters.append(f'{column} {operator} ${len(args)}')
+
+        filter = f'WHERE {" AND ".join(filters)} ' if filters else ''
+        query = (
+            f'SELECT {", ".join(columns)} FROM {table} '
+            f'{filter}'
+            'ORDER BY id'
+        )
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_from_query(
+            query, *args, output=output, format='csv', header=True
+        )
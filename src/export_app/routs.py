@@ -0,0 +1,29 @@
+from typing import Annotated, Final, Literal
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from src.dependencies import QueryParamsExport
+from src.export_app.dependencies import export_service
+from src.export_app.services import ExportService
+
+
+export_api = APIRouter(prefix='/export')
+
+TAG: Final[str] = 'Выгрузка'
+
+
+@export_api.get(
+    '/{table}',
+    tags=[TAG],
+    summary='Выгрузить таблицу в CSV',
+    response_class=StreamingResponse,
+)
+async def export(
+    table: Literal['appointments', 'clients', 'diagnosis', 'disease_diagnosis'],
+    service: Annotated[ExportService, Depends(export_service)],
+    query_params: Annotated[QueryParamsExport, Depends(QueryParamsExport)],
+):
+    return StreamingResponse(
+        service.stream(table=table, query_params=query_params),
+        media_type='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{table}.csv"'},
+    )
@@ -0,0 +1,72 @@
+import asyncio
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Final, Optional
+
+from src.dependencies import QueryParamsExport, create_read_session
+from src.export_app.repositories import IExportRepository
+
+
+# Chunks buffered between COPY and a slow reader before COPY is paused
+EXPORT_QUEUE_SIZE: Final[int] = 16
+
+
+class ExportService:
+    def __init__(self, repository: IExportRepository):
+        self.repository = repository
+
+    async def stream(
+        self, table: str, query_params: QueryParamsExport
+    ) -> AsyncIterator[bytes]:
+        queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(
+            maxsize=EXPORT_QUEUE_SIZE
+        )
+
+        async def put(chunk: bytes) -> None:
+            # asyncpg hands out a bytearray, the response needs bytes
+            await queue.put(bytes(chunk))
+
+        async def copy() -> None:
+            try:
+                async with create_read_session() as session:
+                    await self.repository.copy(
+                        session=session,
+                        table=table,
+                        query_params=query_params,
+                        output=put,
+                    )
+            except asyncio.CancelledError:
+                # the reader is gone, nothing waits for the end of the
+                # stream and a put into a full queue would never return
+                raise
+            except Exception:
+                await queue.put(None)
+                raise
+            await queue.put(None)
+
+        task = asyncio.create_task(copy())
+        try:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+            # re-raise a failed COPY instead of ending the stream quietly
+            await task
+        finally:
+            # a client that disconnected stops the COPY
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def to_file(
+        self, table: str, query_params: QueryParamsExport, path: Path
+    ) -> None:
+        with path.open('wb') as file:
+
+            async def write(chunk: bytes) -> None:
+                file.write(chunk)
+
+            async with create_read_session() as session:
+                await self.repository.copy(
+                    session=session,
+                    table=table,
+                    query_params=query_params,
+                    output=write,
+                )
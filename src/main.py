@@ -3,7 +3,18 @@ import fastapi
 from fastapi.requests import Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from src.exceptions import BadRequestEx, NotFoundEx
+from src.dependencies import (
+    ETAG_HEADER,
+    NEXT_CURSOR_HEADER,
+    READ_METHODS,
+    READ_PRIMARY_COOKIE,
+)
+from src.exceptions import (
+    BadRequestEx,
+    ConflictEx,
+    NotFoundEx,
+    PreconditionFailedEx,
+)
 from src.profession_app.routs import profession_api
 from src.doctor_app.routs import doctor_api, appointment_api
 from src.client_app.routs import client_api
@@ -12,6 +23,8 @@ from src.diagnosis_app.routs import (
     diagnosis_api,
     disease_api,
 )
+from src.export_app.routs import export_api
+from src.metrics import metrics_api
 from src.config import settings
 
 app = FastAPI(debug=settings.debug, version='1.0', title='Clinic')
@@ -27,8 +40,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
 
+
+@app.middleware('http')
+async def read_primary_after_write(request: Request, call_next):
+    """Keep the client on the primary until replicas caught up with its
+    write, so it reads what it has just written"""
+    response = await call_next(request)
+    if (
+        settings.replica_urls
+        and request.method not in READ_METHODS
+        and response.status_code < 400
+    ):
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            '1',
+            max_age=settings.replica_lag,
+            httponly=True,
+        )
+    return response
+
 api = fastapi.APIRouter(prefix='/api')
 v1 = fastapi.APIRouter(prefix='/v1')
 
@@ -39,6 +72,8 @@ v1.include_router(client_api)
 v1.include_router(category_disease_api)
 v1.include_router(disease_api)
 v1.include_router(diagnosis_api)
+v1.include_router(export_api)
+v1.include_router(metrics_api)
 api.include_router(v1)
 app.include_router(api)
 
@@ -57,3 +92,21 @@ async def not_found_exception_handler(request: Request, exc: NotFoundEx):
         status_code=404,
         content={'message': f'{exc.detail}'},
     )
+
+
+@app.exception_handler(ConflictEx)
+async def conflict_exception_handler(request: Request, exc: ConflictEx):
+    return JSONResponse(
+        status_code=409,
+        content={'message': f'{exc.detail}', 'conflictId': exc.conflict_id},
+    )
+
+
+@app.exception_handler(PreconditionFailedEx)
+async def precondition_failed_exception_handler(
+    request: Request, exc: PreconditionFailedEx
+):
+    return JSONResponse(
+        status_code=412,
+        content={'message': f'{exc.detail}'},
+    )
@@ -0,0 +1,28 @@
+from typing import Final
+from fastapi import APIRouter
+
+from src.cache import caches
+from src.queries import queries
+
+
+metrics_api = APIRouter(prefix='/metrics')
+
+TAG: Final[str] = 'Метрики'
+
+
+@metrics_api.get(
+    '/queries',
+    tags=[TAG],
+    summary='Статистика кэша запросов',
+)
+async def get_queries() -> dict[str, dict[str, int]]:
+    return queries.stats()
+
+
+@metrics_api.get(
+    '/caches',
+    tags=[TAG],
+    summary='Статистика кэша справочников',
+)
+async def get_caches() -> dict[str, dict[str, int]]:
+    return caches.stats()
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Generic, Optional, TypeVar
 
 from pydantic import BaseModel, ConfigDict
 from pydantic.alias_generators import to_camel
@@ -13,6 +13,8 @@ import pydantic
 str_50 = Annotated[str, 50]
 str_255 = Annotated[str, 50]
 
+T = TypeVar('T')
+
 
 class Base(DeclarativeBase):
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -49,3 +51,10 @@ class BaseUser(Base):
 
 class BaseScheme(BaseModel):
     model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+
+
+class PageScheme(BaseScheme, Generic[T]):
+    items: list[T]
+    total: Optional[int]
+    has_more: bool
+    next_cursor: Optional[str]
@@ -1,10 +1,15 @@
 __all__ = ['ProfessionORM']
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.models import Base
 
 class ProfessionORM(Base):
     __tablename__ = 'professions'
 
+    __table_args__ = (
+        Index('ix_professions_created_at_id', 'created_at', 'id'),
+        Index('ix_professions_name_id', 'name', 'id'),
+    )
+
     name: Mapped[str] = mapped_column(String(255), unique=True)
     doctors: Mapped['Doctor'] = relationship(back_populates='profession')
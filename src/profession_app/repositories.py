@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from datetime import datetime
+from typing import Any, Final, Optional
 from sqlalchemy import text
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.dependencies import QueryParams
+from src.queries import queries
+from src.dependencies import Keyset, Paginator, QueryParams
 from src.exceptions import BadRequestEx
 
 from src.profession_app.dtos import (
@@ -13,6 +15,12 @@ from src.profession_app.dtos import (
 )
 
 
+PROFESSION_ORDERING: Final[dict[str, tuple[str, type]]] = {
+    'created_at': ('p.created_at', datetime),
+    'name': ('p.name', str),
+}
+
+
 class IProfessionRepository(ABC):
     @abstractmethod
     async def get_by_id(
@@ -24,8 +32,7 @@ class IProfessionRepository(ABC):
     async def get_list(
         self,
         session: AsyncSession,
-        limit: int,
-        offset: int,
+        pagination: Paginator,
         query_params: QueryParams,
     ) -> list[ProfessionDataDetailGet] | list:
         raise NotImplementedError()
@@ -43,7 +50,7 @@ class IProfessionRepository(ABC):
     @abstractmethod
     async def update(
         self, data: ProfessionDataCreate, session: AsyncSession, id: int
-    ) -> ProfessionDataGet:
+    ) -> Optional[ProfessionDataGet]:
         raise NotImplementedError()
 
 
@@ -70,45 +77,49 @@ class ProfessionRepository(IProfessionRepository):
 
     async def get_list(
         self,
-        limit: int,
-        offset: int,
         session: AsyncSession,
+        pagination: Paginator,
         query_params: QueryParams,
     ) -> list[ProfessionDataDetailGet] | list:
         search = ''
-        order = ''
-        params = {'limit': limit, 'offset': offset}
+        params: dict[str, Any] = {}
+        keyset = Keyset(
+            pagination=pagination,
+            order=query_params.order,
+            columns=PROFESSION_ORDERING,
+            id_column='p.id',
+        )
 
         if query_params.search:
             search = 'WHERE p.name LIKE :search '
             params['search'] = query_params.search
 
-        if query_params.order:
-            match query_params.order:
-                case 'created_at':
-                    order = 'ORDER BY p.created_at ASC '
-                case '-created_at':
-                    order = 'ORDER BY p.created_at DESC '
-                case 'name':
-                    order = 'ORDER BY p.name ASC '
-                case '_':
-                    pass
-
-        query = (
-            'SELECT p.id, p.name, p.created_at, p.updated_at, COUNT(d.id) as number_of_specialists '
-            'FROM professions p  '
-            'LEFT JOIN doctors d ON p.id=d.profession_id '
-            f'{search}'
-            'GROUP BY p.id, p.name, p.created_at, p.updated_at '
-            f'{order}'
-            'LIMIT :limit OFFSET :offset '
+        total = keyset.total('professions', 'p', search)
+        if seek := keyset.where(params):
+            search += f'AND {seek} ' if search else f'WHERE {seek} '
+
+        limit = keyset.limit(params)
+        query = queries.get(
+            'professions.list',
+            (bool(query_params.search), keyset.shape),
+            lambda: (
+                'SELECT p.id, p.name, p.created_at, p.updated_at, COUNT(d.id) as number_of_specialists '
+                f'{keyset.select}'
+                f'{total}'
+                'FROM professions p  '
+                'LEFT JOIN doctors d ON p.id=d.profession_id '
+                f'{search}'
+                'GROUP BY p.id, p.name, p.created_at, p.updated_at '
+                f'{keyset.order_by}'
+                f'{limit}'
+            ),
         )
-        result = await session.execute(text(query), params)
-        rows = result.fetchall()
+        result = await session.execute(query, params)
+        rows = keyset.page(result.fetchall())
         professions = []
 
         for row in rows:
-            id, name, created_at, updated_at, number_of_specialists = row
+            id, name, created_at, updated_at, number_of_specialists, *_ = row
             professions.append(
                 ProfessionDataDetailGet(
                     name=name,
@@ -121,10 +132,11 @@ class ProfessionRepository(IProfessionRepository):
         return professions
 
     async def delete(self, id: int, session: AsyncSession) -> bool:
-        query = text('DELETE FROM professions WHERE id=:id')
-        await session.execute(query, {'id': id})
+        query = text('DELETE FROM professions WHERE id=:id RETURNING id')
+        result = await session.execute(query, {'id': id})
+        deleted = result.scalar() is not None
         await session.commit()
-        return True
+        return deleted
 
     async def create(
         self, data: ProfessionDataCreate, session: AsyncSession
@@ -146,7 +158,7 @@ class ProfessionRepository(IProfessionRepository):
 
     async def update(
         self, id: int, data: ProfessionDataCreate, session: AsyncSession
-    ) -> ProfessionDataGet:
+    ) -> Optional[ProfessionDataGet]:
         query = text(
             'UPDATE professions SET name=:name, updated_at=now() '
             'WHERE id=:id RETURNING id, name, created_at, updated_at'
@@ -154,7 +166,7 @@ class ProfessionRepository(IProfessionRepository):
         result = await session.execute(query, {'id': id, **data})
         row = result.fetchone()
         if not row:
-            raise BadRequestEx(detail='Failed to update a profession')
+            return None
         raw_id, name, created_at, updated_at = row
         await session.commit()
         return ProfessionDataGet(
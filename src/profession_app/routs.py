@@ -1,10 +1,20 @@
 from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.dependencies import Paginator, QueryParams, get_session
+from src.dependencies import (
+    NEXT_CURSOR_HEADER,
+    Paginator,
+    QueryParams,
+    get_session,
+)
+from src.models import PageScheme
 from src.profession_app.dependencies import profession_service
 
-from src.profession_app.schemes import ProfessionCreateScheme, ProfessionScheme
+from src.profession_app.schemes import (
+    ProfessionCreateScheme,
+    ProfessionDetailScheme,
+    ProfessionScheme,
+)
 from src.profession_app.services import ProfessionService
 
 
@@ -15,17 +25,24 @@ profession_api = APIRouter(prefix='/professions')
     '/',
     tags=['Профессия'],
     summary='Получить все профессии',
-    response_model=list[ProfessionScheme] | list,
+    response_model=(
+        list[ProfessionDetailScheme] | PageScheme[ProfessionDetailScheme]
+    ),
 )
 async def get_list(
     service: Annotated[ProfessionService, Depends(profession_service)],
     session: Annotated[AsyncSession, Depends(get_session)],
     pagination: Annotated[Paginator, Depends(Paginator)],
-    query_params: Annotated[QueryParams, Depends(QueryParams)]
+    query_params: Annotated[QueryParams, Depends(QueryParams)],
+    response: Response,
 ):
     professions: list[ProfessionScheme] | list = await service.get_list(
         session=session, pagination=pagination, query_params=query_params
     )
+    if pagination.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = pagination.next_cursor
+    if pagination.envelope:
+        return pagination.page(professions)
     return professions
 
 
@@ -2,6 +2,7 @@ from typing import NoReturn, Optional
 from sqlalchemy.exc import IntegrityError
 
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.cache import caches
 from src.dependencies import Paginator, QueryParams
 from src.exceptions import BadRequestEx, NotFoundEx
 from src.profession_app.dtos import (
@@ -20,6 +21,7 @@ from src.profession_app.schemes import (
 class ProfessionService:
     def __init__(self, repository: IProfessionRepository):
         self.repository = repository
+        self.cache = caches.get('professions')
 
     async def _check_exists(
         self, id: int, session: AsyncSession
@@ -34,8 +36,11 @@ class ProfessionService:
     async def get_by_id(
         self, id: int, session: AsyncSession
     ) -> ProfessionScheme:
-        profession = await self._check_exists(id=id, session=session)
-        return ProfessionScheme(**profession)
+        async def load() -> ProfessionScheme:
+            profession = await self._check_exists(id=id, session=session)
+            return ProfessionScheme(**profession)
+
+        return await self.cache.fetch(('id', id), load)
 
     async def get_list(
         self,
@@ -43,19 +48,36 @@ class ProfessionService:
         pagination: Paginator,
         query_params: QueryParams,
     ) -> list[ProfessionScheme] | list:
-        professions: list[
-            ProfessionDataDetailGet
-        ] | list = await self.repository.get_list(
-            session=session, 
-            limit=pagination.limit, 
-            offset=pagination.offset,
-            query_params=query_params
+        async def load() -> tuple[
+            list[ProfessionScheme] | list, Optional[str], Optional[int]
+        ]:
+            professions: list[
+                ProfessionDataDetailGet
+            ] | list = await self.repository.get_list(
+                session=session,
+                pagination=pagination,
+                query_params=query_params
+            )
+            return [
+                ProfessionDetailScheme(**profession)
+                for profession in professions
+            ], pagination.next_cursor, pagination.total
+
+        key = (
+            'list',
+            pagination.limit,
+            pagination.offset,
+            pagination.cursor,
+            query_params.search,
+            query_params.order,
+            pagination.count,
         )
-        if not professions:
-            return professions
-        return [
-            ProfessionDetailScheme(**profession) for profession in professions
-        ]
+        (
+            professions,
+            pagination.next_cursor,
+            pagination.total,
+        ) = await self.cache.fetch(key, load)
+        return professions
 
     async def create(
         self, session: AsyncSession, data: ProfessionCreateScheme
@@ -68,13 +90,12 @@ class ProfessionService:
             raise BadRequestEx(
                 detail='There is already a profession with this name'
             )
+        self.cache.invalidate()
         return ProfessionScheme(**profession)
 
     async def update(
         self, session: AsyncSession, data: ProfessionCreateScheme, id: int
     ) -> ProfessionScheme:
-        profession = await self._check_exists(id=id, session=session)
-
         try:
             profession = await self.repository.update(
                 session=session,
@@ -85,11 +106,14 @@ class ProfessionService:
             raise BadRequestEx(
                 detail='There is already a profession with this name'
             )
+        if not profession:
+            raise NotFoundEx(detail=f'Profession with id: {id} not found')
+        self.cache.invalidate()
         return ProfessionScheme(**profession)
 
     async def delete(self, id: int, session: AsyncSession) -> None:
-        await self._check_exists(id=id, session=session)
         deleted = await self.repository.delete(session=session, id=id)
         if not deleted:
-            raise BadRequestEx(detail='Failed to delete a profession')
+            raise NotFoundEx(detail=f'Profession with id: {id} not found')
+        self.cache.invalidate()
         return None
@@ -0,0 +1,57 @@
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Hashable
+
+from sqlalchemy import TextClause, text
+
+
+class QueryRegistry:
+    """Statements of the dynamic queries, built once per query shape.
+
+    A list query varies only by which filters and which ordering are
+    used, all values are bound, so the shape (e.g. ``(has_search, order,
+    has_cursor)``) fully determines its SQL. The statement is built and
+    parsed on the first request of a shape and reused afterwards, which
+    also keeps the SQLAlchemy compiled cache and the asyncpg prepared
+    statement cache down to one entry per shape.
+
+    The shapes are a finite set, ``Keyset`` rejects the orders a list does
+    not know, the registry is still bounded to the ``maxsize`` most
+    recently used statements.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._statements: OrderedDict[
+            tuple[str, Hashable], TextClause
+        ] = OrderedDict()
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    def get(
+        self, name: str, shape: Hashable, build: Callable[[], str]
+    ) -> TextClause:
+        key = (name, shape)
+        statement = self._statements.get(key)
+        if statement is None:
+            self.misses[name] += 1
+            statement = self._statements[key] = text(build())
+            while len(self._statements) > self.maxsize:
+                self._statements.popitem(last=False)
+        else:
+            self._statements.move_to_end(key)
+            self.hits[name] += 1
+        return statement
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        shapes = Counter(name for name, _ in self._statements)
+        return {
+            name: {
+                'shapes': shapes[name],
+                'hits': self.hits[name],
+                'misses': self.misses[name],
+            }
+            for name in sorted(shapes)
+        }
+
+
+queries = QueryRegistry()
@@ -0,0 +1,39 @@
+from collections.abc import Iterator
+from typing import Final
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import DBAPIError
+
+from src.cache import caches
+from src.config import settings
+from src.tests.utils import truncate
+
+
+# The database tests empty every table, they run only against a database
+# made for them, migrated to the head revision
+TEST_DB_SUFFIX: Final[str] = '_test'
+
+
+@pytest.fixture(scope='session')
+def client() -> Iterator[TestClient]:
+    """One client for the session, the pooled connections belong to the
+    event loop of its portal"""
+    if not settings.db_name.endswith(TEST_DB_SUFFIX):
+        pytest.skip(f'DB_NAME does not end with {TEST_DB_SUFFIX}')
+    from src.main import app
+
+    with TestClient(app) as client:
+        try:
+            client.portal.call(truncate)
+        except (DBAPIError, OSError) as exc:
+            pytest.skip(f'test database is not available: {exc}')
+        yield client
+
+
+@pytest.fixture
+def api(client: TestClient) -> TestClient:
+    """``client`` over empty tables and caches"""
+    client.portal.call(truncate)
+    caches.invalidate()
+    return client
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from src.cache import TTLCache
+
+
+class Loads:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+@pytest.mark.asyncio
+async def test_fetch_serves_a_loaded_value():
+    cache = TTLCache(ttl=60, maxsize=10)
+    load = Loads()
+    assert await cache.fetch('a', load) == 1
+    assert await cache.fetch('a', load) == 1
+    assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 1}
+
+
+@pytest.mark.asyncio
+async def test_expired_value_is_loaded_again():
+    cache = TTLCache(ttl=0, maxsize=10)
+    load = Loads()
+    await cache.fetch('a', load)
+    assert await cache.fetch('a', load) == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_goes_first():
+    cache = TTLCache(ttl=60, maxsize=2)
+    load = Loads()
+    await cache.fetch('a', load)
+    await cache.fetch('b', load)
+    await cache.fetch('a', load)
+    await cache.fetch('c', load)
+    assert await cache.fetch('a', load) == 1
+    assert await cache.fetch('b', load) == 4
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_always_loads():
+    cache = TTLCache(ttl=60, maxsize=10, enabled=False)
+    load = Loads()
+    await cache.fetch('a', load)
+    assert await cache.fetch('a', load) == 2
+    assert cache.stats()['size'] == 0
+
+
+@pytest.mark.asyncio
+async def test_load_started_before_an_invalidation_is_not_stored():
+    cache = TTLCache(ttl=60, maxsize=10)
+    loading = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_load() -> str:
+        loading.set()
+        await release.wait()
+        return 'stale'
+
+    task = asyncio.create_task(cache.fetch('a', slow_load))
+    await loading.wait()
+    cache.invalidate()
+    release.set()
+    assert await task == 'stale'
+    assert cache.stats()['size'] == 0
+
+
+@pytest.mark.asyncio
+async def test_fetch_many_loads_only_the_missing_keys():
+    cache = TTLCache(ttl=60, maxsize=10)
+    requested = []
+
+    async def load(keys: list[str]) -> dict[str, str]:
+        requested.append(keys)
+        # a key the load does not know is left out
+        return {key: key.upper() for key in keys if key != 'x'}
+
+    assert await cache.fetch_many(['a', 'b'], load) == {'a': 'A', 'b': 'B'}
+    assert await cache.fetch_many(['a', 'c', 'x'], load) == {
+        'a': 'A',
+        'c': 'C',
+    }
+    assert requested == [['a', 'b'], ['c', 'x']]
+    assert await cache.fetch_many([], load) == {}
+    assert requested == [['a', 'b'], ['c', 'x']]
+
+
+@pytest.mark.asyncio
+async def test_modify_changes_a_cached_value_in_place():
+    cache = TTLCache(ttl=60, maxsize=10)
+
+    async def load() -> list[int]:
+        return [1]
+
+    value = await cache.fetch('a', load)
+    cache.modify('a', lambda items: items.append(2))
+    cache.modify('missing', lambda items: items.append(3))
+    assert await cache.fetch('a', load) == value == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_discard_drops_only_the_given_keys():
+    cache = TTLCache(ttl=60, maxsize=10)
+    load = Loads()
+    for key in [(1, 'a'), (1, 'b'), (2, 'a')]:
+        await cache.fetch(key, load)
+    cache.discard((1, 'a'))
+    cache.discard((3, 'a'))
+    assert await cache.fetch((1, 'b'), load) == 2
+    assert await cache.fetch((1, 'a'), load) == 4
+    cache.discard_where(lambda key: key[0] == 1)
+    assert await cache.fetch((2, 'a'), load) == 3
+    assert cache.stats()['size'] == 1
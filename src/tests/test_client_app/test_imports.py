@@ -0,0 +1,68 @@
+from collections.abc import AsyncIterator
+
+import pytest
+
+from src.client_app.imports import read_csv, read_lines, read_ndjson
+
+
+async def chunks(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(rows: AsyncIterator) -> list:
+    return [row async for row in rows]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('size', [1, 3, 1024])
+async def test_lines_split_across_chunks(size: int):
+    data = '﻿первая\r\nвторая\nтретья'.encode()
+    assert await collect(read_lines(chunks(data, size))) == [
+        (1, 'первая'),
+        (2, 'вторая'),
+        (3, 'третья'),
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('size', [1, 7, 1024])
+async def test_csv_rows_by_header(size: int):
+    data = (
+        'firstName, lastName,address\n'
+        'Иван,Иванов,"Москва,\nул. Ленина"\n'
+        '\n'
+        'Пётр,Петров,"""Дом"""\n'
+    ).encode()
+    assert await collect(read_csv(chunks(data, size))) == [
+        (
+            2,
+            {
+                'firstName': 'Иван',
+                'lastName': 'Иванов',
+                'address': 'Москва,\nул. Ленина',
+            },
+        ),
+        (
+            5,
+            {'firstName': 'Пётр', 'lastName': 'Петров', 'address': '"Дом"'},
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_csv_without_a_final_newline_in_quotes():
+    data = 'a,b\n1,"x\ny'.encode()
+    assert await collect(read_csv(chunks(data, 4))) == [
+        (2, {'a': '1', 'b': 'x\ny'}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_documents():
+    data = b'{"a": 1}\n\n  \n[1, 2]\nnot json\n'
+    assert await collect(read_ndjson(chunks(data, 5))) == [
+        (1, {'a': 1}),
+        (4, [1, 2]),
+        (5, 'not json'),
+    ]
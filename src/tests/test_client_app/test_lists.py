@@ -0,0 +1,50 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.tests.utils import assert_pages, create_client
+
+
+ROWS = 7
+PAGE = 3
+
+
+@pytest.fixture
+def clients(api: TestClient) -> list[int]:
+    # created in the reverse order of the last names
+    return [create_client(api, f'Клиент{ROWS - i}') for i in range(ROWS)]
+
+
+def test_client_pages(api: TestClient, clients: list[int]):
+    assert_pages(api, 'clients', clients, PAGE)
+
+
+def test_client_pages_by_last_name(api: TestClient, clients: list[int]):
+    assert_pages(api, 'clients', clients[::-1], PAGE, order='last_name')
+
+
+@pytest.mark.parametrize(
+    'path', ['clients', 'professions', 'category_diseases', 'diseases']
+)
+@pytest.mark.parametrize(
+    'params',
+    [
+        {'limit': 0},
+        {'limit': -1},
+        {'offset': -1},
+    ],
+)
+def test_page_bounds(api: TestClient, path: str, params: dict[str, int]):
+    assert api.get(f'/api/v1/{path}/', params=params).status_code == 422
+
+
+def test_large_page(api: TestClient, clients: list[int]):
+    """Offset clients syncing a whole table ask for pages of any size"""
+    response = api.get('/api/v1/clients/', params={'limit': 10_000})
+    assert response.status_code == 200
+    assert [client['id'] for client in response.json()] == clients
+
+
+@pytest.mark.parametrize('order', ['--last_name', '---last_name', 'password'])
+def test_invalid_order(api: TestClient, clients: list[int], order: str):
+    response = api.get('/api/v1/clients/', params={'order': order})
+    assert response.status_code == 400
@@ -0,0 +1,14 @@
+from fastapi.testclient import TestClient
+
+from src.dependencies import ETAG_HEADER, NEXT_CURSOR_HEADER
+from src.tests.utils import create_client
+
+
+def test_cross_origin_reads_etag_and_cursor(api: TestClient):
+    id = create_client(api)
+    response = api.get(
+        f'/api/v1/clients/{id}', headers={'Origin': 'http://localhost:3000'}
+    )
+    assert ETAG_HEADER in response.headers
+    exposed = response.headers['Access-Control-Expose-Headers'].split(', ')
+    assert {ETAG_HEADER, NEXT_CURSOR_HEADER} <= set(exposed)
@@ -0,0 +1,170 @@
+from datetime import datetime
+
+import pytest
+
+from src.dependencies import (
+    Keyset,
+    Paginator,
+    decode_cursor,
+    encode_cursor,
+    etag_matches,
+    make_etag,
+    parse_if_match,
+)
+from src.exceptions import BadRequestEx
+
+
+COLUMNS = {
+    'created_at': ('t.created_at', datetime),
+    'name': ('t.name', str),
+}
+UPDATED_AT = datetime(2026, 3, 1, 9, 30, 15, 123456)
+
+
+class Row:
+    def __init__(self, id: int, cursor_key=None, total=None):
+        self.id = id
+        self.cursor_key = cursor_key
+        self.total = total
+
+
+def keyset(order=None, **pagination) -> Keyset:
+    return Keyset(
+        pagination=Paginator(**pagination),
+        order=order,
+        columns=COLUMNS,
+        id_column='t.id',
+    )
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('created_at', UPDATED_AT, 7)
+    assert decode_cursor(cursor) == ['created_at', UPDATED_AT.isoformat(), 7]
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'eyJhIjogMX0=', ''])
+def test_invalid_cursor(cursor: str):
+    with pytest.raises(BadRequestEx):
+        decode_cursor(cursor)
+
+
+def test_order_by_key_then_id():
+    assert keyset('-name').order_by == 'ORDER BY t.name DESC, t.id DESC '
+    assert keyset('created_at').order_by == (
+        'ORDER BY t.created_at ASC, t.id ASC '
+    )
+
+
+def test_empty_order_falls_back_to_id():
+    ks = keyset('')
+    assert ks.order_by == 'ORDER BY t.id ASC '
+    assert ks.select == ' '
+
+
+@pytest.mark.parametrize('order', ['password', '--name', '-', '+name'])
+def test_invalid_order(order: str):
+    with pytest.raises(BadRequestEx):
+        keyset(order)
+
+
+def test_first_page_has_no_seek_and_an_offset():
+    ks = keyset('name', limit=5, offset=10)
+    params = {}
+    assert ks.where(params) is None
+    assert ks.limit(params) == 'LIMIT :limit OFFSET :offset '
+    assert params == {'limit': 6, 'offset': 10}
+
+
+def test_cursor_page_seeks_past_the_key():
+    cursor = encode_cursor('-created_at', UPDATED_AT, 7)
+    ks = keyset('-created_at', cursor=cursor)
+    params = {}
+    assert ks.where(params) == (
+        '(t.created_at, t.id) < (:cursor_key, :cursor_id)'
+    )
+    assert params == {'cursor_id': 7, 'cursor_key': UPDATED_AT}
+    assert ks.limit(params) == 'LIMIT :limit '
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        # another order
+        encode_cursor('name', 'Иванов', 7),
+        # no key
+        encode_cursor('created_at', 7),
+        # not a date
+        encode_cursor('created_at', 'yesterday', 7),
+        # not an id
+        encode_cursor('created_at', UPDATED_AT, None),
+    ],
+)
+def test_cursor_of_another_list(cursor: str):
+    with pytest.raises(BadRequestEx):
+        keyset('created_at', cursor=cursor).where({})
+
+
+def test_page_trims_the_look_ahead_row():
+    ks = keyset('name', limit=2)
+    rows = ks.page([Row(1, 'a'), Row(2, 'b'), Row(3, 'c')])
+    assert [row.id for row in rows] == [1, 2]
+    assert decode_cursor(ks.pagination.next_cursor) == ['name', 'b', 2]
+
+
+def test_last_page_has_no_cursor():
+    ks = keyset(limit=2)
+    assert len(ks.page([Row(1), Row(2)])) == 2
+    assert ks.pagination.next_cursor is None
+
+
+def test_total_is_raised_to_the_rows_shown():
+    ks = keyset(limit=2, offset=4, envelope=True)
+    ks.page([Row(5, total=3), Row(6, total=3), Row(7, total=3)])
+    # a stale estimate of 3, the offset page has shown 6 and there is more
+    assert ks.pagination.total == 7
+
+
+def test_empty_first_page_has_a_zero_total():
+    ks = keyset(envelope=True, count='exact')
+    ks.page([])
+    assert ks.pagination.total == 0
+
+
+def test_total_only_with_an_envelope():
+    assert keyset(count='exact').total('t', 't', '') == ' '
+    exact = keyset(envelope=True, count='exact')
+    assert 'count(*)' in exact.total('t', 't', '')
+    assert 'reltuples' in keyset(envelope=True).total('t', 't', '')
+    # statistics can not tell the total of a filtered list
+    assert 'count(*)' in keyset(envelope=True).total('t', 't', 'WHERE x')
+
+
+def test_json_page_counts_offset_rows_from_the_offset():
+    assert '(page.row_number - :offset)' in keyset(offset=10).json_page('q')
+    cursor = encode_cursor('', 7)
+    assert ':offset' not in keyset(cursor=cursor).json_page('q')
+
+
+def test_page_json_wraps_the_items():
+    pagination = Paginator(envelope=True)
+    pagination.total = 3
+    assert pagination.page_json('[1,2,3]') == (
+        '{"items":[1,2,3],"total":3,"hasMore":false,"nextCursor":null}'
+    )
+
+
+def test_etag_changes_with_the_row_version():
+    etag = make_etag(7, UPDATED_AT)
+    assert etag == 'W/"7-20260301093015123456"'
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"x", {etag.removeprefix("W/")}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(make_etag(7, datetime(2026, 3, 1)), etag)
+
+
+def test_if_match_versions_of_the_row():
+    assert parse_if_match('*', 7) is None
+    other = make_etag(8, datetime(2026, 1, 1))
+    header = f'{make_etag(7, UPDATED_AT)}, {other}'
+    assert parse_if_match(header, 7) == [UPDATED_AT]
+    assert parse_if_match('"7-garbage", W/"7"', 7) == []
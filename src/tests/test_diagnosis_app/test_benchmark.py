@@ -0,0 +1,85 @@
+from typing import Final
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.dependencies import Paginator, QueryParams
+from src.diagnosis_app.repositories import DiagnosisRepository
+from src.engine import async_session_factory
+from src.tests.utils import (
+    create,
+    create_client,
+    create_doctor,
+    create_profession,
+    explain,
+)
+
+
+ROWS: Final[int] = 20
+CATALOG: Final[int] = 50_000
+
+
+async def grow_catalog(category: int, first: int) -> None:
+    """``CATALOG`` diseases no diagnosis refers to"""
+    async with async_session_factory() as session:
+        await session.execute(
+            text(
+                'INSERT INTO diseases (name, description, '
+                'category_disease_id, created_at, updated_at) '
+                "SELECT 'Каталог' || i, 'Описание', :category, now(), now() "
+                'FROM generate_series(CAST(:first AS integer), '
+                ':first + :rows - 1) i'
+            ),
+            {'category': category, 'first': first, 'rows': CATALOG},
+        )
+        await session.commit()
+        await session.execute(text('ANALYZE'))
+        await session.commit()
+
+
+async def list_blocks() -> int:
+    """Blocks a page of diagnoses reads"""
+    plan = await explain(
+        lambda session: DiagnosisRepository().get_list(
+            session=session,
+            pagination=Paginator(limit=ROWS),
+            query_params=QueryParams(),
+        ),
+        options='ANALYZE, BUFFERS, FORMAT JSON',
+    )
+    return plan['Shared Hit Blocks'] + plan['Shared Read Blocks']
+
+
+def test_list_cost_does_not_grow_with_the_catalog(api: TestClient):
+    doctor = create_doctor(api, 'Доктор', create_profession(api))
+    client = create_client(api)
+    category = create(api, 'category_diseases', {'name': 'Категория'})['id']
+    for i in range(ROWS):
+        disease = create(
+            api,
+            'diseases',
+            {
+                'name': f'Болезнь{i}',
+                'description': 'Описание',
+                'categoryDisease': category,
+            },
+        )['id']
+        create(
+            api,
+            'diagnosis',
+            {
+                'name': f'Диагноз{i}',
+                'description': 'Описание',
+                'status': 'ACTIVE',
+                'doctor': doctor,
+                'client': client,
+                'disease': [disease],
+            },
+        )
+    # the lookups of the diseases go as deep in the index of both catalogs,
+    # a scan of the catalog would read twice as many blocks of the second
+    api.portal.call(grow_catalog, category, 1)
+    small = api.portal.call(list_blocks)
+    api.portal.call(grow_catalog, category, CATALOG + 1)
+    large = api.portal.call(list_blocks)
+    assert large <= small * 1.1, (small, large)
@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.diagnosis_app.schemes import DiagnosisScheme
+from src.tests.utils import (
+    assert_matches_scheme,
+    assert_pages,
+    create,
+    create_client,
+    create_doctor,
+    create_profession,
+)
+
+
+ROWS = 7
+PAGE = 3
+
+
+@pytest.fixture
+def diagnoses(api: TestClient) -> list[int]:
+    doctor = create_doctor(api, 'Доктор', create_profession(api))
+    client = create_client(api)
+    category = create(api, 'category_diseases', {'name': 'Категория'})['id']
+    disease = create(
+        api,
+        'diseases',
+        {'name': 'Болезнь', 'description': 'Описание', 'categoryDisease': category},
+    )['id']
+    for i in range(ROWS):
+        create(
+            api,
+            'diagnosis',
+            {
+                'name': f'Диагноз{i}',
+                'description': 'Описание',
+                'status': 'ACTIVE',
+                'doctor': doctor,
+                'client': client,
+                'disease': [disease],
+            },
+        )
+    # the create route does not return the id, the ids restart with the table
+    return list(range(1, ROWS + 1))
+
+
+def test_diagnosis_pages(api: TestClient, diagnoses: list[int]):
+    assert_pages(api, 'diagnosis', diagnoses, PAGE)
+
+
+def test_diagnosis_pages_by_created_at(api: TestClient, diagnoses: list[int]):
+    assert_pages(api, 'diagnosis', diagnoses[::-1], PAGE, order='-created_at')
+
+
+def test_diagnosis_page_matches_scheme(api: TestClient, diagnoses: list[int]):
+    assert_matches_scheme(api, 'diagnosis', DiagnosisScheme)
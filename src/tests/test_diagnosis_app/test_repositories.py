@@ -0,0 +1,80 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.diagnosis_app.dtos import DiagnosisCreateData
+from src.diagnosis_app.repositories import DiagnosisRepository
+from src.engine import async_session_factory
+from src.tests.utils import (
+    create,
+    create_client,
+    create_doctor,
+    create_profession,
+)
+
+
+WRITERS = 8
+
+
+def test_concurrent_updates_link_a_disease_once(api: TestClient):
+    doctor = create_doctor(api, 'Доктор', create_profession(api))
+    client = create_client(api)
+    category = create(api, 'category_diseases', {'name': 'Категория'})['id']
+    diseases = [
+        create(
+            api,
+            'diseases',
+            {
+                'name': f'Болезнь{i}',
+                'description': 'Описание',
+                'categoryDisease': category,
+            },
+        )['id']
+        for i in range(3)
+    ]
+    data = DiagnosisCreateData(
+        name='Диагноз',
+        description='Описание',
+        status='ACTIVE',
+        client=client,
+        doctor=doctor,
+        disease=diseases[:1],
+    )
+
+    async def update(id: int) -> None:
+        async with async_session_factory() as session:
+            await DiagnosisRepository().update(
+                id=id, data={**data, 'disease': diseases}, session=session
+            )
+
+    async def create_and_update() -> list[tuple[int, int]]:
+        async with async_session_factory() as session:
+            diagnosis = await DiagnosisRepository().create(
+                data=data, session=session
+            )
+        async with async_session_factory() as blocker:
+            # the updates take their snapshots and wait for the row together
+            await blocker.execute(
+                text('SELECT id FROM diagnosis WHERE id = :id FOR UPDATE'),
+                {'id': diagnosis['id']},
+            )
+            updates = [
+                asyncio.create_task(update(diagnosis['id']))
+                for _ in range(WRITERS)
+            ]
+            await asyncio.sleep(0.5)
+            await blocker.commit()
+        await asyncio.gather(*updates)
+        async with async_session_factory() as session:
+            result = await session.execute(
+                text(
+                    'SELECT disease_id, count(*) FROM disease_diagnosis '
+                    'GROUP BY disease_id ORDER BY disease_id'
+                )
+            )
+            return [tuple(row) for row in result]
+
+    assert api.portal.call(create_and_update) == [
+        (disease, 1) for disease in diseases
+    ]
@@ -0,0 +1,144 @@
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
+from itertools import product
+from typing import Any, Final
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.dependencies import Paginator, QueryParamsAppointment
+from src.doctor_app.repositories import DoctorAppointmentRepository
+from src.engine import async_session_factory
+from src.tests.utils import explain, truncate
+
+
+APPOINTMENTS: Final[int] = 1_000_000
+DOCTORS: Final[int] = 1000
+CLIENTS: Final[int] = 10000
+INDEX_SCANS: Final[tuple[str, ...]] = (
+    'Index Scan',
+    'Index Only Scan',
+    # over the bitmap of one or several index scans
+    'Bitmap Heap Scan',
+)
+
+
+def next_month() -> datetime:
+    today = date.today()
+    index = today.year * 12 + today.month
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+async def seed() -> None:
+    """Appointments every 8 hours of a doctor from the next month on, in
+    the months the migration created partitions for. A client has one
+    every 80 hours, so none of them overlap."""
+    async with async_session_factory() as session:
+        await session.execute(
+            text(
+                "INSERT INTO professions (name, created_at, updated_at) "
+                "VALUES ('Терапевт', now(), now())"
+            )
+        )
+        await session.execute(
+            text(
+                'INSERT INTO doctors (date_start_work, date_birthday, '
+                'profession_id, first_name, last_name, middle_name, avatar, '
+                'created_at, updated_at) '
+                "SELECT '2005-01-01', '1980-01-01', 1, 'Иван', 'Доктор' || i, "
+                "'Иванович', 'http://localhost/avatar.png', now(), now() "
+                'FROM generate_series(1, :doctors) i'
+            ),
+            {'doctors': DOCTORS},
+        )
+        await session.execute(
+            text(
+                'INSERT INTO clients (date_birthday, address, first_name, '
+                'last_name, middle_name, avatar, created_at, updated_at) '
+                "SELECT '1990-01-01', 'Москва', 'Пётр', 'Клиент' || i, "
+                "'Петрович', 'http://localhost/avatar.png', now(), now() "
+                'FROM generate_series(1, :clients) i'
+            ),
+            {'clients': CLIENTS},
+        )
+        await session.execute(
+            text(
+                'INSERT INTO appointments (start_date_appointment, '
+                'end_date_appointment, doctor_id, client_id, created_at, '
+                'updated_at) '
+                "SELECT s.start, s.start + interval '30 minutes', "
+                'i % :doctors + 1, i % :clients + 1, now(), now() '
+                'FROM generate_series(0, :appointments - 1) i, '
+                'LATERAL (SELECT CAST(:start AS timestamp) '
+                "+ (i / :doctors) * interval '8 hours' AS start) s"
+            ),
+            {
+                'start': next_month(),
+                'doctors': DOCTORS,
+                'clients': CLIENTS,
+                'appointments': APPOINTMENTS,
+            },
+        )
+        await session.commit()
+        await session.execute(text('ANALYZE'))
+        await session.commit()
+
+
+async def get_filled_partitions() -> set[str]:
+    """An empty partition is read sequentially, there is nothing to
+    read"""
+    async with async_session_factory() as session:
+        result = await session.execute(
+            text('SELECT DISTINCT tableoid::regclass::text FROM appointments')
+        )
+        return set(result.scalars())
+
+
+@pytest.fixture(scope='module')
+def partitions(client: TestClient) -> Iterator[set[str]]:
+    """Seeded partitions of appointments"""
+    client.portal.call(truncate)
+    client.portal.call(seed)
+    yield client.portal.call(get_filled_partitions)
+    client.portal.call(truncate)
+
+
+async def explain_list(query_params: QueryParamsAppointment) -> dict[str, Any]:
+    return await explain(
+        lambda session: DoctorAppointmentRepository().get_list(
+            session=session,
+            pagination=Paginator(),
+            query_params=query_params,
+        )
+    )
+
+
+def scans(plan: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    if 'Relation Name' in plan:
+        yield plan['Node Type'], plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from scans(child)
+
+
+@pytest.mark.parametrize(
+    'by_doctor, by_client, by_period', list(product([False, True], repeat=3))
+)
+def test_list_uses_indexes(
+    client: TestClient,
+    partitions: set[str],
+    by_doctor: bool,
+    by_client: bool,
+    by_period: bool,
+):
+    start = next_month() + timedelta(days=30)
+    query_params = QueryParamsAppointment(
+        start_date=start if by_period else None,
+        end_date=start + timedelta(days=7) if by_period else None,
+        doctor=1 if by_doctor else None,
+        client=1 if by_client else None,
+    )
+    plan = client.portal.call(explain_list, query_params)
+    appointments = [scan for scan in scans(plan) if scan[1] in partitions]
+    assert appointments
+    assert all(node in INDEX_SCANS for node, _ in appointments), appointments
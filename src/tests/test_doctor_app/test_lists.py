@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.doctor_app.schemes import AppointmentScheme, DoctorDetailScheme
+from src.tests.utils import (
+    assert_matches_scheme,
+    assert_pages,
+    create_appointment,
+    create_client,
+    create_doctor,
+    create_profession,
+)
+
+
+ROWS = 7
+PAGE = 3
+
+
+@pytest.fixture
+def doctors(api: TestClient) -> list[int]:
+    profession = create_profession(api)
+    # created in the reverse order of the last names
+    return [
+        create_doctor(api, f'Доктор{ROWS - i}', profession) for i in range(ROWS)
+    ]
+
+
+@pytest.fixture
+def appointments(api: TestClient, doctors: list[int]) -> list[int]:
+    client = create_client(api)
+    start = datetime(2026, 3, 1, 9)
+    # every other one a month later, so the pages span partitions
+    return [
+        create_appointment(
+            api,
+            doctors[i % 2],
+            client,
+            start + timedelta(days=31 * (i % 2), hours=i),
+        )
+        for i in range(ROWS)
+    ]
+
+
+def test_doctor_pages(api: TestClient, doctors: list[int]):
+    assert_pages(api, 'doctors', doctors, PAGE)
+
+
+def test_doctor_pages_by_last_name(api: TestClient, doctors: list[int]):
+    assert_pages(api, 'doctors', doctors[::-1], PAGE, order='last_name')
+
+
+def test_appointment_pages(api: TestClient, appointments: list[int]):
+    # ordered by the start by default
+    ids = appointments[0::2] + appointments[1::2]
+    assert_pages(api, 'appointments', ids, PAGE)
+
+
+def test_appointment_pages_by_start_desc(
+    api: TestClient, appointments: list[int]
+):
+    ids = appointments[0::2] + appointments[1::2]
+    assert_pages(
+        api, 'appointments', ids[::-1], PAGE, order='-start_date_appointment'
+    )
+
+
+def test_appointment_pages_of_period(api: TestClient, appointments: list[int]):
+    assert_pages(
+        api,
+        'appointments',
+        appointments[0::2],
+        PAGE,
+        start_date='2026-03-01T00:00:00',
+        end_date='2026-04-01T00:00:00',
+    )
+
+
+def test_doctor_page_matches_scheme(api: TestClient, doctors: list[int]):
+    assert_matches_scheme(api, 'doctors', DoctorDetailScheme)
+
+
+def test_appointment_page_matches_scheme(
+    api: TestClient, appointments: list[int]
+):
+    assert_matches_scheme(api, 'appointments', AppointmentScheme)
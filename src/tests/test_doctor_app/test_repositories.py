@@ -0,0 +1,201 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from src.doctor_app.dtos import AppointmentDataCreate
+from src.doctor_app.repositories import (
+    APPOINTMENT_LOCK_BUCKETS,
+    DoctorAppointmentRepository,
+)
+from src.engine import async_session_factory
+from src.tests.utils import create_client, create_doctor, create_profession
+
+
+ROUNDS = 10
+WRITERS = 8
+BATCH = 5000
+
+
+async def book(doctor: int, client: int, start: datetime, hours: int) -> str:
+    async with async_session_factory() as session:
+        result = await DoctorAppointmentRepository().create(
+            data=AppointmentDataCreate(
+                start_date_appointment=start,
+                end_date_appointment=start + timedelta(hours=hours),
+                doctor=doctor,
+                client=client,
+            ),
+            session=session,
+        )
+    return result['status']
+
+
+def test_concurrent_bookings_across_months(api: TestClient):
+    """Every partition has its own exclusion constraints, an overlap of
+    appointments in two months is only stopped by the write locks"""
+    doctor = create_doctor(api, 'Доктор', create_profession(api))
+    clients = [create_client(api, f'Клиент{i}') for i in range(WRITERS)]
+    today = date.today()
+    for round in range(ROUNDS):
+        # the last hour of a month and the first one of the next, months
+        # the migration created partitions for
+        index = today.year * 12 + today.month + round
+        month_end = datetime(index // 12, index % 12 + 1, 1)
+        bookings = [
+            (month_end - timedelta(hours=1), 2)
+            if i % 2
+            else (month_end, 1)
+            for i in range(WRITERS)
+        ]
+
+        async def book_all() -> list[str]:
+            return await asyncio.gather(
+                *(
+                    book(doctor, client, start, hours)
+                    for client, (start, hours) in zip(clients, bookings)
+                )
+            )
+
+        statuses = api.portal.call(book_all)
+        assert statuses.count('written') == 1, statuses
+
+
+def test_concurrent_batches_across_months(api: TestClient):
+    doctor = create_doctor(api, 'Доктор', create_profession(api))
+    clients = [create_client(api, f'Клиент{i}') for i in range(WRITERS)]
+    today = date.today()
+    index = today.year * 12 + today.month
+    month_end = datetime(index // 12, index % 12 + 1, 1)
+
+    async def book_batch(client: int, start: datetime, hours: int) -> int:
+        async with async_session_factory() as session:
+            created = await DoctorAppointmentRepository().bulk_create(
+                data=[
+                    AppointmentDataCreate(
+                        start_date_appointment=start,
+                        end_date_appointment=start + timedelta(hours=hours),
+                        doctor=doctor,
+                        client=client,
+                    )
+                ],
+                session=session,
+            )
+        return len(created)
+
+    async def book_all() -> list[int]:
+        return await asyncio.gather(
+            *(
+                book_batch(client, month_end - timedelta(hours=1), 2)
+                if i % 2
+                else book_batch(client, month_end, 1)
+                for i, client in enumerate(clients)
+            )
+        )
+
+    assert sum(api.portal.call(book_all)) == 1
+
+
+async def create_clients(rows: int) -> list[int]:
+    async with async_session_factory() as session:
+        result = await session.execute(
+            text(
+                'INSERT INTO clients (date_birthday, address, first_name, '
+                'last_name, middle_name, avatar, created_at, updated_at) '
+                "SELECT '1990-01-01', 'Москва', 'Пётр', 'Клиент' || i, "
+                "'Петрович', 'http://localhost/avatar.png', now(), now() "
+                'FROM generate_series(1, :rows) i RETURNING id'
+            ),
+            {'rows': rows},
+        )
+        ids = list(result.scalars())
+        await session.commit()
+    return ids
+
+
+async def count_batch_locks(doctor: int, clients: list[int]) -> int:
+    async with async_session_factory() as session:
+        await DoctorAppointmentRepository._lock(
+            doctors=[doctor], clients=clients, session=session
+        )
+        result = await session.execute(
+            text(
+                "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' "
+                'AND pid = pg_backend_pid()'
+            )
+        )
+        return result.scalar_one()
+
+
+def test_batch_of_thousands_of_clients(api: TestClient):
+    """The locks of a batch are bounded by the buckets, not by the number
+    of doctors and clients in it"""
+    doctor = create_doctor(api, 'Доктор', create_profession(api))
+    clients = api.portal.call(create_clients, BATCH)
+    locks = api.portal.call(count_batch_locks, doctor, clients)
+    assert locks <= APPOINTMENT_LOCK_BUCKETS + 1
+
+    start = datetime.combine(date.today(), datetime.min.time())
+    data = [
+        AppointmentDataCreate(
+            start_date_appointment=start + timedelta(minutes=30 * i),
+            end_date_appointment=start + timedelta(minutes=30 * (i + 1)),
+            doctor=doctor,
+            client=client,
+        )
+        for i, client in enumerate(clients)
+    ]
+
+    async def book_batch() -> int:
+        async with async_session_factory() as session:
+            created = await DoctorAppointmentRepository().bulk_create(
+                data=data, session=session
+            )
+        return len(created)
+
+    assert api.portal.call(book_batch) == BATCH
+
+
+def test_update_and_delete_return_the_previous_period(api: TestClient):
+    doctor = create_doctor(api, 'Доктор', create_profession(api))
+    client = create_client(api)
+    start = datetime.combine(date.today(), datetime.min.time())
+    booked = AppointmentDataCreate(
+        start_date_appointment=start,
+        end_date_appointment=start + timedelta(hours=1),
+        doctor=doctor,
+        client=client,
+    )
+    moved = AppointmentDataCreate(
+        start_date_appointment=start + timedelta(days=1),
+        end_date_appointment=start + timedelta(days=1, hours=1),
+        doctor=doctor,
+        client=client,
+    )
+
+    async def move_and_delete() -> tuple:
+        repository = DoctorAppointmentRepository()
+        async with async_session_factory() as session:
+            created = await repository.create(data=booked, session=session)
+            id = created['appointment']['id']
+            updated = await repository.update(
+                id=id, data=moved, session=session
+            )
+            deleted = await repository.delete(id=id, session=session)
+            missing = await repository.delete(id=id, session=session)
+        return created, updated, deleted, missing
+
+    created, updated, deleted, missing = api.portal.call(move_and_delete)
+    assert created['previous'] is None
+    assert updated['previous'] == {
+        'doctor': doctor,
+        'start_date_appointment': booked['start_date_appointment'],
+        'end_date_appointment': booked['end_date_appointment'],
+    }
+    assert deleted == {
+        'doctor': doctor,
+        'start_date_appointment': moved['start_date_appointment'],
+        'end_date_appointment': moved['end_date_appointment'],
+    }
+    assert missing is None
@@ -0,0 +1,175 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.cache import TTLCache
+from src.dependencies import QueryParamsAvailability
+from src.doctor_app.dtos import (
+    AppointmentPeriod,
+    AppointmentResponse,
+    AppointmentWriteResult,
+)
+from src.doctor_app.schemes import AppointmentCreateScheme
+from src.doctor_app.services import AppointmentService, DoctorService
+from src.doctor_app.slots import Period
+from src.exceptions import NotFoundEx
+
+
+class DoctorRepository:
+    """Busy periods of the doctors it was given, the doctors that are not
+    given do not exist"""
+
+    def __init__(
+        self,
+        busy: dict[int, list[Period]],
+        professions: dict[int, list[int]] | None = None,
+    ):
+        self.busy = busy
+        self.professions = professions or {}
+        self.loads: list[list[int]] = []
+
+    async def get_busy_periods(self, ids, start, end, session):
+        self.loads.append(ids)
+        return {
+            id: [p for p in self.busy[id] if p[0] < end and p[1] > start]
+            for id in ids
+            if id in self.busy
+        }
+
+    async def get_profession_doctor_ids(self, profession_id, session):
+        return self.professions.get(profession_id)
+
+    async def delete(self, id, session):
+        return id in self.busy
+
+
+class AppointmentRepository:
+    """One appointment of doctor 1 on the 1st of March, 10:00 to 11:00"""
+
+    previous = AppointmentPeriod(
+        doctor=1,
+        start_date_appointment=datetime(2026, 3, 1, 10),
+        end_date_appointment=datetime(2026, 3, 1, 11),
+    )
+
+    async def update(self, id, data, session, versions=None):
+        return AppointmentWriteResult(
+            status='written',
+            conflict_id=None,
+            previous=self.previous,
+            appointment=AppointmentResponse(
+                id=id,
+                created_at=datetime(2026, 1, 1),
+                updated_at=datetime(2026, 1, 1),
+                **data,
+            ),
+        )
+
+    async def delete(self, id, session):
+        return self.previous
+
+
+def make_service(repository: DoctorRepository, enabled: bool) -> DoctorService:
+    service = DoctorService(repository=repository)
+    service.days_cache = TTLCache(ttl=60, maxsize=100, enabled=enabled)
+    return service
+
+
+def availability(date_from: str, date_to: str) -> QueryParamsAvailability:
+    return QueryParamsAvailability(
+        date_from=datetime.fromisoformat(date_from),
+        date_to=datetime.fromisoformat(date_to),
+        duration=30,
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('enabled', [True, False])
+async def test_profession_without_doctors(enabled: bool):
+    service = make_service(DoctorRepository({}, professions={1: []}), enabled)
+    periods = await service.get_earliest_availability(
+        profession_id=1,
+        limit=10,
+        session=None,
+        query_params=availability('2026-03-01T09:00', '2026-03-01T18:00'),
+    )
+    assert periods == []
+
+
+@pytest.mark.asyncio
+async def test_doctor_with_a_day_missing_from_the_cache():
+    repository = DoctorRepository(
+        {1: [(datetime(2026, 3, 1, 10), datetime(2026, 3, 1, 11))]}
+    )
+    service = make_service(repository, enabled=True)
+    periods = await service.get_availability(
+        id=1,
+        session=None,
+        query_params=availability('2026-03-01T09:00', '2026-03-01T12:00'),
+    )
+    assert [(p.start.hour, p.end.hour) for p in periods] == [(9, 10), (11, 12)]
+
+    # deleted by another worker, the first day is still cached
+    del repository.busy[1]
+    with pytest.raises(NotFoundEx):
+        await service.get_availability(
+            id=1,
+            session=None,
+            query_params=availability('2026-03-01T09:00', '2026-03-02T12:00'),
+        )
+    assert repository.loads == [[1], [1]]
+
+
+DAYS = [(1, date(2026, 3, day)) for day in (1, 2, 3)] + [(2, date(2026, 3, 1))]
+
+
+async def cached_days(cache: TTLCache) -> TTLCache:
+    async def load(keys):
+        return {key: key for key in keys}
+
+    await cache.fetch_many(DAYS, load)
+    return cache
+
+
+async def still_cached(cache: TTLCache) -> list:
+    async def load(keys):
+        return {}
+
+    return sorted(await cache.fetch_many(DAYS, load))
+
+
+@pytest.mark.asyncio
+async def test_moved_appointment_drops_only_its_days():
+    service = AppointmentService(repository=AppointmentRepository())
+    service.days_cache = await cached_days(TTLCache(ttl=60, maxsize=100))
+    await service.update(
+        session=None,
+        data=AppointmentCreateScheme(
+            start_date_appointment=datetime(2026, 3, 3, 10),
+            end_date_appointment=datetime(2026, 3, 3, 11),
+            doctor=1,
+            client=1,
+        ),
+        id=1,
+    )
+    assert await still_cached(service.days_cache) == [
+        (1, date(2026, 3, 2)),
+        (2, date(2026, 3, 1)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_deleted_appointment_drops_only_its_day():
+    service = AppointmentService(repository=AppointmentRepository())
+    service.days_cache = await cached_days(TTLCache(ttl=60, maxsize=100))
+    await service.delete(id=1, session=None)
+    assert await still_cached(service.days_cache) == DAYS[1:]
+
+
+@pytest.mark.asyncio
+async def test_deleted_doctor_drops_only_its_days():
+    service = make_service(DoctorRepository({1: []}), enabled=True)
+    service.days_cache = await cached_days(service.days_cache)
+    service.profession_cache = TTLCache(ttl=60, maxsize=100)
+    await service.delete(id=1, session=None)
+    assert await still_cached(service.days_cache) == DAYS[3:]
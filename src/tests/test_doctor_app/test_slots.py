@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta
+
+from src.doctor_app.slots import (
+    SLOTS_PER_DAY,
+    DayBitmap,
+    days_of,
+    earliest_free_periods,
+    free_periods,
+)
+
+
+DAY = date(2026, 3, 1)
+HALF_HOUR = timedelta(minutes=30)
+
+
+def at(hour: int, minute: int = 0, day: int = 1) -> datetime:
+    return datetime(2026, 3, day, hour, minute)
+
+
+def test_days_of_a_period():
+    assert days_of(at(9), at(10)) == [DAY]
+    # the end is not a part of the period
+    assert days_of(at(23), at(0, day=2)) == [DAY]
+    assert days_of(at(23), at(1, day=3)) == [
+        DAY,
+        date(2026, 3, 2),
+        date(2026, 3, 3),
+    ]
+
+
+def test_bitmap_periods():
+    bitmap = DayBitmap(DAY)
+    assert list(bitmap.periods()) == []
+    bitmap.occupy(at(9), at(10))
+    bitmap.occupy(at(10), at(10, 30))
+    bitmap.occupy(at(13), at(14))
+    assert list(bitmap.periods()) == [(at(9), at(10, 30)), (at(13), at(14))]
+
+
+def test_bitmap_rounds_out_to_slots():
+    bitmap = DayBitmap(DAY)
+    bitmap.occupy(at(9, 2), at(9, 11))
+    assert list(bitmap.periods()) == [(at(9), at(9, 15))]
+
+
+def test_bitmap_clips_to_the_day():
+    bitmap = DayBitmap(DAY)
+    bitmap.occupy(datetime(2026, 2, 28, 23), at(1))
+    bitmap.occupy(at(23), at(2, day=2))
+    assert list(bitmap.periods()) == [(at(0), at(1)), (at(23), at(0, day=2))]
+
+
+def test_full_bitmap():
+    bitmap = DayBitmap(DAY)
+    bitmap.occupy(at(0), at(0, day=2))
+    assert list(bitmap.periods()) == [(at(0), at(0, day=2))]
+    assert len(bitmap.bits) * 8 == SLOTS_PER_DAY
+
+
+def test_free_periods_between_busy_ones():
+    busy = [
+        (at(8), at(9, 15)),
+        (at(9), at(10)),
+        (at(10, 20), at(11)),
+        (at(13), at(20)),
+    ]
+    assert list(free_periods(busy, at(9), at(14), HALF_HOUR)) == [
+        (at(11), at(13)),
+    ]
+    twenty_minutes = timedelta(minutes=20)
+    assert list(free_periods(busy, at(9), at(14), twenty_minutes)) == [
+        (at(10), at(10, 20)),
+        (at(11), at(13)),
+    ]
+
+
+def test_free_periods_without_busy_ones():
+    assert list(free_periods([], at(9), at(10), HALF_HOUR)) == [(at(9), at(10))]
+    assert list(free_periods([], at(9), at(9, 20), HALF_HOUR)) == []
+
+
+def test_earliest_free_periods_of_several_doctors():
+    busy = {
+        1: [(at(9), at(12))],
+        2: [(at(9), at(10)), (at(11), at(12))],
+        3: [],
+    }
+    periods = list(earliest_free_periods(busy, at(9), at(13), HALF_HOUR))
+    assert periods == [
+        (3, (at(9), at(13))),
+        (2, (at(10), at(11))),
+        (1, (at(12), at(13))),
+        (2, (at(12), at(13))),
+    ]
+    assert list(earliest_free_periods({}, at(9), at(13), HALF_HOUR)) == []
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from src.dependencies import QueryParamsExport
+from src.export_app.services import EXPORT_QUEUE_SIZE, ExportService
+
+
+CHUNKS = EXPORT_QUEUE_SIZE * 4
+
+
+class ExportRepository:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    async def copy(self, session, table, query_params, output):
+        for number in range(CHUNKS):
+            await output(bytearray(b'%d\n' % number))
+        if self.fail:
+            raise RuntimeError('COPY failed')
+
+
+def stream(repository: ExportRepository):
+    return ExportService(repository=repository).stream(
+        table='clients', query_params=QueryParamsExport()
+    )
+
+
+def other_tasks() -> set[asyncio.Task]:
+    return asyncio.all_tasks() - {asyncio.current_task()}
+
+
+@pytest.mark.asyncio
+async def test_stream_reads_every_chunk():
+    chunks = [chunk async for chunk in stream(ExportRepository())]
+    assert chunks == [b'%d\n' % number for number in range(CHUNKS)]
+    assert not other_tasks()
+
+
+@pytest.mark.asyncio
+async def test_stream_raises_a_failed_copy():
+    with pytest.raises(RuntimeError):
+        async for _ in stream(ExportRepository(fail=True)):
+            pass
+    assert not other_tasks()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_stops_a_blocked_copy():
+    chunks = stream(ExportRepository())
+    assert await anext(chunks) == b'0\n'
+    # let the copy fill the queue and block on it
+    await asyncio.sleep(0.01)
+    await asyncio.wait_for(chunks.aclose(), timeout=1)
+    assert not other_tasks()
@@ -0,0 +1,29 @@
+from src.queries import QueryRegistry
+
+
+def test_statement_is_built_once_per_shape():
+    registry = QueryRegistry()
+    builds = []
+
+    def build() -> str:
+        builds.append(1)
+        return 'SELECT 1'
+
+    first = registry.get('list', ('name', False), build)
+    assert registry.get('list', ('name', False), build) is first
+    registry.get('list', ('-name', False), build)
+    assert len(builds) == 2
+    assert registry.stats() == {'list': {'shapes': 2, 'hits': 1, 'misses': 2}}
+
+
+def test_least_recently_used_shape_is_evicted():
+    registry = QueryRegistry(maxsize=2)
+    registry.get('list', 'a', lambda: 'SELECT 1')
+    registry.get('list', 'b', lambda: 'SELECT 2')
+    registry.get('list', 'a', lambda: 'SELECT 1')
+    registry.get('list', 'c', lambda: 'SELECT 3')
+    assert registry.stats()['list']['shapes'] == 2
+    registry.get('list', 'a', lambda: 'SELECT 1')
+    assert registry.misses['list'] == 3
+    registry.get('list', 'b', lambda: 'SELECT 2')
+    assert registry.misses['list'] == 4
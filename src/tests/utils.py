@@ -0,0 +1,198 @@
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.engine import async_session_factory, engine
+
+
+async def truncate() -> None:
+    async with async_session_factory() as session:
+        result = await session.execute(
+            text(
+                "SELECT tablename FROM pg_tables WHERE schemaname = 'public' "
+                "AND tablename <> 'alembic_version'"
+            )
+        )
+        tables = ', '.join(result.scalars())
+        await session.execute(
+            text(f'TRUNCATE {tables} RESTART IDENTITY CASCADE')
+        )
+        await session.commit()
+
+
+def create(api: TestClient, path: str, body: dict[str, Any]) -> dict[str, Any]:
+    response = api.post(f'/api/v1/{path}/', json=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def create_profession(api: TestClient, name: str = 'Терапевт') -> int:
+    return create(api, 'professions', {'name': name})['id']
+
+
+def create_doctor(api: TestClient, last_name: str, profession: int) -> int:
+    return create(
+        api,
+        'doctors',
+        {
+            'firstName': 'Иван',
+            'lastName': last_name,
+            'middleName': 'Иванович',
+            'avatar': 'http://localhost/avatar.png',
+            'dateBirthday': '1980-01-01',
+            'dateStartWork': '2005-01-01',
+            'profession': profession,
+        },
+    )['id']
+
+
+def create_client(api: TestClient, last_name: str = 'Петров') -> int:
+    return create(
+        api,
+        'clients',
+        {
+            'firstName': 'Пётр',
+            'lastName': last_name,
+            'middleName': 'Петрович',
+            'dateBirthday': '1990-01-01',
+            'address': 'Москва',
+            'avatar': 'http://localhost/avatar.png',
+        },
+    )['id']
+
+
+def create_appointment(
+    api: TestClient,
+    doctor: int,
+    client: int,
+    start: datetime,
+    minutes: int = 30,
+) -> int:
+    return create(
+        api,
+        'appointments',
+        {
+            'startDateAppointment': start.isoformat(),
+            'endDateAppointment': (start + timedelta(minutes=minutes)).isoformat(),
+            'doctor': doctor,
+            'client': client,
+        },
+    )['id']
+
+
+NEXT_CURSOR: str = 'X-Next-Cursor'
+
+
+def get_page(
+    api: TestClient, path: str, **params: Any
+) -> tuple[list[int], str | None]:
+    response = api.get(f'/api/v1/{path}/', params=params)
+    assert response.status_code == 200, response.text
+    return [item['id'] for item in response.json()], response.headers.get(
+        NEXT_CURSOR
+    )
+
+
+def assert_pages(
+    api: TestClient, path: str, ids: list[int], size: int, **params: Any
+) -> None:
+    """First, offset and cursor pages of a list ordered as ``ids``"""
+    first, cursor = get_page(api, path, limit=size, **params)
+    assert first == ids[:size]
+    assert cursor is not None
+
+    offset, offset_cursor = get_page(
+        api, path, limit=size, offset=size, **params
+    )
+    assert offset == ids[size:2 * size]
+    following, following_cursor = get_page(
+        api, path, limit=size, cursor=cursor, **params
+    )
+    assert following == offset
+    assert following_cursor == offset_cursor
+
+    seen = first
+    while cursor:
+        page, cursor = get_page(api, path, limit=size, cursor=cursor, **params)
+        seen += page
+    assert seen == ids
+
+    last, last_cursor = get_page(
+        api, path, limit=size, offset=len(ids) - 1, **params
+    )
+    assert last == ids[-1:]
+    assert last_cursor is None
+
+    response = api.get(
+        f'/api/v1/{path}/',
+        params={
+            'limit': size,
+            'offset': size,
+            'envelope': True,
+            'count': 'exact',
+            **params,
+        },
+    )
+    page = response.json()
+    assert [item['id'] for item in page['items']] == offset
+    assert page['total'] == len(ids)
+    assert page['hasMore'] is (2 * size < len(ids))
+
+
+def same_shape(value: Any, other: Any) -> bool:
+    """The same keys at every level of two JSON values"""
+    if isinstance(value, dict) and isinstance(other, dict):
+        return value.keys() == other.keys() and all(
+            same_shape(value[key], other[key]) for key in value
+        )
+    if isinstance(value, list) and isinstance(other, list):
+        return len(value) == len(other) and all(
+            same_shape(a, b) for a, b in zip(value, other)
+        )
+    return not isinstance(value, (dict, list)) and not isinstance(
+        other, (dict, list)
+    )
+
+
+def assert_matches_scheme(
+    api: TestClient, path: str, scheme: type[BaseModel]
+) -> None:
+    """Every item of the list page built by postgres is valid for the
+    scheme and has no key the scheme would not return"""
+    response = api.get(f'/api/v1/{path}/')
+    assert response.status_code == 200, response.text
+    items = response.json()
+    assert items
+    for item in items:
+        model = scheme.model_validate(item)
+        assert same_shape(item, model.model_dump(mode='json', by_alias=True))
+
+
+async def explain(
+    run: Callable[[AsyncSession], Awaitable[Any]],
+    options: str = 'FORMAT JSON',
+) -> dict[str, Any]:
+    """Plan of the last statement ``run`` executes, e.g. a list query of a
+    repository, explained with its parameters"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        async with async_session_factory() as session:
+            await run(session)
+            statement, parameters = statements[-1]
+            connection = await session.connection()
+            result = await connection.exec_driver_sql(
+                f'EXPLAIN ({options}) {statement}', parameters
+            )
+            return result.scalar()[0]['Plan']
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', capture)
@@ -11,3 +11,8 @@ def snake_case(line: str) -> str:
     def sub_function(match):
         return f"{match.group(1)}_{match.group(2).lower()}"
     return sub('([a-z])([A-Z]+)', sub_function, line)
+
+
+def escape_like(line: str) -> str:
+    """Escape LIKE wildcards so that the line is matched literally"""
+    return sub(r'([\\%_])', r'\\\1', line)